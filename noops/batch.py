@@ -0,0 +1,137 @@
+"""
+Batch
+
+Run a noopsctl command for many products (one process per product at a time)
+"""
+
+# Copyright 2021 Croix Bleue du Québec
+
+# This file is part of python-noops.
+
+# python-noops is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# python-noops is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
+
+import glob
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from multiprocessing.context import BaseContext
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import BinaryIO, Callable, Iterable, List, Optional
+from .typing.batch import BatchResult
+from .errors import BatchFailure
+from . import settings
+
+# runner(product, args, global_args) called in a worker process
+BatchRunner = Callable[[str, List[str], List[str]], BatchResult]
+
+def find_products(patterns: Iterable[str]) -> List[str]:
+    """
+    Product directories (explicit paths or glob patterns) as absolute paths
+
+    Directories found with a pattern are kept only if they have a noops.yaml.
+    Duplicates are removed, order is kept.
+    """
+    products = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            products.extend(
+                i for i in sorted(glob.glob(pattern))
+                if (Path(i) / settings.DEFAULT_NOOPS_FILE).is_file()
+            )
+        else:
+            products.append(pattern)
+
+    return list(dict.fromkeys(os.fspath(Path(i).resolve()) for i in products))
+
+@contextmanager
+def captured_stdout(captured: BinaryIO):
+    """
+    Standard output (file descriptor 1) redirected to captured
+
+    Output of subprocesses (helm, scripts, ...) is captured too.
+    """
+    sys.stdout.flush()
+    saved = os.dup(1)
+    try:
+        os.dup2(captured.fileno(), 1)
+        with open(1, "w", encoding="UTF-8", closefd=False) as stdout, \
+            redirect_stdout(stdout):
+            yield captured
+    finally:
+        os.dup2(saved, 1)
+        os.close(saved)
+
+def run_batch(runner: BatchRunner, products: List[str], args: List[str], # pylint: disable=too-many-arguments
+    global_args: List[str] = None, workers: Optional[int] = None,
+    mp_context: Optional[BaseContext] = None) -> List[BatchResult]:
+    """
+    Run args with runner for all products with a pool of processes
+
+    Devops git clones are shared by all products (NOOPS_DEVOPS_CACHE) and
+    schema validators by all products of a worker process.
+    All products are processed even if one of them is failing.
+    mp_context: worker processes start method (default: platform default)
+    """
+    if workers is None:
+        workers = int(os.environ.get(settings.BATCH_WORKERS_ENV, settings.BATCH_WORKERS))
+    global_args = global_args or []
+
+    logging.info("batch: %d products, %d workers", len(products), workers)
+
+    with TemporaryDirectory(prefix=settings.TMP_PREFIX) as devops_cache:
+        previous_cache = os.environ.get(settings.DEVOPS_CACHE_ENV)
+        if previous_cache is None:
+            os.environ[settings.DEVOPS_CACHE_ENV] = devops_cache
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max(workers, 1), mp_context=mp_context) as executor:
+                results = list(
+                    executor.map(
+                        runner,
+                        products,
+                        [ args ] * len(products),
+                        [ global_args ] * len(products)
+                    )
+                )
+        finally:
+            if previous_cache is None:
+                os.environ.pop(settings.DEVOPS_CACHE_ENV, None)
+
+    failures = [ result.product for result in results if not result.succeeded ]
+    if len(failures) > 0:
+        raise BatchFailure(failures, results)
+
+    return results
+
+def batch_report(results: List[BatchResult]) -> str:
+    """
+    Summary of a batch (one line per product)
+    """
+    width = max([ len(result.product) for result in results ] + [ 20 ])
+    lines = []
+    for result in results:
+        lines.append(
+            "{:<{width}} {:<6} {:>8.2f}s {}".format( # pylint: disable=consider-using-f-string
+                result.product,
+                "OK" if result.succeeded else "FAILED",
+                result.duration,
+                result.error or "",
+                width=width
+            ).rstrip()
+        )
+
+    return "\n".join(lines)
@@ -20,6 +20,7 @@ noopsctl (cli entrypoint)
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
+import os
 import click
 from ..noops import NoOps
 
@@ -45,17 +46,29 @@ def cli(ctx, verbose, **kwargs):
 
     logging.basicConfig(level=level)
 
-    if ctx.invoked_subcommand not in ("version", "x", "package", "versions", "assist") and \
+    if ctx.invoked_subcommand not in \
+        ("version", "x", "package", "versions", "assist", "batch") and \
         kwargs['product'] is None:
         raise click.BadOptionUsage("product","Missing option '-p' / '--product'.")
 
     ctx.ensure_object(dict)
-    ctx.obj.update(kwargs)
+    ctx.obj.update(kwargs, verbose=verbose)
 
 def create_noops_instance(shared: dict) -> NoOps:
     """Create an instance of NoOps based on cli shared options"""
-    return NoOps(
+    core = NoOps(
         shared["product"],
         shared["dry_run"],
         shared["rm_cache"]
     )
+
+    # the workdir can not be recreated by another noopsctl until the command is done
+    # (a noopsctl started by a pipeline script of this command does not wait for it)
+    ctx = click.get_current_context(silent=True)
+    if ctx is not None:
+        ctx.find_root().with_resource(core.workdir_lock(export=True))
+
+    # noopsctl runs in the product directory (relative paths given as options)
+    os.chdir(core.product_path)
+
+    return core
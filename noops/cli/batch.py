@@ -0,0 +1,115 @@
+"""
+noopsctl batch
+"""
+
+# Copyright 2021 Croix Bleue du Québec
+
+# This file is part of python-noops.
+
+# python-noops is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# python-noops is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
+
+import importlib
+import os
+import time
+from tempfile import TemporaryFile
+from typing import List
+import click
+from . import cli
+from ..batch import find_products, run_batch, batch_report, captured_stdout
+from ..typing.batch import BatchResult
+from ..errors import BatchFailure
+
+@cli.command(context_settings={"ignore_unknown_options": True})
+@click.pass_obj
+@click.option('-p', '--product', 'products', help='product directory or glob pattern',
+    metavar='path', multiple=True, required=True)
+@click.option('-j', '--jobs', help='products processed in parallel  [default: 4]',
+    type=click.IntRange(1), default=None)
+@click.argument('args', nargs=-1, required=True, type=click.UNPROCESSED,
+    metavar="[--] COMMAND [ARGS]")
+def batch(shared, products, jobs, args):
+    """run a command for many products
+
+    eg: noopsctl batch -p 'products/*' -- package create -b 1
+    """
+    if args[0] == "batch":
+        raise click.BadArgumentUsage("batch can not be nested")
+
+    products = find_products(products)
+    if len(products) == 0:
+        raise click.BadOptionUsage("product", "no product found")
+
+    global_args = []
+    if shared["verbose"] > 0:
+        global_args.append("-" + "v" * shared["verbose"])
+    if shared["dry_run"]:
+        global_args.append("--dry-run")
+    if shared["rm_cache"]:
+        global_args.append("--rm-cache")
+
+    try:
+        results = run_batch(run_product, products, list(args), global_args, workers=jobs)
+    except BatchFailure as failure:
+        _echo(failure.results)
+        raise
+
+    _echo(results)
+
+def run_product(product: str, args: List[str], global_args: List[str]) -> BatchResult:
+    """
+    Run noopsctl for one product (in a batch worker process)
+
+    The standard output (with subprocesses output) is captured in the result.
+    The working directory is restored since workers are reused for other products.
+    """
+    # subcommands are registered by noops.cli.main (not imported by a spawned worker)
+    importlib.import_module("noops.cli.main")
+
+    result = BatchResult(product=product, args=args)
+    start = time.monotonic()
+    cwd = os.getcwd()
+
+    with TemporaryFile() as captured:
+        try:
+            with captured_stdout(captured):
+                cli.main(
+                    global_args + ["-p", product] + args,
+                    prog_name="noopsctl",
+                    standalone_mode=False
+                )
+            result.succeeded = True
+        except SystemExit as error:
+            result.succeeded = error.code in (None, 0)
+            if not result.succeeded:
+                result.error = f"exit code {error.code}"
+        except Exception as error: # pylint: disable=broad-except
+            result.error = str(error) or type(error).__name__
+        finally:
+            os.chdir(cwd)
+
+        captured.seek(0)
+        result.output = captured.read().decode("UTF-8", errors="replace")
+
+    result.duration = time.monotonic() - start
+
+    return result
+
+def _echo(results: list):
+    """Products output (stdout) and summary (stderr)"""
+    for result in results:
+        if result.output != "":
+            click.echo(f"# {result.product}")
+            click.echo(result.output, nl=False)
+
+    click.echo(batch_report(results), err=True)
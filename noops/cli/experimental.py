@@ -27,8 +27,8 @@ from ..typing.targets import TargetKind, Cluster
 from ..typing.versions import VersionKind
 from ..typing.projects import ProjectKind
 from ..typing.projectplans import ProjectPlanKind
-from ..utils.io import read_yaml, json2yaml, write_raw
-from ..errors import VerifyFailure
+from ..utils.io import read_yaml, read_yaml_all, read_yaml_documents, json2yaml, write_raw
+from ..errors import VerifyFailure, ProjectsPlanFailure
 from . import cli
 
 @cli.group(name="x")
@@ -41,21 +41,28 @@ def targets():
 
 @targets.command(name="plan")
 @click.option('-c', '--clusters', help='clusters configuration', required=True, metavar='YAML')
-@click.option('-t', '--target', help='target kind configuration', required=True, metavar='YAML')
+@click.option('-t', '--target',
+    help='target kind configuration (one or more documents, - for stdin)',
+    required=True, metavar='YAML')
 @click.option('-o', '--output', help='store output', type=click.Path())
 def target_plan(clusters, target, output):
-    """Create a target plan"""
+    """
+    Create a target plan
 
-    clusters_obj = read_yaml(clusters)
-    ktarget = TargetKind.parse_obj(read_yaml(target))
+    One plan is created per target document (same order)
+    """
 
-    targets_core = Targets(clusters_obj)
-    target_yaml = json2yaml(targets_core.plan(ktarget).json())
+    targets_core = Targets(read_yaml(clusters))
 
-    if output is None:
-        click.echo(target_yaml)
-    else:
-        write_raw(output, target_yaml)
+    with click.open_file(target, "r", encoding="UTF-8") as target_stream, \
+         click.open_file(output or "-", "w", encoding="UTF-8") as output_stream:
+        plans = targets_core.plan_many(
+            TargetKind.parse_obj(i) for i in read_yaml_all(target_stream)
+        )
+        for index, plan in enumerate(plans):
+            if index > 0:
+                output_stream.write("---\n")
+            output_stream.write(json2yaml(plan.json()))
 
 @exp.group()
 def versions():
@@ -114,6 +121,37 @@ def project_plan(clusters, targets, versions, projects, output): # pylint: disab
     else:
         write_raw(output, plan_yaml)
 
+@projects.command(name="bulk-plan")
+@click.option('-c', '--clusters',
+    help='clusters configuration', required=True, type=click.Path(), metavar='YAML')
+@click.option('-o', '--output',
+    help='directory to store plans', required=True, type=click.Path(file_okay=False))
+@click.option('--previous',
+    help='directory with previous plans [default: output]', type=click.Path(file_okay=False))
+@click.option('-j', '--jobs', help='number of plans computed at the same time',
+    type=click.IntRange(1), default=1, show_default=True)
+@click.argument('sources', nargs=-1, required=True, type=click.Path(exists=True))
+def project_bulk_plan(clusters, output, previous, jobs, sources):
+    """
+    Create execution plans for many projects
+
+    SOURCES are yaml files or directories with Target, Version and Project kinds.
+    They are paired by metadata (namespace, name).
+    """
+    try:
+        results = Projects.plan_bulk(
+            read_yaml(clusters),
+            read_yaml_documents(sources),
+            Path(output),
+            previous=Path(previous) if previous is not None else None,
+            workers=jobs
+        )
+    except ProjectsPlanFailure as failure:
+        click.echo(Projects.plan_bulk_report(failure.results))
+        raise
+
+    click.echo(Projects.plan_bulk_report(results))
+
 @projects.command(name="create")
 @click.option('-n', '--namespace', help='namespace scope', required=True)
 @click.option('-r', '--release', help='release name', required=True)
@@ -163,7 +201,12 @@ def project_create(namespace, release, chart, env, envs, output, cargs): # pylin
     help='previously deployed project plan', type=click.Path(), metavar='YAML')
 @click.option('-z', '--pre-processing-path',
     help='Pre-processing scripts/binaries path', type=click.Path(), required=True)
-def project_apply(shared, plan, previous_plan, pre_processing_path):
+@click.option('--skip-unchanged', is_flag=True,
+    help='do not upgrade releases already deployed with the same inputs')
+@click.option('--force', is_flag=True,
+    help='upgrade releases even if identical to the last successful upgrade')
+def project_apply(shared, plan, previous_plan, pre_processing_path, skip_unchanged, # pylint: disable=too-many-arguments
+    force):
     """execute a project plan"""
 
     kprojectplan = ProjectPlanKind.parse_obj(read_yaml(plan))
@@ -174,9 +217,25 @@ def project_apply(shared, plan, previous_plan, pre_processing_path):
         kprojectplan,
         Path(pre_processing_path).resolve(),
         dry_run=shared["dry_run"],
-        kpreviousplan=kprevious
+        kpreviousplan=kprevious,
+        skip_unchanged=skip_unchanged,
+        force=force
     )
 
+@projects.command(name="diff")
+@click.option('-p', '--plan', help='project plan', required=True, type=click.Path(), metavar='YAML')
+@click.option('-c', '--previous-plan',
+    help='previously deployed project plan', type=click.Path(), metavar='YAML')
+def project_diff(plan, previous_plan):
+    """show actions required to execute a project plan (helm is not used)"""
+
+    kprojectplan = ProjectPlanKind.parse_obj(read_yaml(plan))
+    kprevious = ProjectPlanKind.parse_obj(read_yaml(previous_plan)) \
+                if previous_plan is not None else None
+
+    for action in Projects.diff(kprojectplan, kpreviousplan=kprevious):
+        click.echo(action)
+
 @projects.command(name="cluster-apply")
 @click.pass_obj
 @click.option('-p', '--project',
@@ -185,7 +244,12 @@ def project_apply(shared, plan, previous_plan, pre_processing_path):
     help='previously deployed project kind', type=click.Path(), metavar='YAML')
 @click.option('-z', '--pre-processing-path',
     help='Pre-processing scripts/binaries path', type=click.Path(), required=True)
-def project_inapply(shared, project, previous_project, pre_processing_path):
+@click.option('--skip-unchanged', is_flag=True,
+    help='do not upgrade releases already deployed with the same inputs')
+@click.option('--force', is_flag=True,
+    help='upgrade releases even if identical to the last successful upgrade')
+def project_inapply(shared, project, previous_project, pre_processing_path, skip_unchanged, # pylint: disable=too-many-arguments
+    force):
     """Reconciliation in selected cluster"""
 
     kproject = ProjectKind.parse_obj(read_yaml(project))
@@ -196,7 +260,9 @@ def project_inapply(shared, project, previous_project, pre_processing_path):
         kproject,
         Path(pre_processing_path).resolve(),
         shared["dry_run"],
-        kprevious=kprevious
+        kprevious=kprevious,
+        skip_unchanged=skip_unchanged,
+        force=force
     )
 
 @projects.command(name="cluster-delete")
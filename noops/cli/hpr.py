@@ -29,6 +29,7 @@ def cli():
     """Noops Helm Post Renderer
 
     HPR is a wrapper between helm and kustomize used in --post-renderer.
-    HPR needs to be executed at the product root path
+    HPR reads its configuration from NOOPS_HPR (set per install by noopsctl).
+    Without NOOPS_HPR, HPR needs to be executed at the product root path
     """
     wrapper()
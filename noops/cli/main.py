@@ -26,4 +26,5 @@ import noops.cli.local      # pylint: disable=unused-import
 import noops.cli.experimental    # pylint: disable=unused-import
 import noops.cli.package    # pylint: disable=unused-import
 import noops.cli.assist     # pylint: disable=unused-import
+import noops.cli.batch      # pylint: disable=unused-import
 from . import cli           # pylint: disable=unused-import
@@ -29,6 +29,7 @@ from . import cli, create_noops_instance
 from ..package.prepare import prepare
 from ..package.serve import serve_forever
 from ..package.helm import Helm
+from ..package.index import index_packages
 from ..package.install import HelmInstall
 from ..typing.targets import TargetsEnum
 from ..typing.profiles import ProfileEnum
@@ -37,7 +38,7 @@ from ..typing.profiles import ProfileEnum
 @click.pass_context
 def package(ctx):
     """manage packages"""
-    if ctx.invoked_subcommand not in ("serve", "install") and \
+    if ctx.invoked_subcommand not in ("serve", "install", "index") and \
         ctx.obj['product'] is None:
         raise click.BadOptionUsage("product","Missing option '-p' / '--product'.", ctx=ctx.parent)
 
@@ -70,6 +71,14 @@ def push(shared, directory, url):
     core = create_noops_instance(shared)
     Helm(core).push(directory_abs, url)
 
+@package.command()
+@click.option('-d', '--directory', help='repository directory', type=click.Path(), required=True)
+@click.option('-u', '--url', help='url of chart repository',
+    show_default=True, default='http://0.0.0.0:8000', type=click.STRING)
+def index(directory, url):
+    """index all packages of a repository (rebuild)"""
+    index_packages(Path(directory).resolve(), url)
+
 @package.command()
 @click.option('-d', '--directory',
     help='alternate directory [default:current directory]', metavar='DIRECTORY', type=click.Path())
@@ -99,9 +108,13 @@ def install():
     type=click.Choice(TargetsEnum.list(), case_sensitive=True))
 @click.option('-p', '--profile', multiple=True, default=['default'],
     type=click.Choice(ProfileEnum.list(), case_sensitive=True))
+@click.option('--force', is_flag=True,
+    help='upgrade even if identical to the last successful upgrade')
+@click.option('--release-cache', is_flag=True,
+    help='store the upgrade digest in the helm release too (shared between runners)')
 @click.argument('cargs', nargs=-1, type=click.UNPROCESSED, metavar="[-- [-h] [CARGS]]")
 def install_helm(shared, namespace, release, chart, env, # pylint: disable=too-many-arguments
-    pre_processing_path, target, profile, cargs):
+    pre_processing_path, target, profile, force, release_cache, cargs):
     """
     install a NoOps helm package
 
@@ -121,7 +134,7 @@ def install_helm(shared, namespace, release, chart, env, # pylint: disable=too-m
                 )
         chart = _chart
 
-    helm = HelmInstall(shared["dry_run"])
+    helm = HelmInstall(shared["dry_run"], force=force, release_cache=release_cache)
     helm.upgrade(
         namespace,
         release,
@@ -24,7 +24,8 @@ noopsctl pipeline deploy
 import click
 from . import cli, create_noops_instance
 from ..utils.external import execute
-from ..pipeline.deploy import pipeline_deploy
+from ..pipeline.deploy import pipeline_deploy, white_label_report
+from ..errors import WhiteLabelDeploymentFailure
 
 @cli.group()
 def pipeline():
@@ -174,9 +175,12 @@ def continuous_delivery(shared, target, cargs):
 @click.pass_obj
 @click.option('--default',
     help='default deployment [DEPRECATED]', is_flag=True)
+@click.option('-j', '--jobs',
+    help='white-label brands deployed in parallel', type=click.IntRange(1),
+    default=1, show_default=True)
 @click.argument('target', nargs=1, required=True, default="default")
 @click.argument('cargs', nargs=-1, type=click.UNPROCESSED, metavar="[-- [-h] [CARGS]]")
-def deploy(shared, default, target, cargs): # pylint: disable=unused-argument
+def deploy(shared, default, jobs, target, cargs): # pylint: disable=unused-argument
     """continuous deployment
 
     TARGET refers to pipeline.deploy.<TARGET> [default: default]
@@ -199,4 +203,11 @@ def deploy(shared, default, target, cargs): # pylint: disable=unused-argument
             )
         )
 
-    pipeline_deploy(core, target, list(cargs))
+    try:
+        results = pipeline_deploy(core, target, list(cargs), workers=jobs)
+    except WhiteLabelDeploymentFailure as failure:
+        click.echo(white_label_report(failure.results))
+        raise
+
+    if results is not None:
+        click.echo(white_label_report(results))
@@ -71,7 +71,71 @@ class ChartNotFound(NoopsException):
     def __init__(self, chart: str):
         NoopsException.__init__(self, f"chart not found with keyword {chart} !")
 
+class PreProcessingDependencies(NoopsException):
+    """Pre-processing steps do not form a valid graph"""
+    def __init__(self, reason: str):
+        NoopsException.__init__(self, f"pre-processing dependencies are invalid: {reason} !")
+
+class PackageInvalid(NoopsException):
+    """Helm package without Chart.yaml"""
+    def __init__(self, package):
+        NoopsException.__init__(self, f"{package} is not a valid helm package !")
+
+class PackageUnsafe(NoopsException):
+    """Helm package member outside of the extraction directory"""
+    def __init__(self, package, member: str):
+        NoopsException.__init__(self, f"{package}: {member} is unsafe (outside of the chart) !")
+
+class ConverterFailure(NoopsException):
+    """External service catalog converter failed"""
+    def __init__(self, converter, stderr: str):
+        NoopsException.__init__(self, f"{converter} failed: {stderr.strip()}")
+
 class KustomizeStructure(NoopsException):
     """Bad Kustomize structure"""
     def __init__(self):
         NoopsException.__init__(self, "Kustomize structure is not compliant !")
+
+class WhiteLabelDeploymentFailure(NoopsException):
+    """At least one white-label deployment failed"""
+    def __init__(self, rebrands: list, results: list = None):
+        self.results = results or []
+        NoopsException.__init__(
+            self,
+            f"white-label deployment failed for {', '.join(rebrands)} !"
+        )
+
+class ProjectsPlanFailure(NoopsException):
+    """At least one project can not be planned"""
+    def __init__(self, projects: list, results: list = None):
+        self.results = results or []
+        NoopsException.__init__(
+            self,
+            f"plan failed for {', '.join(projects)} !"
+        )
+
+class LockTimeout(NoopsException):
+    """Lock not acquired in time"""
+    def __init__(self, path, timeout: float):
+        NoopsException.__init__(
+            self,
+            f"{path}: lock not acquired after {timeout:g} seconds " \
+                "(used by another noopsctl ? see NOOPS_LOCK_TIMEOUT) !"
+        )
+
+class WhiteLabelConflict(NoopsException):
+    """Many rebrands with the same workdir"""
+    def __init__(self, label: str, rebrands: list):
+        NoopsException.__init__(
+            self,
+            f"white-label {', '.join(rebrands)} share the same workdir ({label}) !"
+        )
+
+class BatchFailure(NoopsException):
+    """At least one product failed in a batch"""
+    def __init__(self, products: list, results: list = None):
+        self.results = results or []
+        NoopsException.__init__(
+            self,
+            f"batch failed for {', '.join(products)} !"
+        )
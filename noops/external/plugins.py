@@ -0,0 +1,68 @@
+"""
+In-process plugins (entry points)
+
+- noops.preprocessing: name is the pre-processing script (eg: replace-vault-values.py)
+- noops.svcat_converters: name is class/plan (eg: operator/plan)
+
+A plugin is a PreProcessing or a Processing sub-class.
+"""
+
+# Copyright 2021 Croix Bleue du Québec
+
+# This file is part of python-noops.
+
+# python-noops is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# python-noops is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+from functools import lru_cache
+from importlib import metadata
+from typing import Dict, Optional
+from .preprocessing import PreProcessing
+from .processing import Processing
+from .. import settings
+
+@lru_cache(maxsize=None)
+def _entry_points(group: str) -> Dict[str, metadata.EntryPoint]:
+    eps = metadata.entry_points()
+    if hasattr(eps, "select"):
+        selected = eps.select(group=group)
+    else: # pragma: no cover
+        # python 3.9
+        selected = eps.get(group, [])
+    return { ep.name: ep for ep in selected }
+
+@lru_cache(maxsize=None)
+def load_plugin(group: str, name: str) -> Optional[type]:
+    """Plugin registered with name in group (None if not registered)"""
+    entry_point = _entry_points(group).get(name)
+    if entry_point is None:
+        return None
+
+    logging.debug("plugin %s %s: %s", group, name, entry_point.value)
+    return entry_point.load()
+
+def clear_plugins():
+    """Forget plugins already discovered (eg: new distribution installed)"""
+    _entry_points.cache_clear()
+    load_plugin.cache_clear()
+
+def preprocessing_plugin(script: str) -> Optional[PreProcessing]:
+    """Pre-processing plugin for a script"""
+    plugin = load_plugin(settings.PLUGINS_PREPROCESSING, script)
+    return plugin() if plugin is not None else None
+
+def svcat_converter_plugin(svcat_class: str, plan: str) -> Optional[Processing]:
+    """Service catalog converter plugin for class/plan"""
+    plugin = load_plugin(settings.PLUGINS_SVCAT_CONVERTERS, f"{svcat_class}/{plan}")
+    return plugin() if plugin is not None else None
@@ -20,6 +20,7 @@ Pre-processing can apply some changes to an helm chart before helm templating
 # You should have received a copy of the GNU Lesser General Public License
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
+import os
 from typing import List
 from pathlib import Path
 import click
@@ -27,7 +28,21 @@ import click
 class PreProcessing:
     """
     Pre-Processing Abstract Class
+
+    Used as an executable (run) or as a plugin (entry point noops.preprocessing)
     """
+    _extra_envs: dict = {}
+
+    @property
+    def envs(self) -> dict:
+        """Environment variables (with the release extra envs if used as a plugin)"""
+        return {**os.environ, **self._extra_envs}
+
+    def with_envs(self, extra_envs: dict = None) -> "PreProcessing":
+        """Set the release extra envs (plugin)"""
+        self._extra_envs = extra_envs or {}
+        return self
+
     def apply(self, env: str, chart: Path, values: List[Path],
         templates: List[Path], kustomize: List[Path]):
         """
@@ -20,7 +20,7 @@ to convert a service request (noops.yaml) to "native objects"
 # You should have received a copy of the GNU Lesser General Public License
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import List
+from typing import Dict, List
 from pathlib import Path
 import yaml
 import click
@@ -28,7 +28,12 @@ import click
 class Processing:
     """
     Processing Abstract Class
+
+    Used as an executable (run) or as a plugin (entry point noops.svcat_converters)
     """
+    # declared to noopsctl by the executable (--capabilities)
+    capabilities: List[str] = ["batch"]
+
     def convert(self, service_request: dict, name: str) -> List[dict]:
         """Convert a service requests to an object list
 
@@ -48,6 +53,16 @@ class Processing:
         """
         raise NotImplementedError()
 
+    def convert_many(self, service_requests: List[dict]) -> Dict[str, List[dict]]:
+        """Convert service requests ([{name: ..., request: ...}]) to objects lists per name
+
+        Default: convert each request. Override it to share work between requests.
+        """
+        return {
+            i["name"]: self.convert(i["request"], i["name"])
+            for i in service_requests
+        }
+
     def _store(self, objs: dict, output: Path, indent=2):
         """Store Objects to the requested file"""
         with output.open(mode='w', encoding='UTF-8') as file:
@@ -62,21 +77,35 @@ class Processing:
     def run(self):
         """Start the command line"""
 
+        def capabilities(ctx, _, value):
+            if value and not ctx.resilient_parsing:
+                click.echo("\n".join(self.capabilities))
+                ctx.exit()
+
         @click.group(
             context_settings=dict(help_option_names=["-h", "--help"]),
             invoke_without_command=True
         )
-        @click.option('-n', '--name', help='metadata.name used', required=True)
+        @click.option('-n', '--name', help='metadata.name used')
         @click.option('-r', '--request',
-            help='service request (yaml)', type=click.Path(exists=True), required=True)
+            help='service request (yaml)', type=click.Path(exists=True))
+        @click.option('-b', '--batch',
+            help='service requests (yaml list of name/request)', type=click.Path(exists=True))
         @click.option('-o', '--objects',
             help='service catalog objects (yaml)', type=click.Path(), required=True)
-        def cli(name, request, objects):
+        @click.option('--capabilities', help='list supported capabilities (eg: batch)',
+            is_flag=True, expose_value=False, is_eager=True, callback=capabilities)
+        def cli(name, request, batch, objects):
             """Create objects based on plan/class'"""
 
-            service_request = self._load(Path(request))
+            if batch is not None:
+                # objects per name
+                objs = self.convert_many(self._load(Path(batch)))
+            elif name is not None and request is not None:
+                objs = self.convert(self._load(Path(request)), name)
+            else:
+                raise click.UsageError("--name and --request are required (or --batch)")
 
-            objs = self.convert(service_request, name)
             self._store(objs, Path(objects))
 
         cli() # pylint: disable=no-value-for-parameter
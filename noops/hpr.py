@@ -36,8 +36,9 @@ def wrapper():
     """
 
     # read noopshpr configuration
-    # this file is created by NoOps package install step
-    hpr = Path(settings.DEFAULT_WORKDIR) / settings.DEFAULT_NOOPS_HPR
+    # this file is created by NoOps package install step (unique per install)
+    hpr = os.environ.get("NOOPS_HPR")
+    hpr = Path(hpr) if hpr else Path(settings.DEFAULT_WORKDIR) / settings.DEFAULT_NOOPS_HPR
     hpr_content = read_yaml(hpr)
 
     kustomize_base: Path = hpr_content["base"]
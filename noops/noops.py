@@ -27,7 +27,11 @@ Core component
 import logging
 import os
 from pathlib import Path
+from contextlib import contextmanager, nullcontext
+from copy import copy, deepcopy
+from functools import lru_cache
 import errno
+import hashlib
 import json
 import tempfile
 import shutil
@@ -37,11 +41,26 @@ import yaml
 import jsonschema
 from . import settings
 from .utils.external import execute
-from .utils import containers, io, resources
+from .utils import containers, io, lock, resources
+
+@lru_cache(maxsize=32)
+def _schema_validator(schema_path: str, mtime: int): # pylint: disable=unused-argument
+    """
+    Checked schema validator (shared by all products of the process)
+
+    mtime is part of the cache key
+    """
+    schema_defs = io.read_yaml(schema_path)
+    validator = jsonschema.validators.validator_for(schema_defs)
+    validator.check_schema(schema_defs)
+    return validator(schema_defs)
 
 class NoOps():
     """
     NoOps Core
+
+    All paths are derived from product_path (the working directory is never changed),
+    so many instances can be used at the same time in one process.
     """
 
     def __init__(
@@ -52,35 +71,131 @@ class NoOps():
         # Use absolute path
         product_path = Path(product_path).resolve()
 
-        # change working directory to the product path
-        os.chdir(product_path)
-
+        self.product_path = product_path
         self.dry_run = dry_run
         self.workdir = product_path / settings.DEFAULT_WORKDIR
 
-        if rm_cache or not self._iscache():
-            self._create_cache(product_path)
-            self._jsonschema_validate(product_path)
-        else:
-            self._load_cache()
+        # protect the workdir against concurrent noopsctl for the same product
+        # (shared to load it, exclusive to create it, see workdir_lock() to use it)
+        loaded = False
+        if not rm_cache:
+            with self._workdir_file_lock(shared=True):
+                if self._iscache():
+                    self._load_cache()
+                    loaded = True
+
+        if not loaded:
+            with self._workdir_file_lock():
+                if rm_cache or not self._iscache():
+                    self._create_cache(product_path)
+                    self._jsonschema_validate(product_path)
+                else:
+                    self._load_cache()
 
         logging.debug("Final config: %s", self.noops_config)
 
         # Done
         logging.info("NoOps: Ready !" if not dry_run else "NoOps: Dry-run mode ready !")
 
+    def _workdir_file_lock(self, shared: bool = False):
+        """Workdir lock (already held if a parent noopsctl exported it)"""
+        path = self.product_path / settings.WORKDIR_LOCK
+        if os.fspath(path) in os.environ.get(settings.WORKDIR_LOCK_HELD_ENV, "").split(os.pathsep):
+            return nullcontext(path)
+
+        return lock.file_lock(path, shared=shared)
+
+    @contextmanager
+    def workdir_lock(self, export: bool = False):
+        """
+        Shared lock on the workdir while it is used (eg: for a whole noopsctl command)
+
+        Another instance recreating the cache (rm_cache) waits until it is released.
+        Do not create a new instance with rm_cache for the same product while holding it.
+
+        export: child processes (eg: noopsctl called by a pipeline script) use
+        the workdir without locking it (NOOPS_WORKDIR_LOCK_HELD). It is set in
+        os.environ, so it is process-wide: only for a whole command.
+        """
+        with self._workdir_file_lock(shared=True) as path:
+            held = os.environ.get(settings.WORKDIR_LOCK_HELD_ENV, "").split(os.pathsep)
+            if not export or os.fspath(path) in held:
+                yield self
+                return
+
+            os.environ[settings.WORKDIR_LOCK_HELD_ENV] = \
+                os.pathsep.join([ i for i in held if i ] + [ os.fspath(path) ])
+            try:
+                yield self
+            finally:
+                held = os.environ.get(settings.WORKDIR_LOCK_HELD_ENV, "").split(os.pathsep)
+                held = [ i for i in held if i and i != os.fspath(path) ]
+                if held:
+                    os.environ[settings.WORKDIR_LOCK_HELD_ENV] = os.pathsep.join(held)
+                else:
+                    os.environ.pop(settings.WORKDIR_LOCK_HELD_ENV, None)
+
     def _iscache(self) -> bool:
         return self._get_generated_noops_json().is_file() and \
             self._get_generated_noops_yaml().is_file()
 
     def _create_cache(self, product_path: Path):
-        # remove possible cache
-        if self.workdir.exists():
-            logging.info("purging cache")
-            shutil.rmtree(self.workdir)
+        """
+        Create the cache in a temporary directory and swap it with the current one
 
+        Nobody will see a partially created workdir
+        """
         logging.info("creating cache")
 
+        workdir = self.workdir
+        with tempfile.TemporaryDirectory(
+            prefix=f".{settings.TMP_PREFIX}", dir=product_path) as tmpdirname:
+            build = Path(tmpdirname) / settings.DEFAULT_WORKDIR
+
+            self.workdir = build
+            try:
+                self._build_cache(product_path)
+
+                # paths refer to the final workdir
+                self.noops_config = self._relocate(self.noops_config, build, workdir)
+
+                # NoOps final configuration
+                io.write_json(
+                    self._get_generated_noops_json(),
+                    self.noops_config
+                )
+                io.write_yaml(
+                    self._get_generated_noops_yaml(),
+                    self.noops_config
+                )
+            finally:
+                self.workdir = workdir
+
+            # remove possible cache (cleaned up with the temporary directory)
+            if workdir.exists():
+                logging.info("purging cache")
+                os.replace(workdir, Path(tmpdirname) / "previous")
+
+            os.replace(build, workdir)
+
+    @classmethod
+    def _relocate(cls, config, src: Path, dst: Path):
+        """
+        Replace all paths under src by the same path under dst
+        """
+        if isinstance(config, dict):
+            return { key: cls._relocate(value, src, dst) for key, value in config.items() }
+        if isinstance(config, list):
+            return [ cls._relocate(value, src, dst) for value in config ]
+        if isinstance(config, Path) and (config == src or src in config.parents):
+            return dst / config.relative_to(src)
+        return config
+
+    def _build_cache(self, product_path: Path):
+        """
+        Build the cache in the workdir (devops, merged configuration, files selection)
+        """
+
         # Load product noops.yaml
         noops_product = io.read_yaml(product_path / settings.DEFAULT_NOOPS_FILE)
         logging.debug("Product config: %s", noops_product)
@@ -160,16 +275,6 @@ class NoOps():
         # Deprecated
         self._deprecated_noops()
 
-        # NoOps final configuration
-        io.write_json(
-            self._get_generated_noops_json(),
-            self.noops_config
-        )
-        io.write_yaml(
-            self._get_generated_noops_yaml(),
-            self.noops_config
-        )
-
     def _jsonschema_validate(self, product_path: Path):
         logging.info("validating generated configuration")
 
@@ -182,8 +287,10 @@ class NoOps():
         instance = io.read_json(self._get_generated_noops_json())
 
         def _validate(schema_path: Path):
-            schema_defs = io.read_yaml(schema_path)
-            jsonschema.validate(instance=instance, schema=schema_defs)
+            validator = _schema_validator(os.fspath(schema_path), schema_path.stat().st_mtime_ns)
+            error = jsonschema.exceptions.best_match(validator.iter_errors(instance))
+            if error is not None:
+                raise error
 
         for schema_path in schema_paths:
             if schema_path.exists():
@@ -235,6 +342,7 @@ class NoOps():
             _ = execute(
                 "helm",
                 args,
+                product_path=os.fspath(self.product_path),
                 capture_output=True,
                 dry_run=self.is_dry_run()
             )
@@ -269,37 +377,21 @@ class NoOps():
 
         if local_config:
             shutil.copytree(
-                local_config["path"],
+                self.product_path / local_config["path"],
                 self.workdir
             )
             return
 
         if git_config:
+            cache = os.environ.get(settings.DEVOPS_CACHE_ENV)
+            if cache:
+                # one clone shared by many products (eg: noopsctl batch)
+                shutil.copytree(self._cached_devops(git_config, Path(cache)), self.workdir)
+                return
+
             with tempfile.TemporaryDirectory(prefix="noops-") as tmpdirname:
                 clone_path = Path(tmpdirname) / settings.DEFAULT_WORKDIR
-
-                # clone
-                execute(
-                    "git",
-                    [
-                        "clone",
-                        "--depth=1",
-                        "--branch={}".format(git_config["branch"]), # pylint: disable=consider-using-f-string
-                        git_config["clone"],
-                        os.fspath(clone_path)
-                    ]
-                )
-
-                # remove .git folder
-                shutil_kwargs={}
-                if os.name == "nt":
-                    def remove_readonly(callback, path, excinfo): # pylint: disable=unused-argument
-                        # Some files in .git folder are flagged read only on Windows
-                        Path(path).chmod(stat.S_IWRITE)
-                        callback(path)
-                    shutil_kwargs["onerror"]=remove_readonly
-
-                shutil.rmtree(clone_path / ".git", **shutil_kwargs)
+                self._git_clone(git_config, clone_path)
 
                 # move in the product folder
                 shutil.move(
@@ -312,6 +404,58 @@ class NoOps():
         logging.error("devops/local or devops/git not found !")
         raise ValueError()
 
+    def _git_clone(self, git_config: dict, clone_path: Path):
+        """
+        Clone the devops repository (without .git folder)
+        """
+        execute(
+            "git",
+            [
+                "clone",
+                "--depth=1",
+                "--branch={}".format(git_config["branch"]), # pylint: disable=consider-using-f-string
+                git_config["clone"],
+                os.fspath(clone_path)
+            ],
+            product_path=os.fspath(self.product_path)
+        )
+
+        # remove .git folder
+        shutil_kwargs={}
+        if os.name == "nt":
+            def remove_readonly(callback, path, excinfo): # pylint: disable=unused-argument
+                # Some files in .git folder are flagged read only on Windows
+                Path(path).chmod(stat.S_IWRITE)
+                callback(path)
+            shutil_kwargs["onerror"]=remove_readonly
+
+        shutil.rmtree(clone_path / ".git", **shutil_kwargs)
+
+    def _cached_devops(self, git_config: dict, cache: Path) -> Path:
+        """
+        Devops repository cloned once in the cache directory (clone and branch)
+        """
+        source = git_config["clone"]
+        if (self.product_path / source).exists():
+            # local repository relative to the product
+            source = os.fspath((self.product_path / source).resolve())
+
+        key = hashlib.sha256(json.dumps([source, git_config["branch"]]).encode("UTF-8")).hexdigest()
+        cached = cache / key
+
+        cache.mkdir(parents=True, exist_ok=True)
+        with lock.file_lock(cache / f"{key}.lock"):
+            if not cached.exists():
+                with tempfile.TemporaryDirectory(
+                    prefix=f".{settings.TMP_PREFIX}", dir=cache) as tmpdirname:
+                    clone_path = Path(tmpdirname) / key
+                    self._git_clone(git_config, clone_path)
+                    os.replace(clone_path, cached)
+            else:
+                logging.info("using cached devops clone %s", os.fspath(cached))
+
+        return cached
+
     def _file_selector(self, product_path: Path, selector: str,
         product: dict, devops: dict,
         product_profile: dict, devops_profile: dict):
@@ -436,6 +580,48 @@ class NoOps():
         except KeyError:
             return settings.DEFAULT_FEATURES[feature]
 
+    def fork(self, workdir: Path) -> "NoOps":
+        """
+        Create an isolated core working in another workdir
+
+        The helm chart is copied under workdir and the generated configuration
+        is written in it. Everything generated by prepare() for the fork will
+        never conflict with the original core or with another fork.
+        """
+        forked = copy(self)
+        forked.workdir = workdir
+        forked.noops_config = deepcopy(self.noops_config)
+
+        helm_config = forked.noops_config["package"]["helm"]
+        chart = helm_config["chart"]
+        src = chart["destination"] if isinstance(chart, dict) else chart
+        dst = workdir / src.name
+
+        if isinstance(chart, dict):
+            chart["destination"] = dst
+        else:
+            helm_config["chart"] = dst
+        helm_config["values"] = dst / "noops"
+
+        if self.is_dry_run():
+            return forked
+
+        # incremental: files identical to a previous fork are not rewritten
+        io.sync_directory(src, dst)
+
+        io.write_json(
+            forked._get_generated_noops_json(), # pylint: disable=protected-access
+            forked.noops_config,
+            if_changed=True
+        )
+        io.write_yaml(
+            forked._get_generated_noops_yaml(), # pylint: disable=protected-access
+            forked.noops_config,
+            if_changed=True
+        )
+
+        return forked
+
     def noops_envs(self):
         """
         Environment variables to expose when we need to execute a command
@@ -28,19 +28,32 @@ import os
 from pathlib import Path
 import shutil
 import re
-from typing import Optional, List
+from typing import Callable, Dict, Optional, List
+import yaml
 from .. import settings
 from ..utils.external import execute, get_stdout
 from ..utils import containers
 from ..utils import io
 from ..noops import NoOps
 from ..typing.charts import ChartKind
+from .index import index_packages
+from .packager import package_chunks
 
 class Helm():
     """
     Manages Helm Chart
     """
-    re_noops_chart = re.compile("{{noops:chart:(.*):(.*)}}")
+    # '{{ ... }}' (quotes removed) and {{noops:chart:<macro>:<argument>}}
+    re_template = re.compile(
+        r"'?{{noops:chart:(?P<macro>[\w-]+):(?P<argument>.*?)}}'?|'{{|}}'"
+    )
+
+    # {{noops:chart:<macro>:<argument>}} -> helm template directive
+    MACROS: Dict[str, Callable[["Helm", str], str]] = {
+        "include": lambda helm, argument: helm.include(argument),
+        "tpl": lambda helm, argument: "{{ tpl " + argument + " . }}",
+        "values": lambda helm, argument: "{{ .Values." + argument + " }}"
+    }
 
     def __init__(self, core: NoOps, chart_name: str = None):
         self._core = core
@@ -49,7 +62,7 @@ class Helm():
         # Chart name
         if chart_name is None:
             # Compute chart name
-            self._chart_name = os.path.split(os.getcwd())[1]
+            self._chart_name = core.product_path.name
         else:
             self._chart_name = chart_name
 
@@ -82,17 +95,24 @@ class Helm():
 
         return '{{ ' + value + ' }}'
 
-    def as_chart_template(self, source: str):
-        """Transform the input string to use it in a chart template"""
+    def as_chart_template(self, source: str,
+        macros: Dict[str, Callable[["Helm", str], str]] = None) -> str:
+        """Transform the input string to use it in a chart template (single pass)
 
-        #TODO: optimize the code (avoid replace() to start from 0 each time)
-
-        template = source.replace("'{{", "{{").replace("}}'", "}}")
+        macros are added to (or override) Helm.MACROS. Unknown macros are kept as is.
+        """
+        table = {**Helm.MACROS, **macros} if macros is not None else Helm.MACROS
 
-        for match in Helm.re_noops_chart.finditer(source):
-            template = template.replace(match[0], self.include(match[2]), 1)
+        def rewrite(match: re.Match) -> str:
+            macro = match["macro"]
+            if macro is None:
+                # quoted template directive
+                return match[0].strip("'")
+            if macro not in table:
+                return match[0].strip("'")
+            return table[macro](self, match["argument"])
 
-        return template
+        return Helm.re_template.sub(rewrite, source)
 
     def create_values_directory(self):
         """
@@ -155,7 +175,8 @@ class Helm():
                 self.get_values_path(values_name),
                 config,
                 indent=settings.DEFAULT_INDENT,
-                dry_run=self.core.is_dry_run()
+                dry_run=self.core.is_dry_run(),
+                if_changed=True
             )
 
     def get_values_path(self, values_filename: str = None) -> Path:
@@ -167,17 +188,24 @@ class Helm():
 
         return self.config["values"] / values_filename
 
-    def create_package(self, app_version: str, build: str, # pylint: disable=too-many-arguments
-        description: str, values: Optional[Path]):
+    def create_package(self, app_version: str, build: str, # pylint: disable=too-many-arguments,too-many-locals
+        description: str, values: Optional[Path]) -> Path:
         """
-        Create a NoOps Helm Package
+        Create a NoOps Helm Package (reproducible)
+
+        Same inputs give the same package (byte for byte).
         """
 
         # Compute missing parameters values
         if app_version is None:
             app_version = "sha-" + \
                 get_stdout(
-                    execute("git", ["rev-parse", "--short=7", "HEAD"], capture_output=True)
+                    execute(
+                        "git",
+                        ["rev-parse", "--short=7", "HEAD"],
+                        product_path=os.fspath(self.core.product_path),
+                        capture_output=True
+                    )
                 )
 
         if description is None:
@@ -185,6 +213,7 @@ class Helm():
                 execute(
                     'git',
                     ['log', '--pretty=format:"%s"', '--no-decorate', '-n', '1', 'HEAD'],
+                    product_path=os.fspath(self.core.product_path),
                     capture_output=True
                 )
             )
@@ -213,14 +242,16 @@ class Helm():
 
         logging.info('Creating NoOps Helm Package: %s-%s', self.chart_name, chart["version"])
 
+        # generated documents are packaged, the chart directory is left untouched
+        documents = {}
+
         logging.info("Generated Chart.yaml")
-        io.write_yaml(chart_file, chart, dry_run=self.core.is_dry_run())
+        documents["Chart.yaml"] = yaml.dump(chart, indent=settings.DEFAULT_INDENT)
 
         # Values.yaml
         if values is not None:
             # Values.yaml
-            chart_values_file = self.config["chart"] / "values.yaml"
-            chart_values = io.read_yaml(chart_values_file)
+            chart_values = io.read_yaml(self.config["chart"] / "values.yaml")
 
             # Values from parameters
             override_values = io.read_yaml(values)
@@ -229,7 +260,7 @@ class Helm():
             chart_values = containers.deep_merge(chart_values, override_values)
 
             logging.info("Generated Values.yaml")
-            io.write_yaml(chart_values_file, chart_values, dry_run=self.core.is_dry_run())
+            documents["values.yaml"] = yaml.dump(chart_values, indent=settings.DEFAULT_INDENT)
 
         # noops.yaml chart
         kchart = ChartKind(
@@ -243,40 +274,48 @@ class Helm():
                 }
             }
         )
-        noops_file = self.config["chart"] / settings.DEFAULT_NOOPS_FILE
-        io.write_yaml(noops_file, kchart.dict(by_alias=True), dry_run=self.core.is_dry_run())
-
-        execute(
-            "helm",
-            [
-                "package",
-                os.fspath(self.config["chart"]),
-                "-d",
-                os.fspath(self.core.workdir)
-            ],
-            dry_run=self.core.is_dry_run()
-        )
+        documents[settings.DEFAULT_NOOPS_FILE] = yaml.dump(
+            kchart.dict(by_alias=True), indent=settings.DEFAULT_INDENT)
+
+        package = self.core.workdir / f"{self.chart_name}-{chart['version']}.tgz"
+
+        if self.core.is_dry_run():
+            for name, content in documents.items():
+                print(f"# {name}\n{content}")
+            return package
+
+        if io.write_chunks_if_changed(
+            package, package_chunks(self.config["chart"], self.chart_name, documents)):
+            logging.info("Package %s created", package.name)
+        else:
+            logging.info("Package %s is unchanged", package.name)
+
+        # used by push
+        io.write_if_changed(self.core.workdir / settings.HELM_PACKAGE, package.name)
+
+        return package
 
     def push(self, directory: Path, url: str):
         """
         Copy package in a directory and index it
         """
 
-        # Chart.yaml
-        chart_file = self.config["chart"] / "Chart.yaml"
-        chart = io.read_yaml(chart_file)
-
-        package = chart["name"] + "-" + chart["version"] + ".tgz"
-
-        shutil.copy(
-            self.core.workdir / package,
-            directory
-        )
+        # last package created
+        try:
+            package = (self.core.workdir / settings.HELM_PACKAGE).read_text(encoding="UTF-8")
+        except FileNotFoundError:
+            chart = io.read_yaml(self.config["chart"] / "Chart.yaml")
+            package = chart["name"] + "-" + chart["version"] + ".tgz"
+
+        # an identical package is not published again
+        if io.file_digest(directory / package) != io.file_digest(self.core.workdir / package):
+            shutil.copy(
+                self.core.workdir / package,
+                directory
+            )
 
-        execute(
-            "helm",
-            [ "repo", "index", os.fspath(directory), "--url", url ]
-        )
+        # incremental (helm repo index reads all packages)
+        index_packages(directory, url, [directory / package])
 
     @classmethod
     def helm_values_args(cls, env: str, dst: Path) -> List[str]:
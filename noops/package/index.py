@@ -0,0 +1,202 @@
+"""
+Chart repository index (helm repo index)
+"""
+
+# Copyright 2021 Croix Bleue du Québec
+
+# This file is part of python-noops.
+
+# python-noops is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# python-noops is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import logging
+import re
+import tarfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+import yaml
+from ..utils import io
+from ..utils.lock import file_lock
+from ..errors import PackageInvalid
+
+INDEX = "index.yaml"
+DIGESTS = ".index-digests.json"
+LOCK = ".index.lock"
+
+# timestamps are kept as strings (RFC3339 as written by helm)
+_SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+class IndexLoader(_SafeLoader): # pylint: disable=too-many-ancestors
+    """yaml loader without timestamps"""
+
+IndexLoader.yaml_implicit_resolvers = {
+    first: [ i for i in resolvers if i[0] != "tag:yaml.org,2002:timestamp" ]
+    for first, resolvers in _SafeLoader.yaml_implicit_resolvers.items()
+}
+
+_SEMVER = re.compile(
+    r"^v?(?P<major>\d+)(?:\.(?P<minor>\d+))?(?:\.(?P<patch>\d+))?"
+    r"(?:-(?P<prerelease>[0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.+-]*)?$"
+)
+
+def semver_key(version: str) -> tuple:
+    """
+    Sort key (semantic versioning precedence, build metadata ignored)
+
+    Invalid versions are lower than all valid versions
+    """
+    match = _SEMVER.match(str(version))
+    if match is None:
+        return (0, str(version))
+
+    prerelease = match["prerelease"]
+    return (
+        1,
+        int(match["major"]), int(match["minor"] or 0), int(match["patch"] or 0),
+        # a release is greater than its prereleases
+        prerelease is None,
+        tuple(
+            (1, int(i), "") if i.isdigit() else (2, 0, i)
+            for i in (prerelease or "").split(".") if i != ""
+        )
+    )
+
+def chart_metadata(package: Path) -> dict:
+    """Chart.yaml of a helm package"""
+    with tarfile.open(package, "r:gz") as tar:
+        for member in tar:
+            parts = member.name.split("/")
+            if len(parts) == 2 and parts[1] == "Chart.yaml" and member.isfile():
+                return yaml.load(tar.extractfile(member), Loader=IndexLoader)
+
+    raise PackageInvalid(package)
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class DigestCache():
+    """
+    Packages digest per (mtime, size) stored next to the index
+    """
+    def __init__(self, directory: Path):
+        self._path = directory / DIGESTS
+        try:
+            self._digests: Dict[str, dict] = json.loads(self._path.read_text(encoding="UTF-8"))
+        except (FileNotFoundError, ValueError):
+            self._digests = {}
+
+    def digest(self, directory: Path, package: Path) -> str:
+        """Package digest (computed only if the package changed)"""
+        stat = package.stat()
+        key = package.relative_to(directory).as_posix()
+        cached = self._digests.get(key)
+        if cached is not None and \
+            cached["mtime"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            return cached["digest"]
+
+        digest = io.file_digest(package)
+        self._digests[key] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "digest": digest}
+        return digest
+
+    def keep(self, keys: Iterable[str]):
+        """Forget packages that do not exist anymore"""
+        keys = set(keys)
+        self._digests = { k: v for k, v in self._digests.items() if k in keys }
+
+    def save(self):
+        """Store the cache (atomic)"""
+        io.write_atomic(
+            self._path,
+            json.dumps(self._digests, sort_keys=True).encode("UTF-8")
+        )
+
+def read_index(directory: Path) -> Optional[dict]:
+    """index.yaml of a chart repository (None if it does not exist)"""
+    try:
+        with open(directory / INDEX, "r", encoding="UTF-8") as file:
+            return yaml.load(file, Loader=IndexLoader)
+    except FileNotFoundError:
+        return None
+
+def _entry(directory: Path, package: Path, url: Optional[str], digest: str,
+    created: Dict[Tuple[str, str, str], str]) -> dict:
+    """Index entry for a package"""
+    metadata = chart_metadata(package)
+    metadata.setdefault("apiVersion", "v1")
+
+    path = package.relative_to(directory).as_posix()
+    return {
+        **metadata,
+        "created": created.get(
+            (metadata["name"], str(metadata["version"]), digest), _now()),
+        "digest": digest,
+        "urls": [ f"{url.rstrip('/')}/{path}" if url else path ]
+    }
+
+def index_packages(directory: Path, url: str, packages: Iterable[Path] = None) -> dict:
+    """
+    Update index.yaml of a chart repository (concurrent updates are serialized)
+
+    packages: packages to add to the current index (one digest per package).
+    All packages are indexed if None or if there is no index yet (rebuild).
+    Digests of unchanged packages (mtime, size) are not computed again on a rebuild.
+    """
+    directory = Path(directory)
+
+    with file_lock(directory / LOCK):
+        index = read_index(directory)
+        digests = DigestCache(directory)
+
+        # created timestamps are kept for identical packages
+        created = {
+            (name, str(entry["version"]), entry.get("digest")): entry.get("created")
+            for name, entries in ((index or {}).get("entries") or {}).items()
+            for entry in entries
+        }
+
+        if packages is None or index is None:
+            logging.info("indexing all packages in %s", directory)
+            packages = sorted(directory.rglob("*.tgz"))
+            digests.keep(i.relative_to(directory).as_posix() for i in packages)
+            index = {"apiVersion": "v1", "entries": {}}
+
+        entries = index.setdefault("entries", {})
+        if entries is None:
+            entries = index["entries"] = {}
+
+        names = set()
+        for package in packages:
+            package = Path(package).resolve()
+            entry = _entry(directory.resolve(), package, url,
+                digests.digest(directory.resolve(), package), created)
+
+            versions = entries.setdefault(entry["name"], [])
+            versions[:] = [ i for i in versions if str(i["version"]) != str(entry["version"]) ]
+            versions.append(entry)
+            names.add(entry["name"])
+
+        for name in names:
+            entries[name].sort(
+                key=lambda i: (semver_key(i["version"]), i.get("created") or ""), reverse=True)
+
+        index["generated"] = _now()
+
+        io.write_atomic(
+            directory / INDEX,
+            yaml.dump(index, Dumper=io.Dumper, indent=2).encode("UTF-8")
+        )
+        digests.save()
+
+    return index
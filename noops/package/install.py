@@ -20,26 +20,35 @@ Helm install
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
+import hashlib
 import json
 import os
-import threading
-import tarfile
+import subprocess
+import time
 from enum import IntEnum
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import List, Union, Optional, Tuple
+from typing import Dict, List, Union, Optional, Tuple
 from ..typing.targets import TargetsEnum
 from ..typing.profiles import ProfileEnum
-from ..typing.charts import ChartKind
-from ..typing.projects import ProjectKind, InstallSpec, ProjectReconciliationPlan
+from ..typing.charts import ChartKind, PreProcessingStep
+from ..typing.projects import ProjectKind, InstallSpec, ProjectReconciliationPlan, \
+    CanaryWeightsEnum
 from ..typing.versions import OneSpec, MultiSpec
+from ..typing import fingerprint, fingerprints
 from ..utils.external import execute, get_stdout
-from ..utils.io import read_yaml, write_yaml
+from ..utils.io import read_yaml, write_yaml, file_digest, directory_digest
 from ..utils.transformation import label_rfc1035
+from ..utils.lock import file_lock
 from ..targets import Targets
 from ..profiles import Profiles
 from ..package.helm import Helm
 from ..package.svcat import ServiceCatalog
+from ..package.upgrades import UpgradeCache
+from ..package.repositories import RepoUpdateStamp
+from ..package.preprocessing import run_steps
+from ..package.packager import EXTRACTED_PACKAGES
+from ..external.plugins import preprocessing_plugin
 from ..errors import ChartNotFound, KustomizeStructure
 from .. import settings
 
@@ -48,15 +57,26 @@ class HelmRepoUpdate(IntEnum):
     NOT_UPDATED=0
     UPDATED=1
 
-class HelmInstall():
+class HelmInstall(): # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """
     Manages Helm upgrade/install and everything around that process
     """
-    LOCK = threading.Lock()
-
-    def __init__(self, dry_run: bool, kube_context: str = None):
+    def __init__(self, dry_run: bool, kube_context: str = None, skip_unchanged: bool = False, # pylint: disable=too-many-arguments
+        force: bool = False, release_cache: bool = False):
+        """
+        skip_unchanged: compare upgrades with the live state (release_cache) and
+                        skip uninstalls of releases not installed
+        force: always run helm upgrade (even if identical to the last successful one)
+        release_cache: store/read the last upgrade digest in the helm release too
+        """
         self._dry_run = dry_run
         self._kube_context = kube_context
+        self._skip_unchanged = skip_unchanged
+        self._force = force
+        self._release_cache = release_cache or skip_unchanged
+        self._releases: Dict[str, Dict[str, dict]] = {}
+        self._upgrades = UpgradeCache()
+        self._current_kube_context = None
 
     @property
     def dry_run(self) -> bool:
@@ -77,22 +97,253 @@ class HelmInstall():
             self._kube_context
         ]
 
+    @property
+    def kube_context(self) -> Optional[str]:
+        """
+        Kube context used by helm (--kube-context or the current context of the kubeconfig)
+        """
+        if self._kube_context is not None:
+            return self._kube_context
+
+        if self._current_kube_context is None:
+            self._current_kube_context = self.current_kube_context()
+
+        return self._current_kube_context
+
+    @classmethod
+    def current_kube_context(cls) -> Optional[str]:
+        """
+        current-context of the kubeconfig (KUBECONFIG or ~/.kube/config)
+
+        The first file that sets it wins (same merge rule as kubectl)
+        """
+        kubeconfigs = os.environ.get("KUBECONFIG") or os.fspath(Path("~/.kube/config"))
+
+        for kubeconfig in kubeconfigs.split(os.pathsep):
+            if not kubeconfig:
+                continue
+            try:
+                current_context = (read_yaml(Path(kubeconfig).expanduser()) or {}) \
+                    .get("current-context")
+            except OSError:
+                continue
+            if current_context:
+                return current_context
+
+        return None
+
+    @property
+    def skip_unchanged(self) -> bool:
+        """Do we skip releases already deployed with the same inputs ?"""
+        return self._skip_unchanged
+
+    def releases(self, namespace: str) -> Dict[str, dict]:
+        """
+        Releases in a namespace (read once per namespace)
+
+        helm list --all --max 0 -o json (not limited to the first 256 releases)
+        """
+        if namespace not in self._releases:
+            self._releases[namespace] = {
+                release["name"]: release
+                for release in json.loads(
+                    get_stdout(
+                        execute(
+                            "helm",
+                            [
+                                "list", "--all",
+                                "--max", "0",
+                                "--namespace", namespace,
+                                "-o", "json"
+                            ] + self.global_flags(),
+                            capture_output=True
+                        )
+                    ) or "[]"
+                )
+            }
+
+        return self._releases[namespace]
+
+    def release_exists(self, namespace: str, release: str) -> bool:
+        """
+        Is the release installed ?
+
+        A release missing from the releases list is confirmed with helm status
+        """
+        if release in self.releases(namespace):
+            return True
+
+        try:
+            execute(
+                "helm",
+                [
+                    "status", release,
+                    "--namespace", namespace
+                ] + self.global_flags(),
+                capture_output=True
+            )
+        except subprocess.CalledProcessError:
+            return False
+
+        return True
+
+    def last_revision(self, namespace: str, release: str) -> Optional[dict]:
+        """
+        Last revision of a release (None if the release does not exist)
+
+        helm history --max 1 -o json
+        """
+        try:
+            history = json.loads(
+                get_stdout(
+                    execute(
+                        "helm",
+                        [
+                            "history", release,
+                            "--namespace", namespace,
+                            "--max", "1",
+                            "-o", "json"
+                        ] + self.global_flags(),
+                        capture_output=True
+                    )
+                ) or "[]"
+            )
+        except subprocess.CalledProcessError:
+            # release not found
+            return None
+
+        return history[-1] if len(history) > 0 else None
+
     @classmethod
-    def update(cls):
+    def _description_digest(cls, revision: Optional[dict], prefix: str) -> Optional[str]:
+        """Digest stored (prefix:digest) in the description of a revision"""
+        for token in ((revision or {}).get("description") or "").split():
+            if token.startswith(prefix):
+                return token[len(prefix):]
+
+        return None
+
+    def _recorded_revision(self, namespace: str, release: str, revision: Optional[dict]):
+        """Keep the releases list up to date after an upgrade or an uninstall"""
+        if namespace not in self._releases:
+            return
+
+        if revision is None:
+            self._releases[namespace].pop(release, None)
+        else:
+            self._releases[namespace][release] = {
+                "name": release,
+                "namespace": namespace,
+                "revision": str(revision.get("revision")),
+                "status": revision.get("status")
+            }
+
+    def upgrade_digest(self, namespace: str, release: str, chart: Path, # pylint: disable=too-many-arguments
+        values: List[Union[str, Path]], cargs: List[str], extra_envs: Optional[dict] = None) -> str:
         """
-        Update repositories
+        Digest of an upgrade (computed after pre-processing)
+
+        chart content, ordered values files, args, environment variables,
+        kube-context, namespace and release
+        """
+        def values_key(values_file: Path) -> str:
+            try:
+                return values_file.relative_to(chart).as_posix()
+            except ValueError:
+                return os.fspath(values_file)
+
+        return hashlib.sha256(
+            json.dumps(
+                {
+                    "chart": directory_digest(chart),
+                    "values": [
+                        [ values_key(Path(i)), file_digest(i) ] for i in values
+                    ],
+                    "args": cargs,
+                    "envs": extra_envs,
+                    "kube-context": self.kube_context,
+                    "namespace": namespace,
+                    "release": release
+                },
+                sort_keys=True
+            ).encode("UTF-8")
+        ).hexdigest()
+
+    def is_upgrade_done(self, namespace: str, release: str, digest: str) -> bool:
+        """
+        Is this upgrade identical to the last successful one ?
+
+        The last revision of the release (helm list, once per namespace) must
+        still be the recorded one: a rollback, an uninstall or an upgrade done
+        somewhere else invalidates the cache.
 
-        helm repo update
+        With release_cache, a digest missing from the local cache is read from
+        the release description (helm history, only for those releases).
         """
+        if self._force:
+            return False
+
+        cached = self._upgrades.get(self.kube_context, namespace, release)
+        if (cached is None or cached[0] != digest) and not self._release_cache:
+            return False
+
+        deployed = self.releases(namespace).get(release)
+        if deployed is None or deployed.get("status") != "deployed":
+            return False
+
+        if cached == (digest, int(deployed.get("revision") or 0)):
+            return True
+
+        last = self.last_revision(namespace, release) if self._release_cache else None
+        if last is not None and last.get("status") == "deployed" and \
+            self._description_digest(last, settings.HELM_UPGRADE_DESCRIPTION) == digest:
+            # local cache is not up to date (eg: new runner)
+            if not self.dry_run:
+                self._upgrades.set(
+                    self.kube_context, namespace, release, digest, last.get("revision"))
+            return True
+
+        return False
+
+    @classmethod
+    def update(cls, repository: Optional[str] = None):
+        """
+        Update repositories (or only one)
+
+        helm repo update [repository]
+
+        Serialized between noopsctl processes. Skipped if an update finished
+        recently or while we were waiting for the lock.
+        """
+        requested = time.time()
+        stamp = RepoUpdateStamp()
+
+        with file_lock(stamp.lock):
+            if stamp.is_fresh(repository, requested):
+                logging.info("repositories are up to date (update skipped)")
+                return
+
+            if repository is not None:
+                logging.info("update repository %s", repository)
+                try:
+                    _ = execute(
+                        "helm",
+                        ["repo", "update", repository],
+                        capture_output=True
+                    )
+                    stamp.set(repository, time.time())
+                    return
+                except subprocess.CalledProcessError:
+                    # not a repository (or helm < 3.7)
+                    logging.warning("unable to update %s, updating all repositories", repository)
 
-        # protect helm repo update to avoid conflict (shared setup)
-        with HelmInstall.LOCK:
             logging.info("update repositories")
             _ = execute(
                 "helm",
                 ["repo", "update"],
                 capture_output=True
             )
+            stamp.set(None, time.time())
 
     @classmethod
     def search_latest(cls, keyword: str) -> dict:
@@ -116,7 +367,8 @@ class HelmInstall():
             )
             if len(charts) == 0:
                 if state == HelmRepoUpdate.NOT_UPDATED:
-                    cls.update()
+                    # repo/chart: only the repository is updated
+                    cls.update(keyword.split("/")[0] if "/" in keyword else None)
                 else:
                     raise ChartNotFound(keyword)
             else:
@@ -155,39 +407,25 @@ class HelmInstall():
         """
         logging.debug("untar local package %s", os.fspath(pkg))
 
-        with tarfile.open(pkg, "r:gz") as tar:
-            def is_within_directory(directory, target):
-                
-                abs_directory = os.path.abspath(directory)
-                abs_target = os.path.abspath(target)
-            
-                prefix = os.path.commonprefix([abs_directory, abs_target])
-                
-                return prefix == abs_directory
-            
-            def safe_extract(tar, path=".", members=None, *, numeric_owner=False):
-            
-                for member in tar.getmembers():
-                    member_path = os.path.join(path, member.name)
-                    if not is_within_directory(path, member_path):
-                        raise Exception("Attempted Path Traversal in Tar File")
-            
-                tar.extractall(path, members, numeric_owner=numeric_owner) 
-                
-            
-            safe_extract(tar, dst)
-
-        return list(dst.glob("*"))[0]
-
-    def upgrade(self, namespace: str, release: str, chart: Union[str,Path], env: str, # pylint: disable=too-many-arguments,too-many-locals
+        # extracted once per package content (eg: same package on multiple clusters)
+        return EXTRACTED_PACKAGES.checkout(pkg, dst)
+
+    def upgrade(self, namespace: str, release: str, chart: Union[str,Path,dict], env: str, # pylint: disable=too-many-arguments,too-many-locals
         pre_processing_path: Path, profiles: List[ProfileEnum], cargs: List[str],
         extra_envs: dict = None, target: TargetsEnum = None):
         """
         helm upgrade {release} {chart} ...
+
+        chart is a keyword to search, a chart already found (search_latest) or a local package
         """
 
         # Get the chart
-        pkg = self.search_latest(chart) if isinstance(chart, str) else None
+        if isinstance(chart, dict):
+            pkg = chart
+        elif isinstance(chart, str):
+            pkg = self.search_latest(chart)
+        else:
+            pkg = None
 
         logging.info(
             "Installation of %s in namespace %s (chart: %s)",
@@ -212,29 +450,55 @@ class HelmInstall():
                 chartkind.spec.package.supported.target_classes, target, env, dst)
 
             # kustomize
-            kustomize_helm_args, pp_kustomize_args = self._kustomize(dst, env)
+            kustomize_helm_args, pp_kustomize_args, hpr_envs = self._kustomize(dst, env)
 
             # Service Catalog - template file
             _svcat_template = ServiceCatalog.get_svcat_template_path(dst)
             pp_svcat_args = ["-t", os.fspath(_svcat_template)] if _svcat_template.exists() else []
 
-            # pre-processing
+            # pre-processing (dependencies graph)
             # args to pass: -e env -c chart_dir -f values1.yaml -f valuesN.yaml -t tpl1.yaml ...
-            for pre_processing in chartkind.spec.package.helm.preprocessing:
-                _ = execute(
-                    os.fspath(pre_processing_path / pre_processing),
-                    [ "-e", env, "-c", os.fspath(dst) ] + \
-                        values_args + pp_svcat_args + pp_kustomize_args,
-                    extra_envs=extra_envs,
-                    product_path=os.fspath(dst),
-                    dry_run=self.dry_run,
-                    capture_output=True
-                )
+            pp_args = [ "-e", env, "-c", os.fspath(dst) ] + \
+                values_args + pp_svcat_args + pp_kustomize_args
+            def pre_process(step: PreProcessingStep):
+                plugin = preprocessing_plugin(step.script)
+                if plugin is None:
+                    execute(
+                        os.fspath(pre_processing_path / step.script),
+                        pp_args,
+                        extra_envs=extra_envs,
+                        product_path=os.fspath(dst),
+                        dry_run=self.dry_run,
+                        capture_output=True,
+                        timeout=step.timeout
+                    )
+                elif not self.dry_run:
+                    # in-process (no timeout)
+                    plugin.with_envs(extra_envs).apply(
+                        env,
+                        dst,
+                        [ Path(i) for i in values_args[1::2] ],
+                        [ Path(i) for i in pp_svcat_args[1::2] ],
+                        [ Path(i) for i in pp_kustomize_args[1::2] ]
+                    )
+
+            run_steps(chartkind.spec.package.helm.preprocessing_steps(), pre_process)
 
             # Profiles
             values_args += Profiles.helm_profiles_args(
                 chartkind.spec.package.supported.profile_classes, profiles, dst)
 
+            # identical to the last successful upgrade ? (final chart and values files)
+            digest = self.upgrade_digest(
+                namespace, release, dst, values_args[1::2], cargs, extra_envs)
+            if self.is_upgrade_done(namespace, release, digest):
+                logging.info("%s is up to date in namespace %s (skipped)", release, namespace)
+                return
+
+            # digest stored in the release (shared between runners)
+            description = ["--description", settings.HELM_UPGRADE_DESCRIPTION + digest] \
+                if self._release_cache else []
+
             # let's go !
             _ = execute(
                 "helm",
@@ -245,11 +509,20 @@ class HelmInstall():
                     "--install",
                     "--create-namespace",
                     "--namespace", namespace
-                ] + self.global_flags() + values_args + kustomize_helm_args + cargs,
+                ] + self.global_flags() + values_args + kustomize_helm_args + cargs + description,
+                extra_envs=hpr_envs,
                 dry_run=self.dry_run,
                 capture_output=True
             )
 
+            if not self.dry_run:
+                last = self.last_revision(namespace, release)
+                self._recorded_revision(namespace, release, last)
+                self._upgrades.set(
+                    self.kube_context, namespace, release, digest,
+                    last.get("revision") if last is not None else None
+                )
+
     def uninstall(self, namespace: str, release: str):
         """
         Uninstall a release
@@ -267,6 +540,10 @@ class HelmInstall():
             capture_output=True
         )
 
+        if not self.dry_run:
+            self._recorded_revision(namespace, release, None)
+            self._upgrades.delete(self.kube_context, namespace, release)
+
     @classmethod
     def _chart_kind(cls, dst: Path) -> ChartKind: # pragma: no cover
         """
@@ -285,12 +562,10 @@ class HelmInstall():
         plan = self._reconciliation_plan(kproject, kprevious)
 
         for version in plan.removed:
-            if isinstance(version, OneSpec):
-                release = kproject.metadata.name
-            else:
-                release = f"{kproject.metadata.name}-{version.app_version}"
-
-            self._reconciliation_uninstall(kproject.metadata.namespace, release)
+            self._reconciliation_uninstall(
+                kproject.metadata.namespace,
+                self._reconciliation_release(kproject, version)
+            )
 
         if plan.removed_canary:
             self._reconciliation_uninstall(
@@ -303,7 +578,7 @@ class HelmInstall():
                 # versions.one
                 self._reconciliation_upgrade(
                     kproject.metadata.namespace,
-                    kproject.metadata.name,
+                    self._reconciliation_release(kproject, version),
                     kproject.spec.package.install,
                     version,
                     pre_processing_path
@@ -312,14 +587,14 @@ class HelmInstall():
                 # one entry in versions.multi
                 self._reconciliation_upgrade(
                     kproject.metadata.namespace,
-                    f"{kproject.metadata.name}-{version.app_version}",
+                    self._reconciliation_release(kproject, version),
                     kproject.spec.package.install,
                     version,
                     pre_processing_path,
                     cargs=self._helm_canary_weight(
                         settings.DEFAULT_PKG_HELM_DEFINITIONS["keys"]["canary"] + ".weight",
                         version.weight
-                    )
+                    ) if not self._router_weights(kproject) else None
                 )
 
         if plan.canary_versions is not None:
@@ -337,6 +612,75 @@ class HelmInstall():
                 )
             )
 
+    @classmethod
+    def _reconciliation_release(cls, kproject: ProjectKind,
+        version: Union[OneSpec, MultiSpec, None] = None) -> str:
+        """
+        Release name used for a version (None for the canary release)
+        """
+        if version is None or isinstance(version, OneSpec):
+            return kproject.metadata.name
+
+        return f"{kproject.metadata.name}-{version.app_version}"
+
+    @classmethod
+    def describe_reconciliation(cls, kproject: ProjectKind, kprevious: ProjectKind) -> List[str]:
+        """
+        Helm actions planned by the reconciliation (without executing them)
+        """
+        plan = cls._reconciliation_plan(kproject, kprevious)
+        namespace = kproject.metadata.namespace
+        actions = []
+
+        for version in plan.removed:
+            release = label_rfc1035(cls._reconciliation_release(kproject, version))
+            actions.append(f"uninstall {namespace}/{release}")
+
+        if plan.removed_canary:
+            release = label_rfc1035(kproject.metadata.name)
+            actions.append(f"uninstall {namespace}/{release} (canary)")
+
+        for reason, versions in (("changed", plan.changed), ("added", plan.added)):
+            for version in versions:
+                actions.append(
+                    "upgrade {}/{} ({}, app_version {})".format( # pylint: disable=consider-using-f-string
+                        namespace,
+                        label_rfc1035(cls._reconciliation_release(kproject, version)),
+                        reason,
+                        version.app_version
+                    )
+                )
+
+        if plan.canary_versions is not None:
+            actions.append(
+                "upgrade {}/{} (canary, {})".format( # pylint: disable=consider-using-f-string
+                    namespace,
+                    label_rfc1035(kproject.metadata.name),
+                    ", ".join(f"{i.app_version}={i.weight}" for i in plan.canary_versions)
+                )
+            )
+
+        return actions
+
+    @classmethod
+    def _router_weights(cls, kproject: ProjectKind) -> bool:
+        """
+        Are canary weights set in the canary router release only ?
+        """
+        return kproject.spec.package.install.canary_weights == CanaryWeightsEnum.ROUTER
+
+    @classmethod
+    def _release_fingerprint(cls, version: Union[OneSpec, MultiSpec], router_weights: bool) -> str:
+        """
+        Fingerprint of what is deployed by a version release
+
+        With weights in the router, only the use of a weight (canary profiles) matters
+        """
+        if router_weights and isinstance(version, MultiSpec) and version.weight is not None:
+            return version.copy(update={"weight": 0}).fingerprint
+
+        return version.fingerprint
+
     @classmethod
     def _helm_canary_weight(cls, key: str, weight: Optional[int]) -> List[str]:
         """
@@ -368,20 +712,6 @@ class HelmInstall():
 
         return args if len(args) > 0 else None
 
-    @classmethod
-    def _reorder(cls, values: List, ordered: List) -> List:
-        """
-        Reorder a list of values based on an ordered list
-
-        list of values was previously a set that can change order.
-        We need to reorder those values that are an unorderd subset of ordered list
-
-        IMPORTANT: values is altered by sort
-        """
-        # TODO: Improve algorithm (not efficient)
-        values.sort(key=lambda value: ordered.index(value)) # pylint: disable=unnecessary-lambda
-        return values
-
     @classmethod
     def _reconciliation_plan(cls,
         current: ProjectKind, previous: ProjectKind) -> ProjectReconciliationPlan:
@@ -391,11 +721,18 @@ class HelmInstall():
 
         plan = ProjectReconciliationPlan()
 
+        # nothing has changed (fingerprints are cached on models)
+        if current.spec.fingerprint == previous.spec.fingerprint:
+            return plan
+
         # if package definition has changed, we will need to update everything
-        forced_change = (current.spec.package != previous.spec.package)
+        forced_change = (current.spec.package.fingerprint != previous.spec.package.fingerprint)
+
+        # weight changes only upgrade the canary router release
+        router_weights = cls._router_weights(current)
 
         # One
-        if current.spec.versions.one != previous.spec.versions.one:
+        if fingerprint(current.spec.versions.one) != fingerprint(previous.spec.versions.one):
             if current.spec.versions.one is None:
                 # remove
                 plan.removed.append(previous.spec.versions.one)
@@ -410,7 +747,7 @@ class HelmInstall():
             plan.changed.append(current.spec.versions.one)
 
         # Multi
-        if current.spec.versions.multi != previous.spec.versions.multi:
+        if fingerprints(current.spec.versions.multi) != fingerprints(previous.spec.versions.multi):
             if current.spec.versions.multi is None:
                 # remove all
                 for version in previous.spec.versions.multi:
@@ -420,46 +757,29 @@ class HelmInstall():
                 for version in current.spec.versions.multi:
                     plan.added.append(version)
             else:
-                # determine remove/add/change in the list
+                # determine remove/add/change in the list (single pass, order preserved)
 
                 # List to dict with primary key app_version
                 previous_multi_dict = {i.app_version: i for i in previous.spec.versions.multi}
                 current_multi_dict = {i.app_version: i for i in current.spec.versions.multi}
 
-                # Create sets of keys only
-                previous_multi_keys = set(previous_multi_dict)
-                current_multi_keys = set(current_multi_dict)
-
-                # Create list of keys only (ordered)
-                previous_multi_keys_ordered = list(previous_multi_dict)
-                current_multi_keys_ordered = list(current_multi_dict)
-
-                removed = list(
-                    map(
-                        lambda x: previous_multi_dict[x],
-                        # list(previous_multi_keys - current_multi_keys)
-                        cls._reorder(
-                            list(previous_multi_keys - current_multi_keys),
-                            previous_multi_keys_ordered)
-                    )
-                )
-                added = list(
-                    map(
-                        lambda x: current_multi_dict[x],
-                        # list(current_multi_keys - previous_multi_keys)
-                        cls._reorder(
-                            list(current_multi_keys - previous_multi_keys),
-                            current_multi_keys_ordered)
-                    )
-                )
+                # removed: previous order
+                removed = [
+                    version for key, version in previous_multi_dict.items()
+                    if key not in current_multi_dict
+                ]
 
+                # added/changed: current order
+                added = []
                 changed = []
-                for key in cls._reorder(
-                    list(current_multi_keys & previous_multi_keys),
-                    current_multi_keys_ordered):
-
-                    if forced_change or current_multi_dict[key] != previous_multi_dict[key]:
-                        changed.append(current_multi_dict[key])
+                for key, version in current_multi_dict.items():
+                    previous_version = previous_multi_dict.get(key)
+                    if previous_version is None:
+                        added.append(version)
+                    elif forced_change or \
+                        cls._release_fingerprint(version, router_weights) != \
+                        cls._release_fingerprint(previous_version, router_weights):
+                        changed.append(version)
 
                 plan.removed.extend(removed)
                 plan.added.extend(added)
@@ -487,7 +807,8 @@ class HelmInstall():
 
         if len_previous_canary_versions > 0: # was used
             if len_current_canary_versions > 0: # still used
-                if forced_change or previous_canary_versions != current_canary_versions:
+                if forced_change or \
+                    fingerprints(previous_canary_versions) != fingerprints(current_canary_versions):
                     plan.canary_versions = current_canary_versions
             else: # not used anymore
                 plan.removed_canary = True
@@ -549,13 +870,22 @@ class HelmInstall():
         """
         Run uninstall
         """
+        if self.skip_unchanged and not self.release_exists(namespace, label_rfc1035(release)):
+            logging.info("%s is not installed in namespace %s (skipped)",
+                label_rfc1035(release), namespace)
+            return
+
         self.uninstall(
             namespace,
             label_rfc1035(release)
         )
 
     @classmethod
-    def _kustomize(cls, dst: Path, env: str) -> Tuple[List,List]:
+    def _kustomize(cls, dst: Path, env: str) -> Tuple[List,List,dict]:
+        """
+        Helm post-renderer arguments, pre-processing arguments and
+        environment variables for the post-renderer
+        """
         kustomize = dst / "kustomize"
         kustomize_base = kustomize / "base"
         kustomize_env = kustomize / env
@@ -566,13 +896,15 @@ class HelmInstall():
             kustomize_base = None
 
         if not kustomize_env and not kustomize_base:
-            return [],[]
+            return [],[],{}
         if kustomize_env and not kustomize_base:
             raise KustomizeStructure()
 
         # Helm post-renderer can't use arguments so we need to store kustomize path prior
-        # This file will be read by noopshpr to run kustomize in it
-        hpr = Path(settings.DEFAULT_WORKDIR) / settings.DEFAULT_NOOPS_HPR
+        # This file will be read by noopshpr to run kustomize in it.
+        # The file is stored next to the chart (unique per install) and
+        # noopshpr finds it with NOOPS_HPR.
+        hpr = dst.parent / settings.DEFAULT_NOOPS_HPR
         hpr_content = {
             "base": kustomize_base,
             "kustomize": kustomize_env or kustomize_base
@@ -583,13 +915,16 @@ class HelmInstall():
             "--post-renderer",
             "noopshpr"
         ]
+        hpr_envs = {
+            "NOOPS_HPR": os.fspath(hpr)
+        }
 
         if kustomize_env is not None:
             return post_renderer, [
                 "-k", os.fspath(kustomize_base),
                 "-k", os.fspath(kustomize_env)
-            ]
+            ], hpr_envs
 
         return post_renderer, [
             "-k", os.fspath(kustomize_base)
-        ]
+        ], hpr_envs
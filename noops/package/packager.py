@@ -0,0 +1,297 @@
+"""
+Helm package (reproducible chart archive)
+
+Builds the chart .tgz like 'helm package' without touching the chart directory.
+Generated documents (Chart.yaml, values.yaml, ...) are provided in memory.
+
+Extracts packages safely (one pass) and only once per content.
+"""
+
+# Copyright 2021 Croix Bleue du Québec
+
+# This file is part of python-noops.
+
+# python-noops is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# python-noops is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import gzip
+import logging
+import posixpath
+import shutil
+import tarfile
+import threading
+from fnmatch import fnmatchcase
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from ..utils.io import file_digest
+from ..errors import PackageInvalid, PackageUnsafe
+from .. import settings
+
+HELMIGNORE = ".helmignore"
+
+# helm ignores hidden files in templates/
+DEFAULT_IGNORE = ["templates/.?*"]
+
+# fixed metadata to get the same archive from the same inputs
+MTIME = 0
+FILE_MODE = 0o644
+EXECUTABLE_MODE = 0o755
+
+class HelmIgnore():
+    """
+    .helmignore rules
+
+    Glob patterns matched against the path relative to the chart directory
+    (or the base name for patterns without '/'), a trailing '/' matches
+    directories only and '!' negates a pattern. The last matching rule wins.
+    """
+    def __init__(self, lines: List[str] = None):
+        self._rules: List[Tuple[str, bool, bool]] = []
+        for line in DEFAULT_IGNORE + (lines or []):
+            self.add(line)
+
+    @classmethod
+    def from_directory(cls, chart_dir: Path) -> "HelmIgnore":
+        """Rules of a chart directory (defaults only if there is no .helmignore)"""
+        try:
+            lines = (chart_dir / HELMIGNORE).read_text(encoding="UTF-8").splitlines()
+        except FileNotFoundError:
+            lines = []
+        return cls(lines)
+
+    def add(self, line: str):
+        """Add a rule (comments and empty lines are skipped)"""
+        line = line.strip()
+        if line == "" or line.startswith("#"):
+            return
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+
+        directory_only = line.endswith("/")
+        pattern = line.strip("/")
+        if pattern != "":
+            self._rules.append((pattern, negate, directory_only))
+
+    def ignored(self, path: str, is_dir: bool = False) -> bool:
+        """Is path (posix, relative to the chart directory) ignored ?"""
+        ignored = False
+        name = path.rsplit("/", 1)[-1]
+        for pattern, negate, directory_only in self._rules:
+            if directory_only and not is_dir:
+                continue
+            if fnmatchcase(path if "/" in pattern else name, pattern):
+                ignored = not negate
+        return ignored
+
+def chart_files(chart_dir: Path, helmignore: HelmIgnore = None) -> Iterator[Tuple[str, Path]]:
+    """
+    Files to package (relative posix path, path) in a stable order
+    """
+    chart_dir = Path(chart_dir)
+    if helmignore is None:
+        helmignore = HelmIgnore.from_directory(chart_dir)
+
+    for root, dirnames, filenames in os.walk(chart_dir, followlinks=True):
+        relative = Path(root).relative_to(chart_dir).as_posix()
+        prefix = "" if relative == "." else relative + "/"
+
+        # pruned in place so ignored directories are never visited
+        dirnames[:] = sorted(
+            d for d in dirnames if not helmignore.ignored(prefix + d, is_dir=True)
+        )
+
+        for filename in sorted(filenames):
+            if not helmignore.ignored(prefix + filename):
+                yield prefix + filename, Path(root) / filename
+
+class _Chunks():
+    """Write-only file object keeping what has been written until it is popped"""
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        """Keep data"""
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        """Nothing to flush"""
+
+    def pop(self) -> bytes:
+        """What has been written since the last call"""
+        chunk = b"".join(self._chunks)
+        self._chunks.clear()
+        return chunk
+
+def _tarinfo(name: str, size: int, executable: bool = False) -> tarfile.TarInfo:
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = MTIME
+    info.mode = EXECUTABLE_MODE if executable else FILE_MODE
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    return info
+
+def package_chunks(chart_dir: Path, name: str,
+    documents: Dict[str, Union[str, bytes]] = None) -> Iterator[bytes]:
+    """
+    Compressed chart archive (streamed)
+
+    Files are stored under '<name>/' in a stable order with fixed metadata.
+    documents (relative path: content) replace or add files of the chart directory.
+    """
+    documents = {
+        k: v.encode("UTF-8") if isinstance(v, str) else v
+        for k, v in (documents or {}).items()
+    }
+    entries = {
+        relative: path for relative, path in chart_files(chart_dir)
+        if relative not in documents
+    }
+    entries.update(documents)
+
+    out = _Chunks()
+    with gzip.GzipFile(filename="", mode="wb", fileobj=out, mtime=MTIME) as compressed:
+        with tarfile.open(fileobj=compressed, mode="w|", format=tarfile.GNU_FORMAT) as tar:
+            for relative in sorted(entries):
+                entry = entries[relative]
+                arcname = f"{name}/{relative}"
+                if isinstance(entry, bytes):
+                    tar.addfile(_tarinfo(arcname, len(entry)), BytesIO(entry))
+                else:
+                    with open(entry, "rb") as file:
+                        tar.addfile(
+                            _tarinfo(
+                                arcname,
+                                os.fstat(file.fileno()).st_size,
+                                os.access(entry, os.X_OK)
+                            ),
+                            file
+                        )
+                yield out.pop()
+    yield out.pop()
+
+def _safe_path(path: str) -> Optional[str]:
+    """Normalized relative posix path (None if it goes outside)"""
+    if path.startswith("/") or posixpath.splitdrive(path)[0] != "":
+        return None
+    path = posixpath.normpath(path)
+    if path == ".." or path.startswith("../"):
+        return None
+    return path
+
+# extraction filter (python >= 3.11.4 / 3.12), members are validated anyway
+_FILTER = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+
+def extract_package(package: Path, dst: Path) -> Path:
+    """
+    Extract a helm package in one pass (streamed) and return the chart directory
+
+    Members are validated before being extracted: absolute paths, '..',
+    symbolic links (helm packages never contain them, helm follows them),
+    hard links pointing outside of the chart and special files are rejected.
+    """
+    root = None
+    with tarfile.open(package, "r|gz") as tar:
+        for member in tar:
+            name = _safe_path(member.name)
+            if name is None or name == ".":
+                raise PackageUnsafe(package, member.name)
+
+            top = name.split("/")[0]
+            if root is None:
+                root = top
+            elif top != root:
+                raise PackageInvalid(package)
+
+            # a symbolic link could be a path component of a later member
+            # or link (eg: a -> . then b -> a/a/../..), so none is allowed
+            if member.islnk():
+                # relative to the archive root
+                target = _safe_path(member.linkname)
+            else:
+                target = root
+
+            if target is None or target.split("/")[0] != root or \
+                not (member.isfile() or member.isdir() or member.islnk()):
+                raise PackageUnsafe(package, member.name)
+
+            tar.extract(member, dst, **_FILTER)
+
+    if root is None:
+        raise PackageInvalid(package)
+
+    return Path(dst) / root
+
+class ExtractedPackages():
+    """
+    Packages extracted once per content (sha256) for the process lifetime
+
+    Each checkout is a private copy so pre-processing can modify it.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._charts: Dict[str, Path] = {}
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self._tmp: Optional[TemporaryDirectory] = None
+
+    def digest(self, package: Path) -> str:
+        """Package digest (computed again only if the package changed)"""
+        stat = os.stat(package)
+        key = (os.fspath(Path(package).resolve()), stat.st_mtime_ns, stat.st_size)
+        if key not in self._digests:
+            self._digests[key] = file_digest(package)
+        return self._digests[key]
+
+    def extracted(self, package: Path) -> Path:
+        """Chart directory of the package (extracted on first use)"""
+        with self._lock:
+            package_digest = self.digest(package)
+            if self._tmp is None:
+                self._tmp = TemporaryDirectory(prefix=settings.TMP_PREFIX)
+            lock = self._locks.setdefault(package_digest, threading.Lock())
+
+        with lock:
+            if package_digest not in self._charts:
+                logging.debug("extract package %s", os.fspath(package))
+                dst = Path(self._tmp.name) / package_digest
+                dst.mkdir()
+                try:
+                    self._charts[package_digest] = extract_package(package, dst)
+                except BaseException:
+                    shutil.rmtree(dst, ignore_errors=True)
+                    raise
+            return self._charts[package_digest]
+
+    def checkout(self, package: Path, dst: Path) -> Path:
+        """Private copy of the chart directory in dst"""
+        chart = self.extracted(package)
+        return Path(shutil.copytree(chart, Path(dst) / chart.name, symlinks=True))
+
+    def clear(self):
+        """Remove all extracted packages"""
+        with self._lock:
+            if self._tmp is not None:
+                self._tmp.cleanup()
+            self._tmp = None
+            self._charts.clear()
+            self._locks.clear()
+            self._digests.clear()
+
+EXTRACTED_PACKAGES = ExtractedPackages()
@@ -20,9 +20,9 @@ Prepare for packaging, ci, cd and deploy
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
-import shutil
 from pathlib import Path
 from ..noops import NoOps
+from ..utils import io
 from .helm import Helm
 from .svcat import ServiceCatalog
 
@@ -32,6 +32,9 @@ def prepare(core: NoOps, helm: Helm = None, chart_name: str = None):
 
     - Service Catalog
     - Helm values
+    - Embedded kustomize
+
+    Nothing depends on a white-label brand (done once for all brands)
     """
 
     if helm is None:
@@ -67,13 +70,10 @@ def embedded_kustomize(core: NoOps):
         logging.info("Using built-in kustomize")
         return
 
-    # Copy
+    # Incremental copy (unchanged files are not rewritten)
     logging.info("Embedding kustomize")
-    dst = values.parent / "kustomize"
-    if dst.exists():
-        shutil.rmtree(dst)
-
-    shutil.copytree(
+    changes = io.sync_directory(
         kustomize,
-        dst
+        values.parent / "kustomize"
     )
+    logging.debug("kustomize: %d change(s)", changes)
@@ -0,0 +1,106 @@
+"""
+Pre-processing steps (dependencies graph)
+"""
+
+# Copyright 2021 Croix Bleue du Québec
+
+# This file is part of python-noops.
+
+# python-noops is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# python-noops is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List
+from ..typing.charts import PreProcessingStep
+from ..errors import PreProcessingDependencies
+from .. import settings
+
+def check_steps(steps: List[PreProcessingStep]):
+    """
+    Unique names, known dependencies and no cycle
+    """
+    keys = [ step.key for step in steps ]
+    duplicates = sorted({ key for key in keys if keys.count(key) > 1 })
+    if len(duplicates) > 0:
+        raise PreProcessingDependencies(f"duplicated steps {', '.join(duplicates)}")
+
+    for step in steps:
+        unknowns = [ need for need in step.needs if need not in keys ]
+        if len(unknowns) > 0:
+            raise PreProcessingDependencies(f"{step.key} needs unknown {', '.join(unknowns)}")
+
+    # Kahn
+    pending = { step.key: set(step.needs) for step in steps }
+    ready = [ key for key, needs in pending.items() if len(needs) == 0 ]
+    while len(ready) > 0:
+        key = ready.pop()
+        del pending[key]
+        for other, needs in pending.items():
+            if key in needs:
+                needs.discard(key)
+                if len(needs) == 0:
+                    ready.append(other)
+
+    if len(pending) > 0:
+        raise PreProcessingDependencies(f"cycle between {', '.join(pending)}")
+
+def _timed(run: Callable[[PreProcessingStep], None], step: PreProcessingStep) -> float:
+    start = time.monotonic()
+    run(step)
+    return time.monotonic() - start
+
+def run_steps(steps: List[PreProcessingStep], run: Callable[[PreProcessingStep], None],
+    workers: int = None) -> Dict[str, float]:
+    """
+    Run steps as soon as their dependencies are done (at most workers at the same time)
+
+    workers defaults to NOOPS_PREPROCESSING_WORKERS (or 4).
+    The first failure cancels steps not started yet and is raised.
+    Returns the duration (seconds) per step.
+    """
+    check_steps(steps)
+
+    if workers is None:
+        workers = int(os.environ.get(
+            settings.PREPROCESSING_WORKERS_ENV, settings.PREPROCESSING_WORKERS))
+
+    by_key = { step.key: step for step in steps }
+    pending = { step.key: set(step.needs) for step in steps }
+    durations: Dict[str, float] = {}
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        running = {}
+        try:
+            while len(pending) > 0 or len(running) > 0:
+                # declaration order
+                for key in [ key for key, needs in pending.items() if len(needs) == 0 ]:
+                    del pending[key]
+                    running[pool.submit(_timed, run, by_key[key])] = key
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    durations[key] = future.result()
+                    for needs in pending.values():
+                        needs.discard(key)
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    for step in steps:
+        logging.info("pre-processing %s: %.3fs", step.key, durations[step.key])
+
+    return durations
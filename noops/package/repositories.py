@@ -0,0 +1,89 @@
+"""
+Helm repositories update (shared by noopsctl processes)
+"""
+
+# Copyright 2021 Croix Bleue du Québec
+
+# This file is part of python-noops.
+
+# python-noops is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# python-noops is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+from ..utils.io import write_atomic
+from .. import settings
+
+class RepoUpdateStamp():
+    """
+    End time of the last `helm repo update` per repository ("*" for all of them)
+
+    Stored in NOOPS_HELM_REPO_UPDATE_STAMP (or ~/.cache/noops/helm-repo-update.json)
+    and protected by a lock file next to it.
+    An update is fresh if it finished less than window seconds ago
+    (NOOPS_HELM_REPO_UPDATE_WINDOW) or after the update was requested.
+    """
+    ALL = "*"
+
+    def __init__(self, path: Optional[Path] = None, window: Optional[float] = None):
+        if path is None:
+            path = os.environ.get(settings.HELM_REPO_UPDATE_STAMP_ENV,
+                settings.HELM_REPO_UPDATE_STAMP)
+        if window is None:
+            window = float(os.environ.get(settings.HELM_REPO_UPDATE_WINDOW_ENV,
+                settings.HELM_REPO_UPDATE_WINDOW))
+        self._path = Path(path).expanduser()
+        self._window = window
+
+    @property
+    def path(self) -> Path:
+        """Stamp file"""
+        return self._path
+
+    @property
+    def lock(self) -> Path:
+        """Lock file (its directory is created)"""
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        return self._path.with_name(self._path.name + ".lock")
+
+    def _read(self) -> dict:
+        try:
+            with open(self._path, "r", encoding="UTF-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def last(self, repository: Optional[str] = None) -> Optional[float]:
+        """End time of the last update including this repository (all if None)"""
+        stamps = self._read()
+        candidates = [ stamps.get(self.ALL) ]
+        if repository is not None:
+            candidates.append(stamps.get(repository))
+        candidates = [ i for i in candidates if i is not None ]
+        return max(candidates) if len(candidates) > 0 else None
+
+    def is_fresh(self, repository: Optional[str], requested: float) -> bool:
+        """Is an update useless (done recently or since it was requested) ?"""
+        last = self.last(repository)
+        if last is None:
+            return False
+        return last >= requested or time.time() - last < self._window
+
+    def set(self, repository: Optional[str], finished: float):
+        """Record an update"""
+        stamps = self._read()
+        stamps[repository or self.ALL] = finished
+        write_atomic(self._path, json.dumps(stamps, sort_keys=True).encode("UTF-8"))
@@ -19,24 +19,218 @@ Serve packages (Development ONLY)
 # You should have received a copy of the GNU Lesser General Public License
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
+import email.utils
 import functools
+import gzip
+import hashlib
+import io
+import json
 import os
 import logging
-from http.server import socketserver, SimpleHTTPRequestHandler
+import threading
+import time
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from typing import Dict, Optional, Tuple
 
-def serve_forever(directory: str, bind: str, port: int):
-    """Start a web server"""
+METRICS_PATH = "/-/metrics"
+INDEX = "index.yaml"
+
+class Metrics():
+    """
+    Requests latency per kind of request (index, chart, metrics, other)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds: Dict[str, dict] = {}
+
+    def observe(self, kind: str, duration: float, status: int):
+        """Record a request"""
+        with self._lock:
+            metric = self._kinds.setdefault(
+                kind, {"count": 0, "errors": 0, "not-modified": 0, "sum": 0.0, "max": 0.0})
+            metric["count"] += 1
+            metric["errors"] += 1 if status >= 400 else 0
+            metric["not-modified"] += 1 if status == HTTPStatus.NOT_MODIFIED else 0
+            metric["sum"] += duration
+            metric["max"] = max(metric["max"], duration)
+
+    def as_dict(self) -> dict:
+        """Metrics snapshot (latency in seconds)"""
+        with self._lock:
+            return {
+                kind: {**metric, "avg": metric["sum"] / metric["count"]}
+                for kind, metric in self._kinds.items()
+            }
+
+class IndexCache(): # pylint: disable=too-few-public-methods
+    """
+    index.yaml content (raw and gzip) kept in memory, reloaded when the file changes
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, Tuple[tuple, dict]] = {}
+
+    def get(self, path: str) -> dict:
+        """Index content, gzip content, etag and last modification time"""
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        with self._lock:
+            cached = self._indexes.get(path)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+
+            with open(path, "rb") as file:
+                content = file.read()
+
+            etag = hashlib.sha256(content).hexdigest()[:32]
+            index = {
+                "identity": content,
+                "gzip": gzip.compress(content, mtime=0),
+                "etag": f'"{etag}"',
+                "etag-gzip": f'"{etag}-gzip"',
+                "mtime": stat.st_mtime
+            }
+            self._indexes[path] = (key, index)
+            logging.info("%s loaded", path)
+            return index
+
+class RepositoryHandler(SimpleHTTPRequestHandler):
+    """
+    Chart repository handler
+
+    - ETag/Last-Modified with If-None-Match/If-Modified-Since (304)
+    - index.yaml served from memory (gzip if accepted)
+    - files sent with sendfile
+    - request latency metrics (METRICS_PATH)
+    """
+    _status: int = 0
+    _etag: Optional[str] = None
+
+    def send_response(self, code, message=None):
+        self._status = code
+        SimpleHTTPRequestHandler.send_response(self, code, message)
+
+    def end_headers(self):
+        if self._etag is not None:
+            self.send_header("ETag", self._etag)
+        SimpleHTTPRequestHandler.end_headers(self)
+
+    def do_GET(self):
+        self._observe(SimpleHTTPRequestHandler.do_GET)
+
+    def do_HEAD(self):
+        self._observe(SimpleHTTPRequestHandler.do_HEAD)
+
+    def _observe(self, method):
+        start = time.monotonic()
+        self._status = 0
+        self._etag = None
+        path = self.path.split("?", 1)[0]
+        try:
+            if path == METRICS_PATH:
+                self._send_metrics()
+            else:
+                method(self)
+        finally:
+            if path == METRICS_PATH:
+                kind = "metrics"
+            elif path.endswith("/" + INDEX):
+                kind = "index"
+            elif path.endswith(".tgz"):
+                kind = "chart"
+            else:
+                kind = "other"
+            self.server.metrics.observe(kind, time.monotonic() - start, self._status)
+
+    def _send_metrics(self):
+        body = json.dumps(self.server.metrics.as_dict(), indent=2, sort_keys=True).encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _is_not_modified(self, etag: str) -> bool:
+        """If-None-Match (304 sent if the etag matches)"""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is None:
+            return False
+
+        etags = [ i.strip().removeprefix("W/") for i in if_none_match.split(",") ]
+        if "*" not in etags and etag not in etags:
+            return False
+
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.end_headers()
+        return True
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return SimpleHTTPRequestHandler.send_head(self)
+
+        if os.path.basename(path) == INDEX:
+            return self._send_index(path)
+
+        stat = os.stat(path)
+        self._etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        if self._is_not_modified(self._etag):
+            return None
+
+        # Last-Modified and If-Modified-Since
+        return SimpleHTTPRequestHandler.send_head(self)
+
+    def _send_index(self, path: str):
+        index = self.server.indexes.get(path)
+
+        encoding = "gzip" if "gzip" in self.headers.get("Accept-Encoding", "") else "identity"
+        self._etag = index["etag-gzip"] if encoding == "gzip" else index["etag"]
+        if self._is_not_modified(self._etag):
+            return None
+
+        body = index[encoding]
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Last-Modified", email.utils.formatdate(index["mtime"], usegmt=True))
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding == "gzip":
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def copyfile(self, source, outputfile):
+        """sendfile if possible (regular file)"""
+        self.connection.sendfile(source)
+
+class RepositoryServer(ThreadingHTTPServer):
+    """Threaded chart repository server"""
+    def __init__(self, server_address, handler):
+        ThreadingHTTPServer.__init__(self, server_address, handler)
+        self.metrics = Metrics()
+        self.indexes = IndexCache()
+
+def create_server(directory: str, bind: str, port: int) -> RepositoryServer:
+    """Create a web server (chart repository)"""
     server_address = (
         bind or "0.0.0.0",
-        port or 8080
+        port if port is not None else 8080
     )
 
     if directory is None:
         directory = os.getcwd()
 
-    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    handler = functools.partial(RepositoryHandler, directory=directory)
+
+    return RepositoryServer(server_address, handler)
 
+def serve_forever(directory: str, bind: str, port: int):
+    """Start a web server"""
     logging.warning("Serve is not recommended for production.")
-    with socketserver.TCPServer(server_address, handler) as httpd:
-        print(f"Connect on http://{server_address[0]}:{server_address[1]}.")
+    with create_server(directory, bind, port) as httpd:
+        print(f"Connect on http://{httpd.server_address[0]}:{httpd.server_address[1]}.")
         httpd.serve_forever()
@@ -24,17 +24,39 @@ Expose bindings to use in a values-svcat.yaml file
 # You should have received a copy of the GNU Lesser General Public License
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import os
+import copy
 import logging
+import subprocess
 import yaml
 from .. import settings
 from ..utils import io, external
 from ..noops import NoOps
+from ..external.plugins import svcat_converter_plugin
+from ..errors import ConverterFailure
 from .helm import Helm
 
+@lru_cache(maxsize=64)
+def converter_capabilities(converter: str, mtime: int) -> Tuple[str, ...]: # pylint: disable=unused-argument
+    """
+    Capabilities declared by an external converter (--capabilities)
+
+    Probed once per converter (mtime is part of the cache key).
+    Converters without --capabilities have none.
+    """
+    try:
+        done = external.execute(converter, ["--capabilities"], capture_output=True)
+    except subprocess.CalledProcessError as err:
+        logging.debug("%s does not declare capabilities: %s", converter, err.stderr)
+        return ()
+
+    return tuple(external.get_stdout(done).split())
+
 class ServiceCatalog(): # pylint: disable=too-few-public-methods
     """
     Manages Service Catalog for Helm
@@ -85,6 +107,83 @@ class ServiceCatalog(): # pylint: disable=too-few-public-methods
 
             return yaml.safe_load(objects.read_text(encoding='UTF-8'))
 
+    @classmethod
+    def _external_batch_converter(cls, requests: List[dict],
+        converter: Path) -> Dict[str, List[dict]]:
+        """
+        Use an external converter once for many service requests ([{name: ..., request: ...}])
+
+        Converters without the batch capability are used once per request
+        """
+        if "batch" not in converter_capabilities(
+            os.fspath(converter), os.stat(converter).st_mtime_ns):
+            return {
+                i["name"]: cls._external_converter(i["name"], i["request"], converter)
+                for i in requests
+            }
+
+        with TemporaryDirectory() as tmpdir:
+            tmp = Path(tmpdir)
+            batch = tmp / "batch.yaml"
+            objects = tmp / "objects.yaml"
+
+            with batch.open("w", encoding="UTF-8") as stream:
+                yaml.dump(requests, stream)
+
+            try:
+                external.execute(
+                    os.fspath(converter),
+                    [
+                        "-b", os.fspath(batch),
+                        "-o", os.fspath(objects)
+                    ],
+                    capture_output=True
+                )
+            except subprocess.CalledProcessError as err:
+                raise ConverterFailure(
+                    converter, (err.stderr or b"").decode(errors="replace")) from err
+
+            return yaml.safe_load(objects.read_text(encoding='UTF-8'))
+
+    def _convert(self, converter: Tuple[str, str], requests: List[dict]) -> Dict[str, List[dict]]:
+        """
+        Objects per name for service requests using the same converter (class, plan)
+
+        plugin (in-process), executable or standard Service Catalog
+        """
+        svcat_class, plan = converter
+
+        plugin = svcat_converter_plugin(svcat_class, plan)
+        if plugin is not None:
+            return self._check_converted(
+                f"{svcat_class}/{plan}", requests, plugin.convert_many(copy.deepcopy(requests)))
+
+        if self._processing is not None:
+            external_converter = self._processing / svcat_class / plan
+            if external_converter.exists():
+                return self._check_converted(
+                    external_converter, requests,
+                    self._external_batch_converter(requests, external_converter)
+                )
+
+        return {
+            i["name"]: self._internal_converter(i["name"], i["request"])
+            for i in requests
+        }
+
+    @classmethod
+    def _check_converted(cls, converter, requests: List[dict],
+        objs_per_name: Optional[Dict[str, List[dict]]]) -> Dict[str, List[dict]]:
+        """
+        All service requests must be converted
+        """
+        objs_per_name = objs_per_name or {}
+        missing = [ i["name"] for i in requests if i["name"] not in objs_per_name ]
+        if len(missing) > 0:
+            raise ConverterFailure(converter, f"no objects for {', '.join(missing)}")
+
+        return objs_per_name
+
     @classmethod
     def _internal_converter(cls, name: str, service_request: dict) -> List[dict]:
         """
@@ -131,44 +230,43 @@ class ServiceCatalog(): # pylint: disable=too-few-public-methods
         - kinds ServiceInstance/ServiceBinding in {package.helm.chart}/templates/{VALUES_SVCAT}.yaml
         - bindings available in {workdir}/helm/chart/noops/values-{VALUES_SVCAT}.yaml
         """
-        svcat_bindings=[]
-
         logging.info("Creating service catalog kinds...")
 
-        svcat_objs = []
+        # requests grouped by converter (class/plan)
+        svcat_bindings = []
+        converters: Dict[Tuple[str, str], List[dict]] = {}
         for svcat in self.core.noops_config.get(ServiceCatalog.SERVICE_CATALOG, []):
             logging.info(" ... %s", svcat['name'])
 
-            use_external = False
-            if self._processing is not None:
-                external_converter = self._processing / svcat['class'] / svcat["plan"]
-                use_external = external_converter.exists()
-
             name="{}-binding".format(svcat["name"]) # pylint: disable=consider-using-f-string
+            svcat_bindings.append(name)
+            converters.setdefault((svcat["class"], svcat["plan"]), []).append(
+                { "name": name, "request": svcat }
+            )
 
-            if use_external:
-                objs = self._external_converter(name, svcat, external_converter)
-            else:
-                objs = self._internal_converter(name, svcat)
+        # one invocation per converter
+        workers = int(os.environ.get(settings.SVCAT_WORKERS_ENV, settings.SVCAT_WORKERS))
+        objs_per_name = {}
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            for objs in pool.map(lambda item: self._convert(*item), converters.items()):
+                objs_per_name.update(objs)
+
+        svcat_objs = []
+        for name in svcat_bindings:
+            objs = objs_per_name[name]
 
             # metadata
             self.__set_metadata(name, objs)
 
-            # add to global bindings arrays
-            svcat_bindings.append(name)
             svcat_objs.extend(objs)
 
-        svcat_kinds = ""
-        for obj in svcat_objs:
-            # append to svcat kinds definitions
-            svcat_kinds += \
-                self.helm.as_chart_template(yaml.dump(obj, indent=settings.DEFAULT_INDENT))
-            svcat_kinds += "---\n"
-
-        if svcat_kinds != "":
-            io.write_raw(
+        if len(svcat_objs) > 0:
+            io.write_yaml_all(
                 self.get_svcat_template_path(self.helm.config["chart"]),
-                svcat_kinds,
+                svcat_objs,
+                indent=settings.DEFAULT_INDENT,
+                transform=self.helm.as_chart_template,
+                terminate=True,
                 dry_run=self.core.is_dry_run()
             )
 
@@ -186,7 +284,8 @@ class ServiceCatalog(): # pylint: disable=too-few-public-methods
             self.helm.get_values_path(f"values-{settings.VALUES_SVCAT}.yaml"),
             svcat_values,
             indent=settings.DEFAULT_INDENT,
-            dry_run=self.core.is_dry_run()
+            dry_run=self.core.is_dry_run(),
+            if_changed=True
         )
 
     @classmethod
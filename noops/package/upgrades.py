@@ -0,0 +1,84 @@
+"""
+Last successful helm upgrades (local cache)
+"""
+
+# Copyright 2021 Croix Bleue du Québec
+
+# This file is part of python-noops.
+
+# python-noops is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# python-noops is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+from ..utils.io import write_atomic
+from .. import settings
+
+class UpgradeCache():
+    """
+    Digest and revision of the last successful upgrade per (kube-context, namespace, release)
+
+    One file per release in the cache directory (NOOPS_UPGRADES_CACHE or ~/.cache/noops/upgrades)
+    """
+    def __init__(self, path: Optional[Path] = None):
+        if path is None:
+            path = os.environ.get(settings.UPGRADES_CACHE_ENV, settings.UPGRADES_CACHE)
+        self._path = Path(path).expanduser()
+
+    @property
+    def path(self) -> Path:
+        """Cache directory"""
+        return self._path
+
+    def _entry(self, kube_context: Optional[str], namespace: str, release: str) -> Path:
+        key = json.dumps([kube_context, namespace, release])
+        return self._path / f"{hashlib.sha256(key.encode('UTF-8')).hexdigest()}.json"
+
+    def get(self, kube_context: Optional[str], namespace: str,
+        release: str) -> Optional[Tuple[str, Optional[int]]]:
+        """Digest and helm revision of the last successful upgrade"""
+        try:
+            with open(self._entry(kube_context, namespace, release), "r", encoding="UTF-8") as file:
+                entry = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if entry.get("digest") is None:
+            return None
+
+        return entry["digest"], entry.get("revision")
+
+    def set(self, kube_context: Optional[str], namespace: str, release: str, # pylint: disable=too-many-arguments
+        digest: str, revision: Optional[int]):
+        """Record a successful upgrade"""
+        self._path.mkdir(parents=True, exist_ok=True)
+        write_atomic(
+            self._entry(kube_context, namespace, release),
+            json.dumps({
+                "kube-context": kube_context,
+                "namespace": namespace,
+                "release": release,
+                "digest": digest,
+                "revision": revision
+            }).encode("UTF-8")
+        )
+
+    def delete(self, kube_context: Optional[str], namespace: str, release: str):
+        """Forget a release (eg: uninstalled)"""
+        try:
+            self._entry(kube_context, namespace, release).unlink()
+        except FileNotFoundError:
+            pass
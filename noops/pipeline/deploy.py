@@ -20,22 +20,36 @@ Pipeline Continuous Deployment
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
-from typing import List
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from ..noops import NoOps
 from ..utils.external import execute
+from ..utils.transformation import label_rfc1035
 from ..package.prepare import prepare
+from ..typing.whitelabels import WhiteLabelDeployment
+from ..errors import WhiteLabelDeploymentFailure, WhiteLabelConflict
+from .. import settings
 
-def pipeline_deploy(core: NoOps, scope: str, cargs: List[str]):
+def pipeline_deploy(core: NoOps, scope: str, cargs: List[str],
+    workers: int = 1) -> Optional[List[WhiteLabelDeployment]]:
     """
     Deploy from a pipeline
 
     scope: default
+    workers: number of brands deployed at the same time (white-label only)
     """
     if core.is_feature_enabled("white-label"):
+        if workers > 1:
+            return _white_label_parallel_deployment(core, scope, cargs, workers)
+
         _white_label_deployment(core, scope, cargs)
     else:
         _regular_deployment(core, scope, cargs)
 
+    return None
+
 def _white_label_deployment(core: NoOps, scope: str, cargs: List[str]):
     """
     Continuous Deployment with White-Labels
@@ -45,6 +59,9 @@ def _white_label_deployment(core: NoOps, scope: str, cargs: List[str]):
     extra_envs = core.noops_envs()
     extra_envs["NOOPS_WHITE_LABEL"]="y"
 
+    # generated files do not depend on the brand (environment only)
+    prepare(core)
+
     for branding in core.noops_config["white-label"]:
         extra_envs["NOOPS_WHITE_LABEL_REBRAND"] = branding["rebrand"]
         extra_envs["NOOPS_WHITE_LABEL_MARKETER"] = branding["marketer"]
@@ -54,14 +71,114 @@ def _white_label_deployment(core: NoOps, scope: str, cargs: List[str]):
             branding["marketer"]
         )
 
-        prepare(core)
         execute(
             core.noops_config["pipeline"]["deploy"][scope],
             cargs,
             extra_envs=extra_envs,
+            product_path=os.fspath(core.product_path),
             dry_run=core.is_dry_run()
         )
 
+def _white_label_parallel_deployment(core: NoOps, scope: str, cargs: List[str],
+    workers: int) -> List[WhiteLabelDeployment]:
+    """
+    Continuous Deployment with White-Labels (one brand per worker)
+
+    Files are generated once and copied in each brand workdir.
+    Each brand is deployed from its own workdir with its own environment.
+    All brands are deployed even if one of them is failing.
+    """
+    logging.info("White-label parallel deployment requested (%d workers)", workers)
+
+    # one workdir per brand (rebrands are normalized)
+    labels = {}
+    for branding in core.noops_config["white-label"]:
+        labels.setdefault(label_rfc1035(branding["rebrand"]), []).append(branding["rebrand"])
+    for label, rebrands in labels.items():
+        if len(rebrands) > 1:
+            raise WhiteLabelConflict(label, rebrands)
+
+    prepare(core)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(
+            executor.map(
+                lambda branding: _white_label_brand_deployment(core, scope, cargs, branding),
+                core.noops_config["white-label"]
+            )
+        )
+
+    for result in results:
+        if result.succeeded:
+            logging.info("rebrand %s deployed in %.2fs", result.rebrand, result.duration)
+        else:
+            logging.error("rebrand %s failed: %s", result.rebrand, result.error)
+
+    failures = [ result.rebrand for result in results if not result.succeeded ]
+    if len(failures) > 0:
+        raise WhiteLabelDeploymentFailure(failures, results)
+
+    return results
+
+def _white_label_brand_deployment(core: NoOps, scope: str, cargs: List[str],
+    branding: dict) -> WhiteLabelDeployment:
+    """
+    Prepare and deploy one brand in an isolated workdir
+    """
+    result = WhiteLabelDeployment(
+        rebrand=branding["rebrand"],
+        marketer=branding["marketer"]
+    )
+    start = time.monotonic()
+
+    try:
+        brand_core = core.fork(
+            core.workdir / settings.WHITE_LABEL_WORKDIR / label_rfc1035(branding["rebrand"])
+        )
+
+        extra_envs = brand_core.noops_envs()
+        extra_envs["NOOPS_WHITE_LABEL"]="y"
+        extra_envs["NOOPS_WHITE_LABEL_REBRAND"] = branding["rebrand"]
+        extra_envs["NOOPS_WHITE_LABEL_MARKETER"] = branding["marketer"]
+
+        logging.info("rebrand %s for %s",
+            branding["rebrand"],
+            branding["marketer"]
+        )
+
+        execute(
+            brand_core.noops_config["pipeline"]["deploy"][scope],
+            cargs,
+            extra_envs=extra_envs,
+            product_path=os.fspath(brand_core.product_path),
+            dry_run=brand_core.is_dry_run()
+        )
+        result.succeeded = True
+    except Exception as error: # pylint: disable=broad-except
+        result.error = str(error)
+
+    result.duration = time.monotonic() - start
+
+    return result
+
+def white_label_report(results: List[WhiteLabelDeployment]) -> str:
+    """
+    Summary of a white-label parallel deployment (one line per brand)
+    """
+    lines = []
+    for result in results:
+        lines.append(
+            "{:<20} {:<30} {:<6} {:>8.2f}s {}".format( # pylint: disable=consider-using-f-string
+                result.rebrand,
+                result.marketer,
+                "OK" if result.succeeded else "FAILED",
+                result.duration,
+                result.error or ""
+            ).rstrip()
+        )
+
+    return "\n".join(lines)
+
 def _regular_deployment(core: NoOps, scope: str, cargs: List[str]):
     """
     Continuous Deployment (default)
@@ -73,5 +190,6 @@ def _regular_deployment(core: NoOps, scope: str, cargs: List[str]):
         core.noops_config["pipeline"]["deploy"][scope],
         cargs,
         core.noops_envs(),
+        product_path=os.fspath(core.product_path),
         dry_run=core.is_dry_run()
     )
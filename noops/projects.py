@@ -22,18 +22,60 @@ To handle package.noops.local/v1alpha1
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from pathlib import Path
+import yaml
 from .typing.targets import Cluster, TargetKind, TargetClassesEnum, TargetsEnum
 from .typing.versions import VersionKind
 from .typing.projects import ProjectKind, Spec as ProjectKindSpec
 from .typing.projectplans import (
     ProjectPlanKind,
     ProjectPlanSpec,
-    ProjectPlanReconciliation
+    ProjectPlanReconciliation,
+    ProjectPlanResult,
+    ProjectPlanStatusEnum
 )
 from .targets import Targets
 from .package.install import HelmInstall
+from .utils.io import json2yaml, read_yaml, write_if_changed
+from .errors import ProjectsPlanFailure
+
+# (namespace, name)
+DocumentKey = Tuple[Optional[str], Optional[str]]
+
+# Targets shared by all plans done in a bulk worker process
+_BULK_TARGETS: Optional[Targets] = None
+
+def _bulk_init(clusters: List[dict]):
+    """Bulk worker process initialization"""
+    global _BULK_TARGETS # pylint: disable=global-statement
+    _BULK_TARGETS = Targets(clusters)
+
+def _bulk_plan(documents: Tuple[dict, dict, dict],
+    targets: Targets = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Plan one project (target, version, project) in a bulk worker
+
+    Return the plan (yaml) or the error
+    """
+    ktarget, kversion, kproject = documents
+
+    try:
+        plan = Projects.plan(
+            targets or _BULK_TARGETS,
+            TargetKind.parse_obj(ktarget),
+            VersionKind.parse_obj(kversion),
+            ProjectKind.parse_obj(kproject)
+        )
+    except Exception as error: # pylint: disable=broad-except
+        return None, str(error)
+
+    return json2yaml(plan.json(by_alias=True, exclude_none=True)), None
+
+def _document_key(document: dict) -> DocumentKey:
+    metadata = document.get("metadata") or {}
+    return (metadata.get("namespace"), metadata.get("name"))
 
 class Projects():
     """
@@ -41,13 +83,18 @@ class Projects():
     """
 
     @classmethod
-    def plan(cls, clusters: List[Cluster],
+    def plan(cls, clusters: Union[List[Cluster], Targets],
         ktarget: TargetKind, kversion: VersionKind, kproject: ProjectKind) -> ProjectPlanKind:
         """
         Plan
+
+        clusters can be an already loaded Targets to share it between plans
         """
+        if not isinstance(clusters, Targets):
+            clusters = Targets(clusters)
+
         # Create target plan (target class, clusters to use...)
-        target_plan = Targets(clusters).plan(ktarget)
+        target_plan = clusters.plan(ktarget)
 
         # Verify versions
         kversion.verify()
@@ -95,6 +142,149 @@ class Projects():
 
         return project_plan
 
+    @classmethod
+    def pair(cls, documents: Iterable[dict]) -> Dict[DocumentKey, Tuple[dict, dict, dict]]:
+        """
+        Pair Target, Version and Project documents by metadata (namespace, name)
+
+        Target and Version without namespace are used by all namespaces.
+        A project without a target or a version is not part of the result.
+        """
+        per_kind: Dict[str, Dict[DocumentKey, dict]] = {
+            "Target": {}, "Version": {}, "Project": {}
+        }
+
+        for document in documents:
+            if not document:
+                continue
+            kind = per_kind.get(document.get("kind"))
+            if kind is None:
+                logging.warning("kind %s ignored", document.get("kind"))
+                continue
+            key = _document_key(document)
+            if key in kind:
+                logging.warning("%s %s/%s duplicated (last one used)",
+                    document["kind"], key[0] or "*", key[1])
+            kind[key] = document
+
+        pairs = {}
+        for key, kproject in per_kind["Project"].items():
+            found = []
+            for kind in ("Target", "Version"):
+                document = per_kind[kind].get(key, per_kind[kind].get((None, key[1])))
+                if document is None:
+                    logging.error("%s not found for project %s/%s", kind, key[0], key[1])
+                    break
+                found.append(document)
+            else:
+                pairs[key] = (found[0], found[1], kproject)
+
+        return pairs
+
+    @classmethod
+    def plan_bulk(cls, clusters: List[dict], documents: Iterable[dict], # pylint: disable=too-many-arguments
+        output: Path, previous: Optional[Path] = None,
+        workers: int = 1) -> List[ProjectPlanResult]:
+        """
+        Plan many projects and store one ProjectPlan per project in output
+
+        Plans are compared to plans stored in previous (default: output) to
+        determine which ones changed.
+        """
+        output = Path(output)
+        previous = Path(previous) if previous is not None else output
+        pairs = cls.pair(documents)
+
+        if workers > 1 and len(pairs) > 1:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_bulk_init, initargs=(clusters,)) as executor:
+                plans = list(executor.map(
+                    _bulk_plan,
+                    pairs.values(),
+                    chunksize=max(1, len(pairs) // (workers * 4))
+                ))
+        else:
+            targets = Targets(clusters)
+            plans = [ _bulk_plan(i, targets) for i in pairs.values() ]
+
+        results = cls._store_plans(dict(zip(pairs, plans)), output, previous)
+
+        failures = [
+            f"{i.namespace}/{i.name}" for i in results if i.status == ProjectPlanStatusEnum.FAILED
+        ]
+        if len(failures) > 0:
+            raise ProjectsPlanFailure(failures, results)
+
+        return results
+
+    @classmethod
+    def _store_plans(cls, plans: Dict[DocumentKey, Tuple[Optional[str], Optional[str]]],
+        output: Path, previous: Path) -> List[ProjectPlanResult]:
+        """Store plans and compare them to previous ones"""
+        output.mkdir(parents=True, exist_ok=True)
+
+        results = []
+        planned = set()
+        for (namespace, name), (plan_yaml, error) in plans.items():
+            filename = f"{namespace}.{name}.yaml"
+            planned.add(filename)
+
+            if error is not None:
+                status = ProjectPlanStatusEnum.FAILED
+            else:
+                status = cls._plan_status(previous / filename, plan_yaml)
+                write_if_changed(output / filename, plan_yaml)
+
+            results.append(
+                ProjectPlanResult(name=name, namespace=namespace, status=status, error=error)
+            )
+
+        # plans not planned anymore (removed from output too)
+        for plan_path in sorted(previous.glob("*.yaml")) if previous.is_dir() else []:
+            if plan_path.name in planned:
+                continue
+            namespace, name = _document_key(read_yaml(plan_path) or {})
+            (output / plan_path.name).unlink(missing_ok=True)
+            results.append(
+                ProjectPlanResult(
+                    name=name or plan_path.stem,
+                    namespace=namespace or "",
+                    status=ProjectPlanStatusEnum.REMOVED
+                )
+            )
+
+        return results
+
+    @classmethod
+    def _plan_status(cls, previous: Path, plan_yaml: str) -> ProjectPlanStatusEnum:
+        if not previous.exists():
+            return ProjectPlanStatusEnum.ADDED
+
+        # compare content to ignore formatting
+        if read_yaml(previous) == yaml.safe_load(plan_yaml):
+            return ProjectPlanStatusEnum.UNCHANGED
+
+        return ProjectPlanStatusEnum.CHANGED
+
+    @classmethod
+    def plan_bulk_report(cls, results: List[ProjectPlanResult]) -> str:
+        """
+        Summary of a bulk planning
+        """
+        lines = [
+            f"{i.status.value:<10} {i.namespace}/{i.name}" + (f": {i.error}" if i.error else "")
+            for i in results
+        ]
+
+        counts = {}
+        for result in results:
+            counts[result.status.value] = counts.get(result.status.value, 0) + 1
+        lines.append(
+            ", ".join(f"{status}: {count}" for status, count in sorted(counts.items()))
+        )
+
+        return "\n".join(lines)
+
     @classmethod
     def create(cls, namespace: str, release: str, chart: str, env: str,
         cargs: List[str] = None, extra_envs: dict = None) -> ProjectKind:
@@ -139,16 +329,18 @@ class Projects():
         current: ProjectPlanKind, previous: ProjectPlanKind) -> List[ProjectPlanReconciliation]:
         """
         Determine what need to be changed from previous to current project plan definition
+
+        Clusters with an identical project (same fingerprint) are skipped.
         """
 
         plans = []
 
         def populate_per_cluster(projectplan: ProjectPlanKind, per_cluster: dict):
-            """Populate a dict with cluster/ProjectKind"""
+            """Populate a dict with cluster/ProjectKind (shared between clusters of a template)"""
             for _plan in projectplan.spec.plan:
+                kproject = ProjectKind(spec=_plan.template.spec, metadata=projectplan.metadata)
                 for cluster in _plan.clusters:
-                    per_cluster[cluster] = \
-                        ProjectKind(spec=_plan.template.spec, metadata=projectplan.metadata)
+                    per_cluster[cluster] = kproject
 
         current_per_cluster = {}
         populate_per_cluster(current, current_per_cluster)
@@ -162,6 +354,10 @@ class Projects():
             except KeyError:
                 kprevious = None
 
+            if kprevious is not None and kprevious.fingerprint == kproject.fingerprint:
+                logging.debug("project unchanged in cluster %s", cluster)
+                continue
+
             plans.append(
                 ProjectPlanReconciliation(
                     cluster=cluster,
@@ -182,21 +378,19 @@ class Projects():
         return plans
 
     @classmethod
-    def apply(cls, kplan: ProjectPlanKind, pre_processing_path: Path, dry_run: bool,
-        kpreviousplan: ProjectPlanKind = None):
+    def apply(cls, kplan: ProjectPlanKind, pre_processing_path: Path, dry_run: bool, # pylint: disable=too-many-arguments
+        kpreviousplan: ProjectPlanKind = None, skip_unchanged: bool = False,
+        force: bool = False):
         """
         Apply the plan
-        """
 
-        if kpreviousplan is None:
-            kpreviousplan = ProjectPlanKind(
-                metadata=kplan.metadata,
-                spec={
-                    "target-class": kplan.spec.target_class
-                }
-            )
+        skip_unchanged: releases deployed with the same inputs are not upgraded (live state)
+        force: upgrade releases even if identical to the last successful upgrade
+        """
 
-        plans = cls._reconciliation_project_plan(kplan, kpreviousplan)
+        plans = cls._reconciliation_project_plan(
+            kplan, kpreviousplan or cls._empty_plan_from(kplan)
+        )
 
         for plan in plans:
             if plan.is_delete():
@@ -207,14 +401,53 @@ class Projects():
                     pre_processing_path,
                     dry_run,
                     kprevious=plan.kprevious,
-                    cluster=plan.cluster
+                    cluster=plan.cluster,
+                    skip_unchanged=skip_unchanged,
+                    force=force
                 )
 
     @classmethod
-    def apply_incluster(cls, kproject: ProjectKind, pre_processing_path: Path, dry_run: bool,
-        kprevious: ProjectKind = None, cluster: str = None):
+    def diff(cls, kplan: ProjectPlanKind, kpreviousplan: ProjectPlanKind = None) -> List[str]:
+        """
+        Actions required to apply the plan (nothing is executed)
+        """
+        plans = cls._reconciliation_project_plan(
+            kplan, kpreviousplan or cls._empty_plan_from(kplan)
+        )
+
+        actions = []
+        for plan in plans:
+            if plan.is_delete():
+                helm_actions = HelmInstall.describe_reconciliation(
+                    cls.create_skeleton_from(plan.kprevious), plan.kprevious
+                )
+            else:
+                helm_actions = HelmInstall.describe_reconciliation(
+                    plan.kproject, plan.kprevious or cls.create_skeleton_from(plan.kproject)
+                )
+            actions.extend(f"{plan.cluster}: {action}" for action in helm_actions)
+
+        return actions
+
+    @classmethod
+    def _empty_plan_from(cls, kplan: ProjectPlanKind) -> ProjectPlanKind:
+        """Plan without any deployment (eg: no previous plan)"""
+        return ProjectPlanKind(
+            metadata=kplan.metadata,
+            spec={
+                "target-class": kplan.spec.target_class
+            }
+        )
+
+    @classmethod
+    def apply_incluster(cls, kproject: ProjectKind, pre_processing_path: Path, dry_run: bool, # pylint: disable=too-many-arguments
+        kprevious: ProjectKind = None, cluster: str = None, skip_unchanged: bool = False,
+        force: bool = False):
         """
         Install the project in cluster
+
+        skip_unchanged: releases deployed with the same inputs are not upgraded (live state)
+        force: upgrade releases even if identical to the last successful upgrade
         """
         logging.info(
             "applying project %s.%s in cluster %s.",
@@ -227,7 +460,7 @@ class Projects():
             # We need an empty from for reconciliation
             kprevious = cls.create_skeleton_from(kproject)
 
-        HelmInstall(dry_run, kube_context=cluster) \
+        HelmInstall(dry_run, kube_context=cluster, skip_unchanged=skip_unchanged, force=force) \
             .reconciliation(kproject, kprevious, pre_processing_path)
 
     @classmethod
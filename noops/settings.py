@@ -26,6 +26,12 @@ VERSION="2.0.0-alpha.1"
 DEFAULT_INDENT=2
 DEFAULT_NOOPS_FILE="noops.yaml"
 DEFAULT_WORKDIR="noops_workdir"
+WORKDIR_LOCK=f"{DEFAULT_WORKDIR}.lock"
+# workdir locks held by parent noopsctl processes (eg: noopsctl called by a pipeline script)
+WORKDIR_LOCK_HELD_ENV="NOOPS_WORKDIR_LOCK_HELD"
+# seconds to wait for a lock (0 to wait forever)
+LOCK_TIMEOUT_ENV="NOOPS_LOCK_TIMEOUT"
+LOCK_TIMEOUT=3600
 GENERATED_NOOPS="noops-generated"
 DEFAULT_NOOPS_HPR="noopshpr.yaml"
 SCHEMA_FILE="noops.schema.yaml"
@@ -39,6 +45,43 @@ VALUES_SVCAT="svcat"
 
 TMP_PREFIX="noops-"
 
+WHITE_LABEL_WORKDIR="white-label"
+
+# name of the last helm package created (in the workdir)
+HELM_PACKAGE="helm-package"
+
+# helm release description prefix used to store the digest of an upgrade
+HELM_UPGRADE_DESCRIPTION="noops-upgrade:"
+
+# last successful upgrades (local cache)
+UPGRADES_CACHE_ENV="NOOPS_UPGRADES_CACHE"
+UPGRADES_CACHE="~/.cache/noops/upgrades"
+
+# helm repo update shared by noopsctl processes (skipped if done less than WINDOW seconds ago)
+HELM_REPO_UPDATE_STAMP_ENV="NOOPS_HELM_REPO_UPDATE_STAMP"
+HELM_REPO_UPDATE_STAMP="~/.cache/noops/helm-repo-update.json"
+HELM_REPO_UPDATE_WINDOW_ENV="NOOPS_HELM_REPO_UPDATE_WINDOW"
+HELM_REPO_UPDATE_WINDOW=30
+
+# in-process plugins (entry points groups)
+PLUGINS_PREPROCESSING="noops.preprocessing"
+PLUGINS_SVCAT_CONVERTERS="noops.svcat_converters"
+
+# pre-processing steps running at the same time
+PREPROCESSING_WORKERS_ENV="NOOPS_PREPROCESSING_WORKERS"
+PREPROCESSING_WORKERS=4
+
+# service catalog converters running at the same time
+SVCAT_WORKERS_ENV="NOOPS_SVCAT_WORKERS"
+SVCAT_WORKERS=1
+
+# devops git clones shared by products (directory, not set: no cache)
+DEVOPS_CACHE_ENV="NOOPS_DEVOPS_CACHE"
+
+# products processed at the same time by noopsctl batch
+BATCH_WORKERS_ENV="NOOPS_BATCH_WORKERS"
+BATCH_WORKERS=4
+
 DEFAULT_PKG_HELM_DEFINITIONS = {
     # Define targets based on target classes supported
     # class one-cluster uses one-cluster
@@ -22,11 +22,11 @@ target.noops.local/v1alpha1
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
-from typing import List, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Union
 from pathlib import Path
 from .typing.targets import (
     TargetPlan, TargetKind, TargetsEnum, TargetClassesEnum,
-    TargetSpec, RequiredSpec,
+    TargetSpec, RequiredSpec, MatchExpressionSpec, OperatorSpec,
     Cluster, TargetClasses)
 from .errors import TargetNotSupported, ClustersAvailability, TargetPlanUnknown
 
@@ -44,6 +44,24 @@ class Targets():
         else:
             self._clusters = clusters
         self._clusters_name = [ i.name for i in self._clusters ]
+        self._index_labels()
+
+    def _index_labels(self):
+        """
+        Build the inverted labels index (key -> value -> clusters bitmap)
+
+        Bit i of a bitmap is set when the cluster at position i matches.
+        """
+        self._all_clusters = (1 << len(self._clusters)) - 1
+        self._labels_index: Dict[str, Dict[str, int]] = {}
+        self._keys_index: Dict[str, int] = {}
+
+        for position, cluster in enumerate(self._clusters):
+            bit = 1 << position
+            for key, value in cluster.labels.items():
+                values = self._labels_index.setdefault(key, {})
+                values[value] = values.get(value, 0) | bit
+                self._keys_index[key] = self._keys_index.get(key, 0) | bit
 
     def get_clusters(self) -> List[Cluster]:
         """Get the list of clusters"""
@@ -59,7 +77,7 @@ class Targets():
         """
         plan = TargetPlan()
 
-        clusters_used = [] # updated into _filter_usable_clusters
+        clusters_used = {} # ordered set updated into _filter_usable_clusters
         plan.active = self._filter_usable_clusters(kind.spec.active, clusters_used)
         plan.standby = self._filter_usable_clusters(kind.spec.standby, clusters_used)
         plan.services_only = self._filter_usable_clusters(kind.spec.services_only, clusters_used)
@@ -81,7 +99,22 @@ class Targets():
 
         return plan
 
-    def _filter_usable_clusters(self, target: TargetSpec, clusters_used: List[str]) -> List[str]:
+    def plan_many(self, kinds: Iterable[TargetKind]) -> Iterator[TargetPlan]:
+        """
+        Create plans for a stream of target kinds
+
+        The clusters inventory is shared and identical targets are planned once.
+        """
+        plans: Dict[str, TargetPlan] = {}
+
+        for kind in kinds:
+            key = kind.json(by_alias=True, sort_keys=True)
+            if key not in plans:
+                plans[key] = self.plan(kind)
+            yield plans[key].copy(deep=True)
+
+    def _filter_usable_clusters(self, target: TargetSpec,
+        clusters_used: Dict[str, None]) -> List[str]:
         if isinstance(target.clusterCount, int) and target.clusterCount < 1:
             return []
 
@@ -92,27 +125,24 @@ class Targets():
             )
         else:
             # All
-            clusters_selection = self.get_clusters_name().copy()
+            clusters_selection = self.get_clusters_name()
 
         # Filter remaining clusters
-        for cluster in clusters_used:
-            try:
-                clusters_selection.remove(cluster)
-            except ValueError:
-                # cluster used not part of the selection
-                pass
+        clusters_selection = [
+            cluster for cluster in clusters_selection if cluster not in clusters_used
+        ]
 
         if isinstance(target.clusterCount, int):
             if target.clusterCount > len(clusters_selection):
                 raise ClustersAvailability(len(clusters_selection), target.clusterCount)
 
             clusters_selection = clusters_selection[:target.clusterCount]
-            clusters_used.extend(clusters_selection)
+            clusters_used.update(dict.fromkeys(clusters_selection))
 
             return clusters_selection
 
         if target.clusterCount == "Remaining":
-            clusters_used.extend(clusters_selection)
+            clusters_used.update(dict.fromkeys(clusters_selection))
 
             return clusters_selection
 
@@ -124,12 +154,47 @@ class Targets():
 
         # OR between term
         for terms in required.clusterSelectorTerms:
-            for cluster in self.get_clusters():
-                if cluster.match(terms.matchExpressions):
-                    clusters_selected[cluster.name] = None
+            for position in self._positions(self._match(terms.matchExpressions)):
+                clusters_selected[self._clusters_name[position]] = None
 
         return list(clusters_selected)
 
+    def _match(self, terms: List[MatchExpressionSpec]) -> int:
+        """Bitmap of clusters compatible with filtering provided (see Cluster.match)"""
+        bitmap = self._all_clusters
+
+        # AND between term
+        for term in terms:
+            if term.operator == OperatorSpec.IN:
+                bitmap &= self._label_in(term)
+            elif term.operator == OperatorSpec.NOT_IN:
+                bitmap &= ~self._label_in(term)
+            elif term.operator == OperatorSpec.EXISTS:
+                bitmap &= self._keys_index.get(term.key, 0)
+            else: # term.operator == OperatorSpec.DOES_NOT_EXIST
+                bitmap &= ~self._keys_index.get(term.key, 0)
+
+            if bitmap == 0:
+                # mismatch, no needs to continue
+                break
+
+        return bitmap
+
+    def _label_in(self, term: MatchExpressionSpec) -> int:
+        values = self._labels_index.get(term.key, {})
+        bitmap = 0
+        for value in term.values:
+            bitmap |= values.get(value, 0)
+        return bitmap
+
+    @classmethod
+    def _positions(cls, bitmap: int) -> Iterator[int]:
+        """Clusters positions set in the bitmap (ascending order)"""
+        while bitmap:
+            lowest = bitmap & -bitmap
+            yield lowest.bit_length() - 1
+            bitmap ^= lowest
+
     @classmethod
     def is_compatible(cls, target: TargetsEnum, supported: TargetClasses) -> bool:
         """
@@ -20,7 +20,10 @@ Common structures for typing
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
 import enum
+import hashlib
 import sys
+from typing import Iterable, List, Optional
+from pydantic import BaseModel, PrivateAttr # pylint: disable=no-name-in-module
 
 if sys.version_info >= (3,11,0):
     class StrEnum(enum.StrEnum):
@@ -46,3 +49,49 @@ else:
             List sub class
             """
             return [sub.value for sub in cls]
+
+class FingerprintModel(BaseModel):
+    """
+    Model with a canonical fingerprint (sha256 of the sorted json)
+
+    The fingerprint is computed once and cached on the model.
+    The cache is reset when a field of this model is set (or on copy) but NOT when a
+    nested model is altered in place. Do not alter nested models once the fingerprint is used.
+    """
+    _fingerprint: Optional[str] = PrivateAttr(None)
+
+    @property
+    def fingerprint(self) -> str:
+        """Canonical fingerprint of the model"""
+        if self._fingerprint is None:
+            object.__setattr__(
+                self,
+                "_fingerprint",
+                hashlib.sha256(
+                    self.json(by_alias=True, sort_keys=True).encode("UTF-8")
+                ).hexdigest()
+            )
+        return self._fingerprint
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        object.__setattr__(self, "_fingerprint", None)
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["__private_attribute_values__"]["_fingerprint"] = None
+        return state
+
+    def copy(self, **kwargs):
+        """Copy the model (without the fingerprint cache)"""
+        model = super().copy(**kwargs)
+        object.__setattr__(model, "_fingerprint", None)
+        return model
+
+def fingerprint(model: Optional[FingerprintModel]) -> Optional[str]:
+    """Fingerprint of a model (None if the model is None)"""
+    return None if model is None else model.fingerprint
+
+def fingerprints(models: Optional[Iterable[FingerprintModel]]) -> Optional[List[str]]:
+    """Fingerprints of a list of models (None if the list is None)"""
+    return None if models is None else [ model.fingerprint for model in models ]
@@ -0,0 +1,32 @@
+"""
+Batch Typing
+"""
+
+# Copyright 2021 Croix Bleue du Québec
+
+# This file is part of python-noops.
+
+# python-noops is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# python-noops is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import List, Optional
+from pydantic import BaseModel # pylint: disable=no-name-in-module
+
+class BatchResult(BaseModel): # pylint: disable=too-few-public-methods
+    """Result of a noopsctl command for one product"""
+    product: str
+    args: List[str]
+    succeeded: bool = False
+    duration: float = 0.0
+    output: str = ""
+    error: Optional[str]
@@ -19,7 +19,7 @@ Charts Typing
 # You should have received a copy of the GNU Lesser General Public License
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Union
 from pydantic import BaseModel, Field # pylint: disable=no-name-in-module
 from .targets import TargetClasses
 from .profiles import ProfileClasses
@@ -31,11 +31,41 @@ class SupportedSpec(BaseModel): # pylint: disable=too-few-public-methods
     profile_classes: ProfileClasses = Field(..., alias="profile-classes")
     target_classes: TargetClasses = Field(..., alias='target-classes')
 
+class PreProcessingStep(BaseModel): # pylint: disable=too-few-public-methods
+    """
+    Pre-processing step model
+    """
+    script: str
+    name: Optional[str]
+    needs: List[str] = []
+    timeout: Optional[float]
+
+    @property
+    def key(self) -> str:
+        """Step identifier (name or script)"""
+        return self.name or self.script
+
 class HelmSpec(BaseModel): # pylint: disable=too-few-public-methods
     """
     Helm model
     """
-    preprocessing: List[str] = Field([], alias='pre-processing')
+    preprocessing: List[Union[str, PreProcessingStep]] = Field([], alias='pre-processing')
+
+    def preprocessing_steps(self) -> List[PreProcessingStep]:
+        """
+        Pre-processing steps
+
+        A script (string) needs the previous entry (ordered list)
+        """
+        steps = []
+        for entry in self.preprocessing:
+            if isinstance(entry, str):
+                entry = PreProcessingStep(
+                    script=entry,
+                    needs=[steps[-1].key] if len(steps) > 0 else []
+                )
+            steps.append(entry)
+        return steps
 
 class PackageSpec(BaseModel): # pylint: disable=too-few-public-methods
     """
@@ -24,6 +24,7 @@ from pydantic import BaseModel, Field # pylint: disable=no-name-in-module
 from .projects import Spec as ProjectsSpec, ProjectKind
 from .targets import TargetClassesEnum
 from .metadata import MetadataSpec
+from . import StrEnum
 
 class ProjectPlanReconciliation(BaseModel):
     """Reconciliation per cluster"""
@@ -59,3 +60,20 @@ class ProjectPlanKind(BaseModel): # pylint: disable=too-few-public-methods
     kind: Literal['ProjectPlan'] = 'ProjectPlan'
     spec: Spec
     metadata: MetadataSpec
+
+# Bulk planning
+
+class ProjectPlanStatusEnum(StrEnum):
+    """Status of a project plan compared to the previous one"""
+    ADDED = 'added'
+    CHANGED = 'changed'
+    UNCHANGED = 'unchanged'
+    REMOVED = 'removed'
+    FAILED = 'failed'
+
+class ProjectPlanResult(BaseModel): # pylint: disable=too-few-public-methods
+    """Result of a bulk planning for one project"""
+    name: str
+    namespace: str
+    status: ProjectPlanStatusEnum
+    error: Optional[str]
@@ -24,6 +24,7 @@ from pydantic import BaseModel, Field # pylint: disable=no-name-in-module
 from .versions import OneSpec, MultiSpec, Spec as VersionSpec
 from .metadata import MetadataSpec
 from .targets import TargetsEnum
+from . import FingerprintModel, StrEnum
 
 class ProjectReconciliationPlan(BaseModel): # pylint: disable=too-few-public-methods
     """Plan to reconcile an older project with a new one"""
@@ -34,6 +35,11 @@ class ProjectReconciliationPlan(BaseModel): # pylint: disable=too-few-public-met
     canary_versions: Optional[List[Union[OneSpec, MultiSpec]]]
     removed_canary: bool = False
 
+class CanaryWeightsEnum(StrEnum):
+    """Where canary weights are set"""
+    RELEASES = "releases" # each version release and the canary router release
+    ROUTER = "router" # canary router release only (noops.canary.instances)
+
 class WhiteLabelSpec(BaseModel): # pylint: disable=too-few-public-methods
     """package white-label spec"""
     rebrand: str
@@ -48,17 +54,18 @@ class InstallSpec(BaseModel): # pylint: disable=too-few-public-methods
     args: Optional[List[str]]
     envs: Optional[dict]
     white_label: Optional[WhiteLabelSpec] = Field(None, alias='white-label')
+    canary_weights: CanaryWeightsEnum = Field(CanaryWeightsEnum.RELEASES, alias='canary-weights')
 
-class PackageSpec(BaseModel): # pylint: disable=too-few-public-methods
+class PackageSpec(FingerprintModel): # pylint: disable=too-few-public-methods
     """package spec"""
     install: InstallSpec
 
-class Spec(BaseModel): # pylint: disable=too-few-public-methods
+class Spec(FingerprintModel): # pylint: disable=too-few-public-methods
     """kind spec model"""
     package: PackageSpec
     versions: VersionSpec = VersionSpec()
 
-class ProjectKind(BaseModel): # pylint: disable=too-few-public-methods
+class ProjectKind(FingerprintModel): # pylint: disable=too-few-public-methods
     """Project Kind model"""
     apiVersion: Literal['noops.local/v1alpha1'] = 'noops.local/v1alpha1'
     kind: Literal['Project'] = 'Project'
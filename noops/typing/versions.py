@@ -23,10 +23,11 @@ from typing import List, Optional, Literal
 from pydantic import BaseModel, Field # pylint: disable=no-name-in-module
 from ..errors import VerifyFailure
 from .profiles import ProfileEnum
+from . import FingerprintModel
 
 # Version Kind
 
-class MultiSpec(BaseModel): # pylint: disable=too-few-public-methods
+class MultiSpec(FingerprintModel): # pylint: disable=too-few-public-methods
     """Multiple deployments model"""
     app_version: str
     version: Optional[str]
@@ -49,7 +50,7 @@ class MultiSpec(BaseModel): # pylint: disable=too-few-public-methods
 
         return _profiles
 
-class OneSpec(BaseModel): # pylint: disable=too-few-public-methods
+class OneSpec(FingerprintModel): # pylint: disable=too-few-public-methods
     """One deployment model"""
     app_version: str
     version: Optional[str]
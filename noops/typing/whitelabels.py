@@ -0,0 +1,31 @@
+"""
+White-label Typing
+"""
+
+# Copyright 2021 Croix Bleue du Québec
+
+# This file is part of python-noops.
+
+# python-noops is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# python-noops is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Optional
+from pydantic import BaseModel # pylint: disable=no-name-in-module
+
+class WhiteLabelDeployment(BaseModel): # pylint: disable=too-few-public-methods
+    """Result of a deployment for one brand"""
+    rebrand: str
+    marketer: str
+    succeeded: bool = False
+    duration: float = 0.0
+    error: Optional[str]
@@ -27,11 +27,13 @@ from typing import List, Optional
 def execute(cmd: str, args: List[str] = None,
     extra_envs: dict = None, product_path: str = None,
     dry_run: bool = False, shell: bool = False,
-    capture_output: bool = False) -> Optional[subprocess.CompletedProcess]:
+    capture_output: bool = False, timeout: float = None) -> Optional[subprocess.CompletedProcess]:
     """
     Execute a command.
 
     The command needs to have execution permission for the running user.
+    The command runs in product_path (current working directory if not set).
+    The command is killed after timeout seconds (subprocess.TimeoutExpired).
     """
     if extra_envs is None:
         extra_envs = {}
@@ -54,8 +56,9 @@ def execute(cmd: str, args: List[str] = None,
         shell=shell,
         check=True,
         env=custom_envs,
-        cwd=product_path or os.getcwd(),
-        capture_output=capture_output
+        cwd=product_path,
+        capture_output=capture_output,
+        timeout=timeout
     )
 
     if capture_output:
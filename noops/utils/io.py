@@ -24,10 +24,15 @@ Supported format:
 # You should have received a copy of the GNU Lesser General Public License
 # along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
 
+import io
 import json
 import os
+import hashlib
+import secrets
+import shutil
+import stat
 from pathlib import Path, PosixPath, WindowsPath
-from typing import Union
+from typing import Callable, Iterable, Iterator, Optional, TextIO, Tuple, Union
 import yaml
 from ..settings import DEFAULT_INDENT
 
@@ -54,8 +59,12 @@ def path_constructor(loader: yaml.Loader, node):
     """
     return Path(loader.construct_scalar(node))
 
-yaml.Dumper.add_representer(PosixPath, path_representer)
-yaml.Dumper.add_representer(WindowsPath, path_representer)
+# libyaml dumper if available
+Dumper = getattr(yaml, "CDumper", yaml.Dumper)
+
+for _dumper in (yaml.Dumper, Dumper):
+    _dumper.add_representer(PosixPath, path_representer)
+    _dumper.add_representer(WindowsPath, path_representer)
 yaml.SafeLoader.add_constructor('!path', path_constructor)
 
 # IO functions
@@ -69,11 +78,43 @@ def read_yaml(file_path: Union[str, Path]) -> dict: # pragma: no cover
 
     return noops
 
-def write_yaml(file_path: Union[str, Path], content: dict, indent=DEFAULT_INDENT,
-    dry_run: bool = False):
+def read_yaml_all(file: Union[str, Path, TextIO]) -> Iterator[dict]:
+    """
+    Read a multi-documents yaml file (or stream) one document at a time
+    """
+    if not isinstance(file, (str, Path)):
+        yield from yaml.load_all(file, Loader=yaml.SafeLoader)
+        return
+
+    with open(file, "r", encoding="UTF-8") as stream:
+        yield from yaml.load_all(stream, Loader=yaml.SafeLoader)
+
+def read_yaml_documents(paths: Iterable[Union[str, Path]]) -> Iterator[dict]:
+    """
+    Read all yaml documents from files and directories (*.yaml, *.yml recursively)
+    """
+    for path in paths:
+        path = Path(path)
+        if not path.is_dir():
+            yield from read_yaml_all(path)
+            continue
+
+        for file_path in sorted(
+            i for i in path.rglob("*") if i.suffix in (".yaml", ".yml") and i.is_file()
+        ):
+            yield from read_yaml_all(file_path)
+
+def write_yaml(file_path: Union[str, Path], content: dict, indent=DEFAULT_INDENT, # pylint: disable=too-many-arguments
+    dry_run: bool = False, if_changed: bool = False):
     """
     Write as a yaml file
+
+    if_changed: do not rewrite the file if the content is identical
     """
+    if if_changed:
+        write_if_changed(file_path, yaml.dump(content, indent=indent), dry_run=dry_run)
+        return
+
     if dry_run:
         print(yaml.dump(content, indent=indent))
         return
@@ -81,6 +122,57 @@ def write_yaml(file_path: Union[str, Path], content: dict, indent=DEFAULT_INDENT
     with open(file_path, "w", encoding="UTF-8") as file:
         yaml.dump(content, stream=file, indent=indent)
 
+def dump_yaml_all(documents: Iterable[dict], indent=DEFAULT_INDENT,
+    transform: Callable[[str], str] = None) -> Iterator[str]:
+    """
+    Dump documents one at a time (one chunk per document, separator included)
+
+    transform: applied on each chunk (eg: Helm.as_chart_template)
+    """
+    buffer = io.StringIO()
+    dumper = Dumper(buffer, indent=indent, default_flow_style=False, sort_keys=True)
+    try:
+        dumper.open()
+        for document in documents:
+            dumper.represent(document)
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            yield transform(chunk) if transform is not None else chunk
+        dumper.close()
+    finally:
+        dumper.dispose()
+
+    if buffer.getvalue() != "":
+        yield buffer.getvalue() # pragma: no cover
+
+def write_yaml_all(file_path: Union[str, Path], documents: Iterable[dict], # pylint: disable=too-many-arguments
+    indent=DEFAULT_INDENT, transform: Callable[[str], str] = None,
+    terminate: bool = False, dry_run: bool = False) -> bool:
+    """
+    Write a multi-documents yaml file, one document at a time
+
+    transform: applied on each document (eg: Helm.as_chart_template)
+    terminate: end the file with a documents separator (---)
+
+    The file is written atomically and only if the content differs from the current one.
+    Return True if the file has been written
+    """
+    chunks = dump_yaml_all(documents, indent=indent, transform=transform)
+    if terminate:
+        chunks = _chain(chunks, "---\n")
+
+    if dry_run:
+        for chunk in chunks:
+            print(chunk, end="")
+        return False
+
+    return write_chunks_if_changed(file_path, (i.encode("UTF-8") for i in chunks))
+
+def _chain(chunks: Iterable[str], last: str) -> Iterator[str]:
+    yield from chunks
+    yield last
+
 def json2yaml(content: str, indent=DEFAULT_INDENT) -> str: # pragma: no cover
     """
     Return as a yaml
@@ -97,10 +189,17 @@ def read_json(file_path: Union[str, Path]) -> dict: # pragma: no cover
     return content
 
 def write_json(file_path: Union[str, Path], content: dict, indent=DEFAULT_INDENT,
-    dry_run: bool = False):
+    dry_run: bool = False, if_changed: bool = False):
     """
     Write as a json file
+
+    if_changed: do not rewrite the file if the content is identical
     """
+    if if_changed:
+        write_if_changed(
+            file_path, json.dumps(content, indent=indent, cls=PathEncoder), dry_run=dry_run)
+        return
+
     if dry_run:
         print(json.dumps(content, indent=indent, cls=PathEncoder))
         return
@@ -118,3 +217,176 @@ def write_raw(file_path: Union[str, Path], content: str, dry_run: bool = False):
 
     with open(file_path, "w", encoding="UTF-8") as file:
         file.write(content)
+
+def digest(content: bytes) -> str:
+    """
+    Content digest (sha256)
+    """
+    return hashlib.sha256(content).hexdigest()
+
+def file_digest(file_path: Union[str, Path]) -> Optional[str]:
+    """
+    File content digest (sha256) or None if the file does not exist
+    """
+    content = hashlib.sha256()
+    try:
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                content.update(block)
+    except FileNotFoundError:
+        return None
+
+    return content.hexdigest()
+
+def directory_digest(path: Union[str, Path]) -> str:
+    """
+    Directory content digest (sha256 of sorted relative paths and files content)
+    """
+    path = Path(path)
+    content = hashlib.sha256()
+
+    for file_path in sorted(path.rglob("*")):
+        if not file_path.is_file():
+            continue
+        content.update(file_path.relative_to(path).as_posix().encode("UTF-8"))
+        content.update(b"\0")
+        content.update(file_digest(file_path).encode("UTF-8"))
+        content.update(b"\0")
+
+    return content.hexdigest()
+
+def write_if_changed(file_path: Union[str, Path], content: Union[str, bytes],
+    dry_run: bool = False) -> bool:
+    """
+    Write a file only if the content differs from the current one
+
+    The file is written atomically (temporary file renamed in place) so a reader
+    will never see a partial file.
+
+    Return True if the file has been written
+    """
+    if dry_run:
+        print(content)
+        return False
+
+    if isinstance(content, str):
+        content = content.encode("UTF-8")
+
+    if file_digest(file_path) == digest(content):
+        return False
+
+    write_atomic(file_path, content)
+
+    return True
+
+def write_chunks_if_changed(file_path: Union[str, Path], chunks: Iterable[bytes]) -> bool:
+    """
+    Write chunks as they come (atomically) only if the content differs from the current one
+
+    Return True if the file has been written
+    """
+    tmp, content_digest = _write_temporary(file_path, chunks)
+
+    if file_digest(file_path) == content_digest:
+        os.unlink(tmp)
+        return False
+
+    _replace(tmp, file_path)
+
+    return True
+
+def write_atomic(file_path: Union[str, Path], content: bytes):
+    """
+    Write a file through a temporary file renamed in place
+    """
+    tmp, _ = _write_temporary(file_path, [content])
+    _replace(tmp, file_path)
+
+def _write_temporary(file_path: Union[str, Path], chunks: Iterable[bytes]) -> Tuple[str, str]:
+    """
+    Temporary file (next to file_path) and its digest
+
+    Created with the default mode of a new file (the process umask is applied by the system)
+    """
+    file_path = Path(file_path)
+    content = hashlib.sha256()
+
+    while True:
+        tmp = os.fspath(file_path.parent / f".{file_path.name}.{secrets.token_hex(8)}")
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0),
+                0o666)
+            break
+        except FileExistsError:
+            continue
+
+    with os.fdopen(fd, "wb") as file:
+        try:
+            for chunk in chunks:
+                content.update(chunk)
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            file.close()
+            os.unlink(tmp)
+            raise
+
+    return tmp, content.hexdigest()
+
+def _replace(tmp: str, file_path: Union[str, Path]):
+    """Rename the temporary file in place (mode preserved)"""
+    if Path(file_path).exists():
+        shutil.copymode(file_path, tmp)
+
+    os.replace(tmp, file_path)
+
+def sync_directory(src: Union[str, Path], dst: Union[str, Path]) -> int:
+    """
+    Synchronize dst with src (incremental copy)
+
+    Only files with a different content are copied, modes are synchronized too.
+    Files and directories that do not exist in src are removed from dst.
+
+    Return the number of changes done in dst
+    """
+    src = Path(src)
+    dst = Path(dst)
+    changes = 0
+
+    dst.mkdir(parents=True, exist_ok=True)
+
+    expected = set()
+    for src_path in src.rglob("*"):
+        relative = src_path.relative_to(src)
+        expected.add(relative)
+        dst_path = dst / relative
+
+        if src_path.is_dir():
+            if dst_path.is_file() or dst_path.is_symlink():
+                dst_path.unlink()
+            if not dst_path.is_dir():
+                dst_path.mkdir()
+                changes += 1
+            continue
+
+        if dst_path.is_dir() and not dst_path.is_symlink():
+            shutil.rmtree(dst_path)
+
+        if write_if_changed(dst_path, src_path.read_bytes()) or \
+            stat.S_IMODE(src_path.stat().st_mode) != stat.S_IMODE(dst_path.stat().st_mode):
+            shutil.copymode(src_path, dst_path)
+            changes += 1
+
+    # remove deeper paths first
+    for dst_path in sorted(dst.rglob("*"), key=lambda path: len(path.parts), reverse=True):
+        if dst_path.relative_to(dst) in expected:
+            continue
+
+        if dst_path.is_dir() and not dst_path.is_symlink():
+            shutil.rmtree(dst_path)
+        else:
+            dst_path.unlink()
+        changes += 1
+
+    return changes
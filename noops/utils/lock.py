@@ -0,0 +1,122 @@
+"""
+Utils: inter-process advisory locks
+"""
+
+# Copyright 2021 Croix Bleue du Québec
+
+# This file is part of python-noops.
+
+# python-noops is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# python-noops is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-noops.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Optional, Union
+from ..errors import LockTimeout
+from .. import settings
+
+# delay between two attempts while waiting for a lock
+_RETRY_DELAY = 0.1
+
+if os.name == "nt": # pragma: no cover
+    import msvcrt # pylint: disable=import-error
+
+    # shared locks are not supported (always exclusive)
+    SHARED_LOCK = False
+
+    def _try_lock(fd: int, shared: bool = False) -> bool: # pylint: disable=unused-argument
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def _unlock(fd: int):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    SHARED_LOCK = True
+
+    def _try_lock(fd: int, shared: bool = False) -> bool:
+        try:
+            fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def _unlock(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+def lock_timeout() -> float:
+    """Seconds to wait for a lock (NOOPS_LOCK_TIMEOUT, 0 to wait forever)"""
+    return float(os.environ.get(settings.LOCK_TIMEOUT_ENV, settings.LOCK_TIMEOUT))
+
+def _lock(fd: int, path: Path, shared: bool, timeout: float, deadline: float):
+    while not _try_lock(fd, shared):
+        if timeout > 0 and time.monotonic() >= deadline:
+            raise LockTimeout(path, timeout)
+        time.sleep(_RETRY_DELAY)
+
+@contextmanager
+def _thread_locked(path: Path, timeout: float, deadline: float):
+    thread_lock = _thread_lock(path)
+    if not thread_lock.acquire(timeout=max(deadline - time.monotonic(), 0) if timeout > 0 else -1):
+        raise LockTimeout(path, timeout)
+    try:
+        yield
+    finally:
+        thread_lock.release()
+
+# flock is per open file description so threads of one process need their own lock
+_THREAD_LOCKS = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+
+def _thread_lock(path: Path) -> threading.Lock:
+    with _THREAD_LOCKS_GUARD:
+        return _THREAD_LOCKS.setdefault(os.fspath(path), threading.Lock())
+
+@contextmanager
+def file_lock(path: Union[str, Path], shared: bool = False, timeout: Optional[float] = None):
+    """
+    Advisory lock based on a lock file
+
+    Exclusive by default. Shared locks can be held at the same time by many
+    processes or threads (exclusive only on Windows).
+    The lock is released when leaving the context (or if the process dies).
+    The lock file is never removed to avoid races between processes.
+    LockTimeout is raised after timeout seconds (default: lock_timeout()).
+    """
+    path = Path(path).resolve()
+    shared = shared and SHARED_LOCK
+    timeout = lock_timeout() if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+
+    with _thread_locked(path, timeout, deadline) if not shared else nullcontext():
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            logging.debug("waiting for %s lock %s", "shared" if shared else "exclusive",
+                os.fspath(path))
+            _lock(fd, path, shared, timeout, deadline)
+            logging.debug("lock %s acquired", os.fspath(path))
+            try:
+                yield path
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
@@ -3,7 +3,12 @@ Backup working directory to restore it on all tests
 """
 
 import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
 from unittest import TestCase
+from noops.external.plugins import clear_plugins
 
 CWD = os.getcwd()
 
@@ -11,12 +16,47 @@ class TestCaseNoOps(TestCase):
     """
     TestCase that can restore working directory
 
-    NoOps.__init__ will change the working directory and broke some tests
+    noopsctl commands change the working directory and broke some tests
     """
     def setUp(self):
         TestCase.setUp(self)
         os.chdir(CWD)
 
+        # isolated helm upgrades cache and repositories update stamp
+        upgrades_cache = tempfile.TemporaryDirectory(prefix="noops-") # pylint: disable=consider-using-with
+        self.addCleanup(upgrades_cache.cleanup)
+        os.environ["NOOPS_UPGRADES_CACHE"] = upgrades_cache.name
+        os.environ["NOOPS_HELM_REPO_UPDATE_STAMP"] = os.path.join(
+            upgrades_cache.name, "helm-repo-update.json")
+        os.environ["KUBECONFIG"] = os.path.join(upgrades_cache.name, "kubeconfig")
+
     def resetCwd(self): # pylint: disable=invalid-name
         """Change back to initial cwd"""
         os.chdir(CWD)
+
+    @contextmanager
+    def plugins(self, groups: dict):
+        """Register in-process plugins (groups: {group: {name: module:class}})"""
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            dist_info = Path(tmpdir) / "noops_unittest_plugins-0.0.0.dist-info"
+            dist_info.mkdir()
+            (dist_info / "METADATA").write_text(
+                "Metadata-Version: 2.1\nName: noops-unittest-plugins\nVersion: 0.0.0\n",
+                encoding="UTF-8"
+            )
+            (dist_info / "entry_points.txt").write_text(
+                "".join(
+                    f"[{group}]\n" + \
+                        "".join(f"{name} = {value}\n" for name, value in entries.items())
+                    for group, entries in groups.items()
+                ),
+                encoding="UTF-8"
+            )
+
+            sys.path.insert(0, tmpdir)
+            clear_plugins()
+            try:
+                yield
+            finally:
+                sys.path.remove(tmpdir)
+                clear_plugins()
@@ -0,0 +1,90 @@
+"""
+Tests cli.batch
+"""
+
+import os
+import multiprocessing
+from pathlib import Path
+from click.testing import CliRunner
+from noops.cli.main import cli
+from noops.cli.batch import run_product
+from noops.batch import run_batch
+from .. import TestCaseNoOps, CWD
+from ..test_noops import product_copy
+
+PRODUCT=Path("tests/data/cli/product/demo").resolve()
+
+class Test(TestCaseNoOps):
+    """
+    Tests cli.batch
+    """
+    def test_cli_batch(self):
+        """
+        noopsctl batch
+        """
+        with product_copy(PRODUCT) as product1, product_copy(PRODUCT) as product2:
+            runner = CliRunner()
+            result = runner.invoke(
+                cli,
+                [
+                    "batch",
+                    "-p", os.fspath(product1),
+                    "-p", os.fspath(product2),
+                    "-j", "2",
+                    "--",
+                    "output", "-j"
+                ]
+            )
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn(f"# {os.fspath(product1)}\n", result.stdout)
+            self.assertIn(f"# {os.fspath(product2)}\n", result.stdout)
+            self.assertEqual(len(result.stderr.splitlines()), 2)
+            self.assertTrue(all(" OK " in i for i in result.stderr.splitlines()))
+
+            result = runner.invoke(
+                cli,
+                [ "batch", "-p", os.fspath(product1), "-p", "/does/not/exist", "output" ]
+            )
+            self.assertNotEqual(result.exit_code, 0)
+            self.assertIn(" FAILED ", result.stderr)
+
+    def test_run_product(self):
+        """One product (in-process)"""
+        with product_copy(PRODUCT) as product_path:
+            result = run_product(os.fspath(product_path), ["output", "-j"], [])
+            self.assertTrue(result.succeeded, result.error)
+            self.assertIn(os.fspath(product_path), result.output)
+            self.assertEqual(os.getcwd(), CWD)
+
+        result = run_product("/does/not/exist", ["output"], [])
+        self.assertFalse(result.succeeded)
+        self.assertIsNotNone(result.error)
+
+    def test_run_batch_relative(self):
+        """Relative products processed by the same worker"""
+        with product_copy(PRODUCT) as product1, product_copy(PRODUCT) as product2:
+            os.chdir(product1.parent.parent)
+            products = [
+                os.path.join(product1.parent.name, product1.name),
+                os.path.join(product2.parent.name, product2.name)
+            ]
+
+            results = run_batch(run_product, products, ["output"], workers=1)
+            self.assertTrue(all(i.succeeded for i in results), [ i.error for i in results ])
+
+    def test_run_batch_spawn(self):
+        """Workers started with spawn (default on Windows and macOS)"""
+        with product_copy(PRODUCT) as product1, product_copy(PRODUCT) as product2:
+            results = run_batch(
+                run_product, [ os.fspath(product1), os.fspath(product2) ], ["output"],
+                workers=2, mp_context=multiprocessing.get_context("spawn")
+            )
+            self.assertTrue(all(i.succeeded for i in results), [ i.error for i in results ])
+            self.assertIn(os.fspath(product1), results[0].output)
+
+    def test_cli_batch_nested(self):
+        """
+        noopsctl batch batch
+        """
+        result = CliRunner().invoke(cli, [ "batch", "-p", ".", "batch", "-p", "." ])
+        self.assertEqual(result.exit_code, 2)
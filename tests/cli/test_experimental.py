@@ -0,0 +1,107 @@
+"""
+Tests cli.experimental
+"""
+
+import io
+import json
+import os
+import tempfile
+from pathlib import Path
+from click.testing import CliRunner
+from noops.cli.main import cli
+from noops.utils.io import read_yaml, read_yaml_all
+from .. import TestCaseNoOps
+
+DATA=Path("tests/data/targets")
+
+class Test(TestCaseNoOps):
+    """
+    Tests cli.experimental
+    """
+    def test_targets_plan(self):
+        """
+        noopsctl x targets plan with one or more targets
+        """
+        target = read_yaml(DATA / "targets.yaml")
+        target["spec"]["active"]["clusterCount"] = 1
+        runner = CliRunner()
+
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            output = Path(tmpdir) / "plan.yaml"
+            result = runner.invoke(
+                cli,
+                [
+                    "x", "targets", "plan",
+                    "-c", DATA / "clusters.yaml",
+                    "-t", "-",
+                    "-o", output
+                ],
+                input=json_stream(target)
+            )
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(read_yaml(output)["active"], ["c1"])
+
+        second = read_yaml(DATA / "targets.yaml")
+        second["spec"]["active"]["clusterCount"] = 2
+        result = runner.invoke(
+            cli,
+            ["x", "targets", "plan", "-c", DATA / "clusters.yaml", "-t", "-"],
+            input=json_stream(target, second, target)
+        )
+        self.assertEqual(result.exit_code, 0)
+        self.assertListEqual(
+            [ i["active"] for i in read_yaml_all(io.StringIO(result.output)) ],
+            [ ["c1"], ["c1", "c2"], ["c1"] ]
+        )
+
+    def test_projects_bulk_plan(self):
+        """
+        noopsctl x projects bulk-plan
+        """
+        data = Path("tests/data/projects")
+        project = {
+            "kind": "Project",
+            "metadata": {"name": "test", "namespace": "ns"},
+            "spec": {"package": {"install": {"chart": "a_chart", "env": "test"}}}
+        }
+        version = dict(read_yaml(data / "versions.yaml"), metadata={"name": "test"})
+        runner = CliRunner()
+
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            sources = Path(tmpdir) / "sources"
+            sources.mkdir()
+            (sources / "project.yaml").write_text(json_stream(project, version))
+
+            args = [
+                "x", "projects", "bulk-plan",
+                "-c", os.fspath(data / "clusters.yaml"),
+                "-o", os.fspath(Path(tmpdir) / "plans"),
+                os.fspath(sources), os.fspath(data / "targets.yaml")
+            ]
+            result = runner.invoke(cli, args)
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.output, "added      ns/test\nadded: 1\n")
+
+            result = runner.invoke(cli, args)
+            self.assertEqual(result.output, "unchanged  ns/test\nunchanged: 1\n")
+
+            # invalid version
+            (sources / "project.yaml").write_text(json_stream(project))
+            (sources / "version.yaml").write_text(
+                json_stream(
+                    dict(
+                        version,
+                        spec={
+                            "one": {"app_version": "1"},
+                            "multi": [{"app_version": "2", "weight": 100}]
+                        }
+                    )
+                )
+            )
+            result = runner.invoke(cli, args)
+            self.assertEqual(result.exit_code, 1)
+            self.assertTrue(result.output.startswith("failed     ns/test: "))
+
+def json_stream(*documents: dict) -> str:
+    """Multi-documents yaml stream (json is yaml)"""
+    return "---\n".join(f"{json.dumps(i)}\n" for i in documents)
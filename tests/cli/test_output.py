@@ -3,10 +3,14 @@ Tests cli.output
 """
 
 import os
+import fcntl
+import subprocess
+import sys
 from pathlib import Path
+from unittest.mock import patch
 from click.testing import CliRunner
 from noops.cli.main import cli
-from .. import TestCaseNoOps
+from .. import TestCaseNoOps, CWD
 from ..test_noops import product_copy
 
 PRODUCT=Path("tests/data/cli/product/demo").resolve()
@@ -37,3 +41,52 @@ class Test(TestCaseNoOps):
                 result.output,
                 output_yaml.replace('{BASE}', os.fspath(product_path))
             )
+
+    def test_cli_output_workdir_lock(self):
+        """
+        noopsctl holds a shared lock on the workdir during the command
+        """
+
+        def is_locked(product_path: Path) -> bool:
+            fd = os.open(product_path / "noops_workdir.lock", os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return False
+            except BlockingIOError:
+                return True
+            finally:
+                os.close(fd)
+
+        with product_copy(PRODUCT) as product_path:
+            locked = []
+            with patch(
+                "noops.noops.NoOps.output",
+                side_effect=lambda **kwargs: locked.append(is_locked(product_path))
+            ):
+                result = CliRunner().invoke(cli, ["-p", os.fspath(product_path), "output"])
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertEqual(locked, [True])
+            self.assertFalse(is_locked(product_path))
+
+    def test_cli_output_nested(self):
+        """
+        noopsctl started by a script of a noopsctl command does not wait for the workdir lock
+        """
+
+        def nested(**kwargs): # pylint: disable=unused-argument
+            # the workdir is recreated (exclusive lock) while the parent command holds it
+            subprocess.run(
+                [
+                    sys.executable, "-c",
+                    f"from noops.noops import NoOps; NoOps({os.fspath(product_path)!r}, True, True)"
+                ],
+                check=True, cwd=CWD, timeout=60, env={**os.environ, "NOOPS_LOCK_TIMEOUT": "5"}
+            )
+
+        with product_copy(PRODUCT) as product_path:
+            with patch("noops.noops.NoOps.output", side_effect=nested):
+                result = CliRunner().invoke(cli, ["-p", os.fspath(product_path), "output"])
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertNotIn("NOOPS_WORKDIR_LOCK_HELD", os.environ)
@@ -0,0 +1,35 @@
+"""
+Tests cli.package
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from click.testing import CliRunner
+from noops.cli.main import cli
+from noops.package.index import read_index
+from .. import TestCaseNoOps
+from ..package.test_index import create_package
+
+class Test(TestCaseNoOps):
+    """
+    Tests cli.package
+    """
+    def test_index(self):
+        """
+        noopsctl package index
+        """
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            create_package(Path(tmpdir), "demo", "1.0.0")
+
+            runner = CliRunner()
+            result = runner.invoke(
+                cli,
+                ["package", "index", "-d", os.fspath(tmpdir), "-u", "http://repo.local"]
+            )
+            self.assertEqual(result.exit_code, 0, result.output)
+
+            self.assertEqual(
+                read_index(Path(tmpdir))["entries"]["demo"][0]["urls"],
+                ["http://repo.local/demo-1.0.0.tgz"]
+            )
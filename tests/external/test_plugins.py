@@ -0,0 +1,58 @@
+"""
+Tests noops.external.plugins
+"""
+
+from noops.external.plugins import load_plugin, preprocessing_plugin, svcat_converter_plugin
+from noops.external.preprocessing import PreProcessing
+from noops.external.processing import Processing
+from .. import TestCaseNoOps
+
+class PreProcessingUnittest(PreProcessing):
+    """Unittest pre-processing"""
+    def apply(self, env, chart, values, templates, kustomize):
+        """Nothing to do"""
+
+class ProcessingUnittest(Processing):
+    """Unittest processing"""
+    def convert(self, service_request, name):
+        """One object"""
+        return [{"kind": "Test", "spec": {"name": name}}]
+
+class Test(TestCaseNoOps):
+    """
+    Tests noops.external.plugins
+    """
+    def test_plugins(self):
+        """Plugins registered with entry points"""
+        self.assertIsNone(preprocessing_plugin("pp.py"))
+        self.assertIsNone(svcat_converter_plugin("operator", "plan"))
+
+        with self.plugins({
+            "noops.preprocessing": {
+                "pp.py": "tests.external.test_plugins:PreProcessingUnittest"
+            },
+            "noops.svcat_converters": {
+                "operator/plan": "tests.external.test_plugins:ProcessingUnittest"
+            }
+        }):
+            self.assertIs(load_plugin("noops.preprocessing", "pp.py"), PreProcessingUnittest)
+            self.assertIsInstance(preprocessing_plugin("pp.py"), PreProcessingUnittest)
+            self.assertIsNone(preprocessing_plugin("other.py"))
+
+            converter = svcat_converter_plugin("operator", "plan")
+            self.assertEqual(
+                converter.convert({}, "svc"),
+                [{"kind": "Test", "spec": {"name": "svc"}}]
+            )
+            self.assertIsNone(svcat_converter_plugin("operator", "other"))
+
+        self.assertIsNone(preprocessing_plugin("pp.py"))
+
+    def test_envs(self):
+        """Release extra envs for an in-process pre-processing"""
+        plugin = PreProcessingUnittest()
+        self.assertNotIn("NOOPS_UNITTEST", plugin.envs)
+
+        plugin.with_envs({"NOOPS_UNITTEST": "1"})
+        self.assertEqual(plugin.envs["NOOPS_UNITTEST"], "1")
+        self.assertNotIn("NOOPS_UNITTEST", PreProcessingUnittest().envs)
@@ -3,17 +3,26 @@ Tests noops.package.helm
 """
 
 import os
-from unittest.mock import patch, call
+import tarfile
+import time
 from pathlib import Path
+from unittest.mock import patch
+import yaml
 from noops.noops import NoOps
 from noops.package.helm import Helm
 from noops.package.prepare import prepare
+from noops.utils.io import file_digest
 from ..test_noops import product_copy, read_yaml_base, read_yaml
 from .. import TestCaseNoOps
 
 OVERRIDE_TAG=Path("tests/data/package/helm/override_tag.yaml").resolve()
 PRODUCT=Path("tests/data/package/helm/product").resolve()
 
+def read_package_yaml(package: Path, name: str) -> dict:
+    """yaml file in a helm package"""
+    with tarfile.open(package, "r:gz") as tar:
+        return yaml.safe_load(tar.extractfile(name))
+
 class Test(TestCaseNoOps):
     """
     Tests noops.package.helm
@@ -67,6 +76,71 @@ class Test(TestCaseNoOps):
                 '{{ include "demo.fullname" . }}\n{{ include "demo.other" . }}'
             )
 
+            # quotes, macros on the same line, unknown macro
+            self.assertEqual(
+                helm.as_chart_template(
+                    "a: '{{ .Values.a }}'\n"
+                    "b: '{{noops:chart:include:b}}' {{noops:chart:values:svcat.bindings}}\n"
+                    "c: {{noops:chart:tpl:.Values.c}} {{noops:chart:unknown:c}}'\n"
+                    "d: 'it''s'\n"
+                ),
+                'a: {{ .Values.a }}\n'
+                'b: {{ include "demo.b" . }} {{ .Values.svcat.bindings }}\n'
+                'c: {{ tpl .Values.c . }} {{noops:chart:unknown:c}}\n'
+                "d: 'it''s'\n"
+            )
+
+            # extra macros
+            self.assertEqual(
+                helm.as_chart_template(
+                    "{{noops:chart:upper:x}} {{noops:chart:include:y}}",
+                    macros={
+                        "upper": lambda _, argument: argument.upper(),
+                        "include": lambda _, argument: f"[{argument}]"
+                    }
+                ),
+                "X [y]"
+            )
+            self.assertEqual(
+                helm.as_chart_template("{{noops:chart:upper:x}}"),
+                "{{noops:chart:upper:x}}"
+            )
+
+    def test_templates_large(self):
+        """Large templates are rewritten in a single pass"""
+
+        with product_copy(PRODUCT) as product_path:
+            noops = NoOps(product_path, dry_run=True, rm_cache=True)
+
+            helm = Helm(noops)
+
+            source = "".join(
+                f"  key{i}: '{{{{noops:chart:include:macro{i}}}}}'\n"
+                f"  value{i}: '{{{{ .Values.value{i} }}}}'\n"
+                for i in range(20000)
+            )
+
+            includes = []
+            def include(helm: Helm, argument: str) -> str:
+                includes.append(argument)
+                return helm.include(argument)
+
+            with patch.object(Helm, "re_template", wraps=Helm.re_template) as mock_re:
+                template = helm.as_chart_template(source, {"include": include})
+
+            # one pass over the source, each directive rewritten once
+            self.assertEqual(mock_re.sub.call_count, 1)
+            self.assertEqual(len(includes), 20000)
+
+            self.assertTrue(template.startswith(
+                '  key0: {{ include "demo.macro0" . }}\n  value0: {{ .Values.value0 }}\n'
+            ))
+            self.assertTrue(template.endswith(
+                '  key19999: {{ include "demo.macro19999" . }}\n'
+                '  value19999: {{ .Values.value19999 }}\n'
+            ))
+            self.assertNotIn("'", template)
+
     def test_create_values(self):
         """Create values"""
 
@@ -218,8 +292,7 @@ class Test(TestCaseNoOps):
                 ]
             )
 
-    @patch("noops.package.helm.execute")
-    def test_create_package(self, mock_execute):
+    def test_create_package(self):
         """Create Helm Package"""
 
         with product_copy(PRODUCT) as product_path:
@@ -227,11 +300,19 @@ class Test(TestCaseNoOps):
             helm = Helm(noops)
             prepare(noops, helm)
 
-            helm.create_package(
+            chart_before = (noops.workdir / "helm/chart/Chart.yaml").read_text(encoding="UTF-8")
+
+            package = helm.create_package(
                 "1.0.0", "127", "New feature", OVERRIDE_TAG)
 
+            self.assertEqual(package, noops.workdir / "demo-127+0.1.0.tgz")
             self.assertEqual(
-                read_yaml(noops.workdir / "helm/chart/Chart.yaml"),
+                (noops.workdir / "helm-package").read_text(encoding="UTF-8"),
+                "demo-127+0.1.0.tgz"
+            )
+
+            self.assertEqual(
+                read_package_yaml(package, "demo/Chart.yaml"),
                 {
                     'apiVersion': 'v2',
                     'appVersion': '1.0.0',
@@ -248,7 +329,7 @@ class Test(TestCaseNoOps):
             )
 
             self.assertEqual(
-                read_yaml(noops.workdir / "helm/chart/noops.yaml"),
+                read_package_yaml(package, "demo/noops.yaml"),
                 {
                     'apiVersion': 'noops.local/v1alpha1',
                     'kind': 'Chart',
@@ -264,37 +345,71 @@ class Test(TestCaseNoOps):
             )
 
             self.assertEqual(
-                read_yaml(noops.workdir / "helm/chart/values.yaml"),
+                read_package_yaml(package, "demo/values.yaml"),
                 {
                     "image": "unittest",
                     "tag": "127"
                 }
             )
 
+            # chart directory is not modified
             self.assertEqual(
-                mock_execute.call_args_list[0],
-                call(
-                    'helm',
-                    [
-                        'package',
-                        os.fspath(noops.workdir / "helm/chart"),
-                        '-d',
-                        os.fspath(noops.workdir)
-                    ],
-                    dry_run=False
-                )
+                (noops.workdir / "helm/chart/Chart.yaml").read_text(encoding="UTF-8"),
+                chart_before
             )
 
-    @patch("noops.package.helm.execute")
-    def test_push_package(self, mock_execute):
+    def test_create_package_reproducible(self):
+        """Same inputs, same package"""
+
+        digests = []
+        for _ in range(2):
+            with product_copy(PRODUCT) as product_path:
+                noops = NoOps(product_path, dry_run=False, rm_cache=True)
+                helm = Helm(noops)
+                prepare(noops, helm)
+
+                package = helm.create_package(
+                    "1.0.0", "127", "New feature", OVERRIDE_TAG)
+                digests.append(file_digest(package))
+
+                with tarfile.open(package, "r:gz") as tar:
+                    names = tar.getnames()
+                self.assertEqual(names, sorted(names))
+                self.assertTrue(all(i.startswith("demo/") for i in names))
+
+                # unchanged package is not rewritten
+                mtime = package.stat().st_mtime_ns
+                time.sleep(0.01)
+                helm.create_package("1.0.0", "127", "New feature", OVERRIDE_TAG)
+                self.assertEqual(package.stat().st_mtime_ns, mtime)
+
+        self.assertEqual(digests[0], digests[1])
+
+    def test_create_package_dry_run(self):
+        """Dry run does not create the package"""
+
+        with product_copy(PRODUCT) as product_path:
+            noops = NoOps(product_path, dry_run=True, rm_cache=True)
+            helm = Helm(noops)
+
+            package = helm.create_package("1.0.0", "127", "New feature", None)
+
+            self.assertEqual(package.name, "demo-127+0.1.0.tgz")
+            self.assertFalse(package.exists())
+
+    def test_push_package(self):
         """Push Helm Package"""
 
         with product_copy(PRODUCT) as product_path:
             noops = NoOps(product_path, dry_run=True, rm_cache=True)
             helm = Helm(noops)
 
-            package = product_path / "noops_workdir/unittest-0.1.0.tgz"
-            package.touch()
+            chart = product_path / "unittest"
+            chart.mkdir()
+            (chart / "Chart.yaml").write_text(
+                "apiVersion: v2\nname: unittest\nversion: 0.1.0\n", encoding="UTF-8")
+            with tarfile.open(product_path / "noops_workdir/unittest-0.1.0.tgz", "w:gz") as tar:
+                tar.add(chart, arcname="unittest")
             directory = product_path / "www"
             directory.mkdir()
 
@@ -302,16 +417,8 @@ class Test(TestCaseNoOps):
 
             self.assertTrue((directory / "unittest-0.1.0.tgz").exists())
 
+            index = read_yaml(directory / "index.yaml")
             self.assertEqual(
-                mock_execute.call_args_list[0],
-                call(
-                    'helm',
-                    [
-                        'repo',
-                        'index',
-                        os.fspath(directory),
-                        '--url',
-                        'http://repo.local'
-                    ]
-                )
+                index["entries"]["unittest"][0]["urls"],
+                ["http://repo.local/unittest-0.1.0.tgz"]
             )
@@ -0,0 +1,141 @@
+"""
+Tests noops.package.index
+"""
+
+import tarfile
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+import yaml
+from noops.package import index
+from noops.package.index import semver_key, chart_metadata, index_packages, read_index
+from noops.utils.io import file_digest
+from noops.errors import PackageInvalid
+from .. import TestCaseNoOps
+
+def create_package(directory: Path, name: str, version: str) -> Path:
+    """Minimal helm package"""
+    chart = directory / "src" / version / name
+    chart.mkdir(parents=True)
+    (chart / "Chart.yaml").write_text(
+        f"apiVersion: v2\nname: {name}\nversion: {version}\ndescription: unittest\n",
+        encoding="UTF-8"
+    )
+    (chart / "values.yaml").write_text("key: value\n", encoding="UTF-8")
+
+    package = directory / f"{name}-{version}.tgz"
+    with tarfile.open(package, "w:gz") as tar:
+        tar.add(chart, arcname=name)
+    return package
+
+class Test(TestCaseNoOps):
+    """
+    Tests noops.package.index
+    """
+    def test_semver_key(self):
+        """Semantic versioning precedence"""
+        versions = [
+            "1.0.0", "1.0.0-alpha", "1.0.0-alpha.1", "1.0.0-alpha.beta", "1.0.0-beta",
+            "1.0.0-beta.2", "1.0.0-beta.11", "1.0.0-rc.1", "2.0.0", "1.10.0", "1.2",
+            "127+0.1.0", "not-a-version"
+        ]
+        self.assertEqual(
+            sorted(versions, key=semver_key),
+            [
+                "not-a-version", "1.0.0-alpha", "1.0.0-alpha.1", "1.0.0-alpha.beta",
+                "1.0.0-beta", "1.0.0-beta.2", "1.0.0-beta.11", "1.0.0-rc.1", "1.0.0",
+                "1.2", "1.10.0", "2.0.0", "127+0.1.0"
+            ]
+        )
+
+    def test_chart_metadata(self):
+        """Chart.yaml of a package"""
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            package = create_package(Path(tmpdir), "demo", "1.0.0")
+            self.assertEqual(
+                chart_metadata(package),
+                {"apiVersion": "v2", "name": "demo", "version": "1.0.0", "description": "unittest"}
+            )
+
+            invalid = Path(tmpdir) / "invalid-1.0.0.tgz"
+            with tarfile.open(invalid, "w:gz") as tar:
+                tar.add(Path(tmpdir) / "src", arcname="src")
+            with self.assertRaises(PackageInvalid):
+                chart_metadata(invalid)
+
+    def test_index_packages(self):
+        """Incremental index and rebuild"""
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            repo = Path(tmpdir)
+            create_package(repo, "demo", "1.0.0")
+            create_package(repo, "demo", "1.10.0")
+            create_package(repo, "other", "0.1.0")
+
+            # no index yet: all packages
+            with patch.object(index.io, "file_digest", wraps=file_digest) as mock_digest:
+                result = index_packages(repo, "http://repo.local/", [repo / "demo-1.10.0.tgz"])
+                self.assertEqual(mock_digest.call_count, 3)
+
+            self.assertEqual(read_index(repo), result)
+            self.assertEqual(
+                [ i["version"] for i in result["entries"]["demo"] ], ["1.10.0", "1.0.0"])
+            entry = result["entries"]["demo"][0]
+            self.assertEqual(entry["urls"], ["http://repo.local/demo-1.10.0.tgz"])
+            self.assertEqual(entry["digest"], file_digest(repo / "demo-1.10.0.tgz"))
+            self.assertIsInstance(entry["created"], str)
+            # quoted (not a yaml timestamp)
+            self.assertIsInstance(
+                yaml.safe_load((repo / "index.yaml").read_text(encoding="UTF-8")) \
+                    ["entries"]["demo"][0]["created"],
+                str
+            )
+
+            # incremental: one digest
+            create_package(repo, "demo", "1.2.0")
+            with patch.object(index.io, "file_digest", wraps=file_digest) as mock_digest:
+                result = index_packages(repo, "http://repo.local", [repo / "demo-1.2.0.tgz"])
+                self.assertEqual(mock_digest.call_count, 1)
+            self.assertEqual(
+                [ i["version"] for i in result["entries"]["demo"] ],
+                ["1.10.0", "1.2.0", "1.0.0"]
+            )
+            self.assertEqual(result["entries"]["demo"][0], entry)
+
+            # rebuild: digests from the cache, created kept, removed packages dropped
+            (repo / "other-0.1.0.tgz").unlink()
+            with patch.object(index.io, "file_digest", wraps=file_digest) as mock_digest:
+                result = index_packages(repo, "http://repo.local")
+                self.assertEqual(mock_digest.call_count, 0)
+            self.assertEqual(list(result["entries"]), ["demo"])
+            self.assertEqual(result["entries"]["demo"][0], entry)
+
+            # same version pushed again
+            create_package(repo / "src", "demo", "1.10.0")
+            (repo / "src/demo-1.10.0.tgz").replace(repo / "demo-1.10.0.tgz")
+            result = index_packages(repo, None, [repo / "demo-1.10.0.tgz"])
+            self.assertEqual(len(result["entries"]["demo"]), 3)
+            self.assertEqual(result["entries"]["demo"][0]["urls"], ["demo-1.10.0.tgz"])
+            self.assertNotEqual(result["entries"]["demo"][0]["digest"], entry["digest"])
+
+    def test_index_concurrent(self):
+        """Concurrent pushers"""
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            repo = Path(tmpdir)
+            packages = [ create_package(repo, "demo", f"1.{i}.0") for i in range(8) ]
+            index_packages(repo, "http://repo.local", [])
+            packages.append(create_package(repo, "demo", "2.0.0"))
+
+            threads = [
+                threading.Thread(target=index_packages, args=(repo, "http://repo.local", [i]))
+                for i in packages
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(
+                [ i["version"] for i in read_index(repo)["entries"]["demo"] ],
+                ["2.0.0"] + [ f"1.{i}.0" for i in reversed(range(8)) ]
+            )
@@ -2,22 +2,107 @@
 Tests noops.package.install
 """
 
+# pylint: disable=too-many-lines
+
+import json
+import subprocess
 import tempfile
 import os
+import shutil
+import tarfile
+import threading
+import time
 from unittest.mock import patch, call
 from pathlib import Path
 from noops.package.install import HelmInstall
+from noops.projects import Projects
 from noops.typing.versions import MultiSpec
 from noops.typing.projects import ProjectKind, WhiteLabelSpec
 from noops.typing.profiles import ProfileEnum
 from noops.typing.targets import TargetsEnum
 from noops.errors import KustomizeStructure
+from noops.external.preprocessing import PreProcessing
 from .. import TestCaseNoOps
-from ..test_noops import read_yaml
+from ..test_noops import read_yaml, write_yaml
 
 DATA=Path("tests/data/package/install").resolve()
 
-class Test(TestCaseNoOps):
+def kustomize_package(tmpdir: Path, helm: dict = None) -> Path:
+    """Local package demo-1.0.0.tgz (chart with kustomize)"""
+    chart = tmpdir / "demo"
+    shutil.copytree(DATA / "kustomize2", chart)
+    (chart / "noops").mkdir()
+    (chart / "noops/profile-default.yaml").touch()
+    write_yaml(
+        chart / "noops.yaml",
+        {
+            "apiVersion": "noops.local/v1alpha1",
+            "kind": "Chart",
+            "spec": {
+                "package": {
+                    "helm": helm or {},
+                    "supported": {
+                        "profile-classes": {},
+                        "target-classes": {}
+                    }
+                }
+            }
+        }
+    )
+
+    pkg = tmpdir / "demo-1.0.0.tgz"
+    with tarfile.open(pkg, "w:gz") as tar:
+        tar.add(chart, arcname="demo")
+
+    return pkg
+
+class FakeHelm():
+    """helm upgrade/uninstall/list/history (execute side effect)"""
+    def __init__(self):
+        self.revisions = {}
+
+    def rollback(self, release: str):
+        """Out-of-band rollback (new revision)"""
+        last = self.revisions[release][-1]
+        self.revisions[release].append(
+            {"revision": last["revision"] + 1, "status": "deployed", "description": "Rollback"})
+
+    def __call__(self, cmd, args, **kwargs): # pylint: disable=unused-argument
+        stdout = b""
+        if cmd == "helm" and args[0] == "upgrade":
+            revisions = self.revisions.setdefault(args[1], [])
+            revisions.append({
+                "revision": len(revisions) + 1,
+                "status": "deployed",
+                "description": args[args.index("--description") + 1] \
+                    if "--description" in args else "Upgrade complete"
+            })
+        elif cmd == "helm" and args[0] == "uninstall":
+            self.revisions.pop(args[1], None)
+        elif cmd == "helm" and args[0] == "list":
+            stdout = json.dumps([
+                {
+                    "name": name,
+                    "revision": str(revisions[-1]["revision"]),
+                    "status": revisions[-1]["status"]
+                }
+                for name, revisions in self.revisions.items()
+            ]).encode()
+        elif cmd == "helm" and args[0] == "history":
+            if args[1] not in self.revisions:
+                raise subprocess.CalledProcessError(1, args, stderr=b"Error: release: not found")
+            stdout = json.dumps(self.revisions[args[1]][-1:]).encode()
+        return subprocess.CompletedProcess(args, 0, stdout=stdout)
+
+class PreProcessingPlugin(PreProcessing):
+    """In-process pre-processing"""
+    calls = []
+
+    def apply(self, env, chart, values, templates, kustomize):
+        """Record the call"""
+        PreProcessingPlugin.calls.append((env, chart, values, templates, kustomize, self.envs))
+
+class Test(TestCaseNoOps): # pylint: disable=too-many-public-methods
     """
     Tests noops.package.install
     """
@@ -34,6 +119,22 @@ class Test(TestCaseNoOps):
         helm = HelmInstall(False, "unittest")
         self.assertEqual(helm.global_flags(), ['--kube-context', 'unittest'])
 
+    def test_kube_context(self):
+        """Current context of the kubeconfig (first file that sets it)"""
+
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            kubeconfigs = [ Path(tmpdir) / i for i in ("missing", "empty", "first", "second") ]
+            write_yaml(kubeconfigs[1], {"current-context": ""})
+            write_yaml(kubeconfigs[2], {"current-context": "first"})
+            write_yaml(kubeconfigs[3], {"current-context": "second"})
+            os.environ["KUBECONFIG"] = os.pathsep.join(os.fspath(i) for i in kubeconfigs)
+
+            self.assertEqual(HelmInstall(False).kube_context, "first")
+            self.assertEqual(HelmInstall(False, "unittest").kube_context, "unittest")
+
+            os.environ["KUBECONFIG"] = os.fspath(kubeconfigs[0])
+            self.assertIsNone(HelmInstall(False).kube_context)
+
     @patch("noops.package.install.execute")
     def test_update(self, mock_execute):
         """Update helm repo"""
@@ -45,6 +146,81 @@ class Test(TestCaseNoOps):
             call('helm', ['repo', 'update'], capture_output=True)
         )
 
+    @patch("noops.package.install.execute")
+    def test_update_debounced(self, mock_execute):
+        """Recent update is not done again"""
+
+        HelmInstall.update()
+        HelmInstall.update()
+        HelmInstall.update("repo")
+
+        self.assertEqual(
+            mock_execute.call_args_list,
+            [ call('helm', ['repo', 'update'], capture_output=True) ]
+        )
+
+        # outside of the window
+        os.environ["NOOPS_HELM_REPO_UPDATE_WINDOW"] = "0"
+        self.addCleanup(os.environ.pop, "NOOPS_HELM_REPO_UPDATE_WINDOW")
+        HelmInstall.update("repo")
+        self.assertEqual(
+            mock_execute.call_args_list[1],
+            call('helm', ['repo', 'update', 'repo'], capture_output=True)
+        )
+
+    @patch("noops.package.install.execute")
+    def test_update_concurrent(self, mock_execute):
+        """Update done while waiting for the lock is not done again"""
+        os.environ["NOOPS_HELM_REPO_UPDATE_WINDOW"] = "0"
+        self.addCleanup(os.environ.pop, "NOOPS_HELM_REPO_UPDATE_WINDOW")
+
+        started = threading.Event()
+        def slow_update(*_, **__):
+            started.set()
+            time.sleep(0.2)
+        mock_execute.side_effect = slow_update
+
+        thread = threading.Thread(target=HelmInstall.update)
+        thread.start()
+        started.wait()
+        HelmInstall.update()
+        thread.join()
+
+        self.assertEqual(mock_execute.call_count, 1)
+
+    @patch("noops.package.install.execute")
+    def test_update_repository_fallback(self, mock_execute):
+        """Unknown repository, all repositories are updated"""
+        mock_execute.side_effect = [ subprocess.CalledProcessError(1, "helm"), None ]
+
+        HelmInstall.update("unknown")
+
+        self.assertEqual(
+            mock_execute.call_args_list,
+            [
+                call('helm', ['repo', 'update', 'unknown'], capture_output=True),
+                call('helm', ['repo', 'update'], capture_output=True)
+            ]
+        )
+
+    @patch("noops.package.install.execute")
+    def test_search_latest_update_repository(self, mock_execute):
+        """Chart not found, only its repository is updated"""
+        searches = [ b"[]", b'[{"name": "repo/demo", "version": "1.0.0"}]' ]
+        def helm(_, args, **__):
+            return subprocess.CompletedProcess(
+                args, 0, stdout=searches.pop(0) if args[0] == "search" else b"")
+        mock_execute.side_effect = helm
+
+        self.assertEqual(
+            HelmInstall.search_latest("repo/demo"),
+            {"name": "repo/demo", "version": "1.0.0"}
+        )
+        self.assertEqual(
+            mock_execute.call_args_list[1],
+            call('helm', ['repo', 'update', 'repo'], capture_output=True)
+        )
+
     @patch("noops.package.install.execute")
     def test_pull(self, mock_execute):
         """Pull from helm repo"""
@@ -96,6 +272,66 @@ class Test(TestCaseNoOps):
                 dry_run=False, capture_output=True)
         )
 
+    @patch("noops.package.install.HelmInstall.uninstall")
+    @patch("noops.package.install.HelmInstall.upgrade")
+    @patch("noops.package.install.execute")
+    def test_reconciliation_skip_unchanged(self, mock_execute, mock_upgrade, mock_uninstall):
+        """Reconciliation with the live helm state"""
+
+        kproject = ProjectKind.parse_obj({
+            "metadata": {"name": "test", "namespace": "ns"},
+            "spec": {
+                "package": {"install": {"chart": "a_chart", "env": "test"}},
+                "versions": {"multi": [{"app_version": "1.0.0"}, {"app_version": "2.0.0"}]}
+            }
+        })
+        kprevious = ProjectKind.parse_obj({
+            "metadata": {"name": "test", "namespace": "ns"},
+            "spec": {
+                "package": {"install": {"chart": "a_chart", "env": "prod"}},
+                "versions": {"multi": [{"app_version": "0.0.1"}, {"app_version": "0.0.2"}]}
+            }
+        })
+
+        # test-0-0-1 (not listed) and test-0-0-2 are removed
+        releases = [
+            {"name": "test-1-0-0", "status": "deployed", "revision": "1"},
+            {"name": "test-0-0-2", "status": "deployed", "revision": "3"}
+        ]
+
+        def helm(_, args, **kwargs): # pylint: disable=unused-argument
+            if args[0] == "status":
+                # not in the list (eg: truncated list) but installed
+                if args[1] == "test-0-0-1":
+                    return subprocess.CompletedProcess(args, 0, stdout=b"")
+                raise subprocess.CalledProcessError(1, args, stderr=b"Error: release: not found")
+            return subprocess.CompletedProcess(args, 0, stdout=json.dumps(releases).encode())
+        mock_execute.side_effect = helm
+
+        helm_install = HelmInstall(False, kube_context="c1", skip_unchanged=True)
+        helm_install.reconciliation(kproject, kprevious, Path("/path/to/preprocessing"))
+
+        # live state is read once per namespace
+        self.assertEqual(
+            mock_execute.call_args_list[0],
+            call(
+                "helm",
+                [
+                    "list", "--all", "--max", "0", "--namespace", "ns", "-o", "json",
+                    "--kube-context", "c1"
+                ],
+                capture_output=True
+            )
+        )
+        self.assertEqual([ i.args[1][0] for i in mock_execute.call_args_list ], ["list", "status"])
+
+        self.assertEqual(
+            mock_uninstall.call_args_list, [call("ns", "test-0-0-1"), call("ns", "test-0-0-2")])
+
+        # upgrades compare their digest with the live state
+        self.assertEqual(
+            [ i.args[1] for i in mock_upgrade.call_args_list ], ["test-1-0-0", "test-2-0-0"])
+
     def test_canary_weight(self):
         """Canary weight"""
 
@@ -111,13 +347,39 @@ class Test(TestCaseNoOps):
             ]
         )
 
-    def test_reorder(self):
-        """Reorder an unordered sub list of an another one"""
+    def test_reconciliation_plan_large(self):
+        """Reconciliation plan with 1k versions.multi (synthetic canary)"""
+
+        def project(app_versions, weight=None):
+            return ProjectKind.parse_obj({
+                "metadata": {"name": "test", "namespace": "ns"},
+                "spec": {
+                    "package": {"install": {"chart": "a_chart", "env": "test"}},
+                    "versions": {
+                        "multi": [
+                            {"app_version": str(i), "weight": weight} for i in app_versions
+                        ]
+                    }
+                }
+            })
+
+        previous = project(range(1000))
+        current = project(list(range(1500, 500, -1)))
+        current.spec.versions.multi[-1].args = ["--set", "changed=true"] # app_version 501
 
+        with patch.object(
+            HelmInstall, "_release_fingerprint", wraps=HelmInstall._release_fingerprint # pylint: disable=protected-access
+        ) as mock_fingerprint:
+            plan = HelmInstall._reconciliation_plan(current, previous) # pylint: disable=protected-access
+
+        self.assertEqual([i.app_version for i in plan.removed], [str(i) for i in range(501)])
         self.assertEqual(
-            HelmInstall._reorder([3,5], [1,2,5,3,9]), # pylint: disable=protected-access
-            [5,3]
+            [i.app_version for i in plan.added], [str(i) for i in range(1500, 999, -1)]
         )
+        self.assertEqual([i.app_version for i in plan.changed], ["501"])
+
+        # single pass: each common version (501 to 999) is fingerprinted once per side
+        self.assertEqual(mock_fingerprint.call_count, 2 * 499)
 
     def test_canary_versions(self):
         """Canary versions involved"""
@@ -664,31 +926,62 @@ class Test(TestCaseNoOps):
             call('ns', 'demo')
         )
 
+    @patch("noops.package.install.execute")
+    def test_release_exists(self, mock_execute):
+        """Release missing from the list is confirmed with helm status"""
+
+        def helm(_, args, **kwargs): # pylint: disable=unused-argument
+            if args[0] == "list":
+                return subprocess.CompletedProcess(
+                    args, 0, stdout=json.dumps([{"name": "listed"}]).encode())
+            if args[1] == "installed":
+                return subprocess.CompletedProcess(args, 0, stdout=b"")
+            raise subprocess.CalledProcessError(1, args, stderr=b"Error: release: not found")
+        mock_execute.side_effect = helm
+
+        helm_install = HelmInstall(False, skip_unchanged=True)
+        self.assertTrue(helm_install.release_exists("ns", "listed"))
+        self.assertTrue(helm_install.release_exists("ns", "installed"))
+        self.assertFalse(helm_install.release_exists("ns", "removed"))
+        self.assertEqual(
+            [ i.args[1][:2] for i in mock_execute.call_args_list ],
+            [["list", "--all"], ["status", "installed"], ["status", "removed"]]
+        )
+
+        with patch.object(HelmInstall, "uninstall") as mock_uninstall:
+            helm_install._reconciliation_uninstall("ns", "removed") # pylint: disable=protected-access
+            helm_install._reconciliation_uninstall("ns", "installed") # pylint: disable=protected-access
+            self.assertEqual(mock_uninstall.call_args_list, [call("ns", "installed")])
+
     def test_kustomize(self):
         """Kustomize for Helm Post-Renderer"""
-        kustomize0 = DATA / "kustomize0"
-        kustomize1 = DATA / "kustomize1"
-        kustomize2 = DATA / "kustomize2"
-        kustomize3 = DATA / "kustomize3"
 
         with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
-            os.chdir(os.fspath(tmpdir))
-            os.mkdir("noops_workdir")
-            hpr = Path(tmpdir) / "noops_workdir/noopshpr.yaml"
+            # one directory per install with the chart in it
+            for kustomize in ("kustomize1", "kustomize2", "kustomize3"):
+                shutil.copytree(DATA / kustomize, Path(tmpdir) / kustomize / "chart")
+            (Path(tmpdir) / "kustomize0/chart").mkdir(parents=True)
+
+            kustomize0 = Path(tmpdir) / "kustomize0/chart"
+            kustomize1 = Path(tmpdir) / "kustomize1/chart"
+            kustomize2 = Path(tmpdir) / "kustomize2/chart"
+            kustomize3 = Path(tmpdir) / "kustomize3/chart"
 
             # kustomize does not exist
             self.assertEqual(
                 HelmInstall._kustomize(kustomize0, "unittest"), # pylint: disable=protected-access
-                ([],[])
+                ([],[],{})
             )
-            self.assertFalse(hpr.exists())
+            self.assertFalse((kustomize0.parent / "noopshpr.yaml").exists())
 
             # kustomize with base only
+            hpr = kustomize1.parent / "noopshpr.yaml"
             self.assertEqual(
                 HelmInstall._kustomize(kustomize1, "unittest"), # pylint: disable=protected-access
                 (
                     ['--post-renderer', 'noopshpr'],
-                    ['-k', os.fspath(kustomize1 / "kustomize/base")]
+                    ['-k', os.fspath(kustomize1 / "kustomize/base")],
+                    {'NOOPS_HPR': os.fspath(hpr)}
                 )
             )
             self.assertTrue(hpr.exists())
@@ -701,6 +994,7 @@ class Test(TestCaseNoOps):
             )
 
             # kustomize with base AND env (unittest)
+            hpr = kustomize2.parent / "noopshpr.yaml"
             self.assertEqual(
                 HelmInstall._kustomize(kustomize2, "unittest"), # pylint: disable=protected-access
                 (
@@ -708,7 +1002,8 @@ class Test(TestCaseNoOps):
                     [
                         '-k', os.fspath(kustomize2 / "kustomize/base"),
                         '-k', os.fspath(kustomize2 / "kustomize/unittest")
-                    ]
+                    ],
+                    {'NOOPS_HPR': os.fspath(hpr)}
                 )
             )
             self.assertTrue(hpr.exists())
@@ -726,6 +1021,248 @@ class Test(TestCaseNoOps):
                 lambda: HelmInstall._kustomize(kustomize3, "unittest") # pylint: disable=protected-access
             )
 
+    @patch("noops.package.install.execute")
+    def test_upgrade_concurrent_kustomize(self, mock_execute):
+        """Concurrent upgrades use their own post-renderer configuration"""
+
+        hpr_contents = {}
+
+        fake_helm = FakeHelm()
+        def helm_upgrade(cmd, args, extra_envs=None, **kwargs):
+            if cmd == "helm" and args[0] == "upgrade":
+                # the configuration only exists during the upgrade
+                hpr_contents[args[1]] = read_yaml(extra_envs["NOOPS_HPR"])
+            return fake_helm(cmd, args, **kwargs)
+
+        mock_execute.side_effect = helm_upgrade
+
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            pkg = kustomize_package(Path(tmpdir))
+
+            threads = [
+                threading.Thread(
+                    target=HelmInstall(False).upgrade,
+                    args=(
+                        "ns", f"release{i}", pkg, "unittest", Path(tmpdir),
+                        [ProfileEnum.DEFAULT], []
+                    )
+                )
+                for i in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(hpr_contents), 4)
+
+        # one distinct chart directory per release
+        bases = { content["base"] for content in hpr_contents.values() }
+        self.assertEqual(len(bases), 4)
+        for content in hpr_contents.values():
+            self.assertEqual(content["kustomize"], content["base"].parent / "unittest")
+
+    @patch("noops.package.install.execute")
+    def test_upgrade_cache(self, mock_execute):
+        """Identical upgrades are skipped unless forced"""
+
+        fake_helm = FakeHelm()
+        secret = {"value": "a"}
+        def execute(cmd, args, **kwargs):
+            if cmd.endswith("script.py"):
+                # pre-processing: a value fetched at runtime
+                chart = Path(args[args.index("-c") + 1])
+                write_yaml(chart / "noops/profile-default.yaml", {"secret": secret["value"]})
+                return subprocess.CompletedProcess(args, 0, stdout=b"")
+            return fake_helm(cmd, args, **kwargs)
+        mock_execute.side_effect = execute
+
+        def helm_upgrades():
+            return [ c for c in mock_execute.call_args_list if c.args[1][0] == "upgrade" ]
+
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            pkg = kustomize_package(Path(tmpdir), {"pre-processing": ["script.py"]})
+            args = ("ns", "demo", pkg, "unittest", Path(tmpdir), [ProfileEnum.DEFAULT], [])
+
+            # dry-run never records anything
+            HelmInstall(True).upgrade(*args)
+            HelmInstall(False).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 2)
+
+            # identical
+            HelmInstall(False).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 2)
+
+            # forced
+            HelmInstall(False, force=True).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 3)
+
+            # different args, kube-context, environment variables or pre-processed values
+            HelmInstall(False).upgrade(*args[:-1], ["--wait"])
+            HelmInstall(False, "unittest").upgrade(*args)
+            HelmInstall(False).upgrade(*args, extra_envs={"NOOPS_UNITTEST": "1"})
+            secret["value"] = "b"
+            HelmInstall(False).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 7)
+            HelmInstall(False).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 7)
+
+            # current context of the kubeconfig
+            write_yaml(os.environ["KUBECONFIG"], {"current-context": "other"})
+            HelmInstall(False).upgrade(*args)
+            HelmInstall(False, "other").upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 8)
+            os.unlink(os.environ["KUBECONFIG"])
+            HelmInstall(False).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 9)
+
+            # rolled back outside of noopsctl
+            fake_helm.rollback("demo")
+            HelmInstall(False).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 10)
+
+            # uninstalled outside of noopsctl
+            fake_helm.revisions.clear()
+            HelmInstall(False).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 11)
+
+            # last upgrade failed
+            fake_helm.revisions["demo"][-1]["status"] = "failed"
+            HelmInstall(False).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 12)
+
+            # uninstalled
+            HelmInstall(False).uninstall("ns", "demo")
+            HelmInstall(False).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 13)
+            self.assertNotIn("--description", helm_upgrades()[-1].args[1])
+
+    @patch("noops.package.install.execute")
+    def test_upgrade_release_cache(self, mock_execute):
+        """Upgrade digest stored in the release (shared between runners)"""
+
+        mock_execute.side_effect = FakeHelm()
+
+        def helm_upgrades():
+            return [ c for c in mock_execute.call_args_list if c.args[1][0] == "upgrade" ]
+
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            pkg = kustomize_package(Path(tmpdir))
+            pre_processing_path = Path(tmpdir) / "pp"
+            pre_processing_path.mkdir()
+            args = ("ns", "demo", pkg, "unittest", pre_processing_path, [ProfileEnum.DEFAULT], [])
+
+            # digest stored in the release
+            HelmInstall(False, force=True, release_cache=True).upgrade(*args)
+            helm_args = helm_upgrades()[-1].args[1]
+            description = helm_args[helm_args.index("--description") + 1]
+            self.assertTrue(description.startswith("noops-upgrade:"))
+
+            # local cache lost (eg: new runner)
+            os.environ["NOOPS_UPGRADES_CACHE"] = os.fspath(Path(tmpdir) / "cache")
+            mock_execute.reset_mock()
+            HelmInstall(False, release_cache=True).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 0)
+            self.assertEqual(
+                [ c.args[1][0] for c in mock_execute.call_args_list ], ["list", "history"])
+
+            # live state (skip_unchanged) is listed once per namespace
+            mock_execute.reset_mock()
+            helm_install = HelmInstall(False, skip_unchanged=True)
+            helm_install.upgrade(*args)
+            helm_install.upgrade("ns", "other", *args[2:])
+            helm_install.upgrade("ns", "other", *args[2:])
+            helm_install.upgrade(*args)
+            self.assertEqual(
+                [ c.args[1][0] for c in mock_execute.call_args_list ],
+                ["list", "upgrade", "history"]
+            )
+
+            # upgraded by another runner (local cache is outdated)
+            os.environ["NOOPS_UPGRADES_CACHE"] = os.fspath(Path(tmpdir) / "other")
+            HelmInstall(False).upgrade(*args[:-1], ["--wait"])
+            os.environ["NOOPS_UPGRADES_CACHE"] = os.fspath(Path(tmpdir) / "cache")
+            mock_execute.reset_mock()
+            HelmInstall(False).upgrade(*args)
+            self.assertEqual(len(helm_upgrades()), 1)
+
+    @patch("noops.package.install.execute")
+    def test_upgrade_preprocessing_plugin(self, mock_execute):
+        """Pre-processing plugins run in-process, other scripts are executed"""
+
+        PreProcessingPlugin.calls.clear()
+        mock_execute.side_effect = FakeHelm()
+
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir, self.plugins({
+            "noops.preprocessing": {
+                "plugin.py": "tests.package.test_install:PreProcessingPlugin"
+            }
+        }):
+            pkg = kustomize_package(
+                Path(tmpdir), {"pre-processing": ["plugin.py", "script.py"]})
+
+            HelmInstall(False).upgrade(
+                "ns", "demo", pkg, "unittest", Path("/pp"), [ProfileEnum.DEFAULT], [],
+                extra_envs={"NOOPS_UNITTEST": "1"}
+            )
+
+        scripts = [ c.args for c in mock_execute.call_args_list if c.args[0] != "helm" ]
+        self.assertEqual(len(scripts), 1)
+        script, script_args = scripts[0]
+        self.assertEqual(script, "/pp/script.py")
+
+        # same arguments as the executable
+        self.assertEqual(len(PreProcessingPlugin.calls), 1)
+        env, chart, values, templates, kustomize, envs = PreProcessingPlugin.calls[0]
+        self.assertEqual(
+            ["-e", env, "-c", os.fspath(chart)] + \
+                [ j for i in values for j in ("-f", os.fspath(i)) ] + \
+                [ j for i in templates for j in ("-t", os.fspath(i)) ] + \
+                [ j for i in kustomize for j in ("-k", os.fspath(i)) ],
+            script_args
+        )
+        self.assertEqual(env, "unittest")
+        self.assertTrue(len(kustomize) > 0)
+        self.assertEqual(envs["NOOPS_UNITTEST"], "1")
+
+    def test_describe_reconciliation(self):
+        """Reconciliation actions without helm"""
+        reference = {
+            "metadata": {"name": "test", "namespace": "ns"},
+            "spec": {
+                "package": {"install": {"chart": "a_chart", "env": "test"}},
+                "versions": {
+                    "multi": [
+                        {"app_version": "2.0.0", "weight": 10},
+                        {"app_version": "3.0.0", "weight": 90}
+                    ]
+                }
+            }
+        }
+
+        project = ProjectKind.parse_obj(reference)
+        previous = ProjectKind.parse_obj(reference)
+        self.assertEqual(HelmInstall.describe_reconciliation(project, previous), [])
+
+        # nested models are altered on a copy (fingerprint already cached)
+        project.spec = project.spec.copy(deep=True)
+        project.spec.versions.multi[1] = MultiSpec(app_version="4.0.0", weight=90)
+        self.assertEqual(
+            HelmInstall.describe_reconciliation(project, previous),
+            [
+                "uninstall ns/test-3-0-0",
+                "upgrade ns/test-4-0-0 (added, app_version 4.0.0)",
+                "upgrade ns/test (canary, 2.0.0=10, 4.0.0=90)"
+            ]
+        )
+
+        project.spec = project.spec.copy(deep=True)
+        project.spec.versions.multi = None
+        self.assertEqual(
+            HelmInstall.describe_reconciliation(project, previous),
+            ["uninstall ns/test-2-0-0", "uninstall ns/test-3-0-0", "uninstall ns/test (canary)"]
+        )
+
     @patch("noops.package.install.HelmInstall._reconciliation_uninstall")
     @patch("noops.package.install.HelmInstall._reconciliation_upgrade")
     def test_reconciliation(self, mock_upgrade, mock_uninstall):
@@ -886,3 +1423,82 @@ class Test(TestCaseNoOps):
         )
         mock_upgrade.reset_mock()
         mock_uninstall.reset_mock()
+
+    @patch("noops.package.install.HelmInstall._reconciliation_uninstall")
+    @patch("noops.package.install.HelmInstall._reconciliation_upgrade")
+    def test_reconciliation_router_weights(self, mock_upgrade, mock_uninstall):
+        """Weights set in the canary router release only"""
+        reference = {
+            "metadata": {
+                "name": "test",
+                "namespace": "ns"
+            },
+            "spec": {
+                "package": {
+                    "install": {
+                        "chart": "a_chart",
+                        "env": "test",
+                        "canary-weights": "router"
+                    }
+                },
+                "versions": {
+                    "multi": [
+                        { "app_version": "2.0.0", "weight": 10 },
+                        { "app_version": "3.0.0", "weight": 90 }
+                    ]
+                }
+            }
+        }
+
+        preprocessing = Path("/path/to/preprocessing")
+        helm = HelmInstall(True)
+
+        # new project: no weight for version releases
+        project = ProjectKind.parse_obj(reference)
+        helm.reconciliation(
+            project, Projects.create_skeleton_from(project), pre_processing_path=preprocessing)
+        self.assertEqual(
+            [ i.args[1] for i in mock_upgrade.call_args_list ],
+            [ "test-2.0.0", "test-3.0.0", "test" ]
+        )
+        self.assertEqual(mock_upgrade.call_args_list[0].kwargs["cargs"], None)
+        mock_upgrade.reset_mock()
+
+        # weights shifted: canary router release only
+        previous = ProjectKind.parse_obj(reference)
+        project = ProjectKind.parse_obj(reference)
+        project.spec.versions.multi[0].weight = 50
+        project.spec.versions.multi[1].weight = 50
+
+        helm.reconciliation(project, previous, pre_processing_path=preprocessing)
+        self.assertEqual(mock_uninstall.call_args_list, [])
+        self.assertEqual(
+            mock_upgrade.call_args_list,
+            [
+                call(
+                    'ns', 'test', project.spec.package.install, project.spec.versions.multi[-1],
+                    preprocessing,
+                    override_profiles=[ProfileEnum.DEFAULT, ProfileEnum.CANARY_ENDPOINTS_ONLY],
+                    cargs=[
+                        '--set', 'noops.canary.instances[0].app_version=2.0.0',
+                        '--set', 'noops.canary.instances[0].weight=50',
+                        '--set', 'noops.canary.instances[1].app_version=3.0.0',
+                        '--set', 'noops.canary.instances[1].weight=50'
+                    ]
+                )
+            ]
+        )
+        self.assertEqual(
+            HelmInstall.describe_reconciliation(project, previous),
+            ["upgrade ns/test (canary, 2.0.0=50, 3.0.0=50)"]
+        )
+        mock_upgrade.reset_mock()
+
+        # canary not used anymore for a version: the release changes (profiles)
+        project = ProjectKind.parse_obj(reference)
+        project.spec.versions.multi[0].weight = None
+        helm.reconciliation(project, previous, pre_processing_path=preprocessing)
+        self.assertEqual(
+            [ i.args[1] for i in mock_upgrade.call_args_list ],
+            [ "test-2.0.0", "test" ]
+        )
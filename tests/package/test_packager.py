@@ -0,0 +1,232 @@
+"""
+Tests noops.package.packager
+"""
+
+import os
+import tarfile
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import patch
+from noops.package import packager
+from noops.package.packager import HelmIgnore, chart_files, package_chunks, \
+    extract_package, ExtractedPackages
+from noops.package.index import chart_metadata
+from noops.utils.io import digest
+from noops.errors import PackageInvalid, PackageUnsafe
+from .. import TestCaseNoOps
+
+def create_chart(directory: Path) -> Path:
+    """Chart with files to ignore"""
+    chart = directory / "chart"
+    (chart / "templates").mkdir(parents=True)
+    (chart / "docs").mkdir()
+    (chart / "Chart.yaml").write_text(
+        "apiVersion: v2\nname: demo\nversion: 0.1.0\n", encoding="UTF-8")
+    (chart / "values.yaml").write_text("key: value\n", encoding="UTF-8")
+    (chart / "templates/deployment.yaml").write_text("kind: Deployment\n", encoding="UTF-8")
+    (chart / "templates/.hidden.yaml").write_text("kind: Secret\n", encoding="UTF-8")
+    (chart / "docs/README.md").write_text("# demo\n", encoding="UTF-8")
+    (chart / "docs/keep.md").write_text("# keep\n", encoding="UTF-8")
+    (chart / "notes.bak").write_text("old\n", encoding="UTF-8")
+    (chart / ".helmignore").write_text(
+        "# comment\n\n*.bak\ndocs/*.md\n!docs/keep.md\n", encoding="UTF-8")
+    return chart
+
+def create_archive(package: Path, members: list):
+    """Archive with crafted members (TarInfo, content)"""
+    with tarfile.open(package, "w:gz") as tar:
+        for member, content in members:
+            tar.addfile(member, BytesIO(content) if content is not None else None)
+    return package
+
+def tarinfo(name: str, kind: bytes = tarfile.REGTYPE, linkname: str = "", content: bytes = b""):
+    """Member and its content"""
+    member = tarfile.TarInfo(name)
+    member.type = kind
+    member.linkname = linkname
+    member.size = len(content) if kind == tarfile.REGTYPE else 0
+    return member, content if kind == tarfile.REGTYPE else None
+
+class Test(TestCaseNoOps):
+    """
+    Tests noops.package.packager
+    """
+    def test_helmignore(self):
+        """.helmignore rules"""
+        helmignore = HelmIgnore(["*.bak", "/secrets/", "docs/*.md", "!docs/keep.md"])
+
+        self.assertTrue(helmignore.ignored("a.bak"))
+        self.assertTrue(helmignore.ignored("templates/a.bak"))
+        self.assertTrue(helmignore.ignored("secrets", is_dir=True))
+        self.assertFalse(helmignore.ignored("secrets"))
+        self.assertTrue(helmignore.ignored("docs/README.md"))
+        self.assertFalse(helmignore.ignored("docs/keep.md"))
+        self.assertTrue(helmignore.ignored("templates/.hidden"))
+        self.assertFalse(helmignore.ignored("templates/deployment.yaml"))
+
+    def test_chart_files(self):
+        """Files to package"""
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            chart = create_chart(Path(tmpdir))
+            self.assertEqual(
+                [ relative for relative, _ in chart_files(chart) ],
+                [
+                    ".helmignore", "Chart.yaml", "values.yaml",
+                    "docs/keep.md", "templates/deployment.yaml"
+                ]
+            )
+
+    def test_package_chunks(self):
+        """Reproducible package with generated documents"""
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            chart = create_chart(Path(tmpdir))
+            (chart / "hook.sh").write_text("#!/bin/sh\n", encoding="UTF-8")
+            os.chmod(chart / "hook.sh", 0o750)
+            documents = {
+                "Chart.yaml": "apiVersion: v2\nname: demo\nversion: 1+0.1.0\n",
+                "noops.yaml": b"kind: Chart\n"
+            }
+
+            package = Path(tmpdir) / "demo-1+0.1.0.tgz"
+            package.write_bytes(b"".join(package_chunks(chart, "demo", documents)))
+
+            self.assertEqual(chart_metadata(package)["version"], "1+0.1.0")
+            with tarfile.open(package, "r:gz") as tar:
+                members = tar.getmembers()
+                self.assertEqual(
+                    tar.extractfile("demo/noops.yaml").read(),
+                    b"kind: Chart\n"
+                )
+            self.assertEqual(
+                [ i.name for i in members ],
+                [
+                    "demo/.helmignore", "demo/Chart.yaml", "demo/docs/keep.md",
+                    "demo/hook.sh", "demo/noops.yaml", "demo/templates/deployment.yaml",
+                    "demo/values.yaml"
+                ]
+            )
+            self.assertTrue(all(i.mtime == 0 and i.uid == 0 and i.uname == "" for i in members))
+            self.assertEqual(members[3].mode, 0o755)
+            self.assertEqual(members[1].mode, 0o644)
+
+            # chart directory is untouched
+            self.assertEqual(
+                (chart / "Chart.yaml").read_text(encoding="UTF-8"),
+                "apiVersion: v2\nname: demo\nversion: 0.1.0\n"
+            )
+
+            # same inputs (new mtimes), same bytes
+            os.utime(chart / "values.yaml", (0, 0))
+            self.assertEqual(
+                digest(b"".join(package_chunks(chart, "demo", documents))),
+                digest(package.read_bytes())
+            )
+
+            # content changed, new package
+            (chart / "values.yaml").write_text("key: other\n", encoding="UTF-8")
+            self.assertNotEqual(
+                digest(b"".join(package_chunks(chart, "demo", documents))),
+                digest(package.read_bytes())
+            )
+
+    def test_extract_package(self):
+        """Extract a package"""
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            chart = create_chart(Path(tmpdir))
+            package = Path(tmpdir) / "demo-0.1.0.tgz"
+            package.write_bytes(b"".join(package_chunks(chart, "demo")))
+            create_archive(
+                Path(tmpdir) / "links.tgz",
+                [
+                    tarinfo("demo/Chart.yaml", content=b"name: demo\n"),
+                    tarinfo("demo/hard.yaml", tarfile.LNKTYPE, "demo/Chart.yaml")
+                ]
+            )
+
+            dst = Path(tmpdir) / "dst"
+            dst.mkdir()
+            root = extract_package(package, dst)
+            self.assertEqual(root, dst / "demo")
+            self.assertEqual(
+                (root / "templates/deployment.yaml").read_text(encoding="UTF-8"),
+                "kind: Deployment\n"
+            )
+
+            root = extract_package(Path(tmpdir) / "links.tgz", Path(tmpdir) / "links")
+            self.assertEqual((root / "hard.yaml").read_text(encoding="UTF-8"), "name: demo\n")
+
+    def test_extract_package_unsafe(self):
+        """Members outside of the chart are rejected"""
+        unsafe = {
+            "traversal": [tarinfo("demo/../../evil")],
+            "absolute": [tarinfo("/tmp/evil")],
+            "symlink": [tarinfo("demo/link", tarfile.SYMTYPE, "../../etc/passwd")],
+            "symlink-absolute": [tarinfo("demo/link", tarfile.SYMTYPE, "/etc/passwd")],
+            "symlink-inside": [tarinfo("demo/link", tarfile.SYMTYPE, "Chart.yaml")],
+            "symlink-chain": [
+                tarinfo("demo/s", tarfile.SYMTYPE, "."),
+                tarinfo("demo/t", tarfile.SYMTYPE, "s/s/s/../../.."),
+                tarinfo("demo/t/evil")
+            ],
+            "hardlink": [tarinfo("demo/link", tarfile.LNKTYPE, "../etc/passwd")],
+            "device": [tarinfo("demo/dev", tarfile.CHRTYPE)],
+        }
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            for name, members in unsafe.items():
+                package = create_archive(Path(tmpdir) / f"{name}.tgz", members)
+                dst = Path(tmpdir) / name
+                with self.assertRaises(PackageUnsafe, msg=name):
+                    extract_package(package, dst)
+                self.assertFalse((Path(tmpdir) / "evil").exists())
+
+            package = create_archive(
+                Path(tmpdir) / "roots.tgz",
+                [tarinfo("demo/Chart.yaml"), tarinfo("other/Chart.yaml")]
+            )
+            with self.assertRaises(PackageInvalid):
+                extract_package(package, Path(tmpdir) / "roots")
+
+            package = create_archive(Path(tmpdir) / "empty.tgz", [])
+            with self.assertRaises(PackageInvalid):
+                extract_package(package, Path(tmpdir) / "empty")
+
+    def test_extracted_packages(self):
+        """Same package extracted only once, private copies"""
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            chart = create_chart(Path(tmpdir))
+            package = Path(tmpdir) / "demo-0.1.0.tgz"
+            package.write_bytes(b"".join(package_chunks(chart, "demo")))
+
+            extracted = ExtractedPackages()
+            with patch.object(
+                packager, "extract_package", wraps=packager.extract_package) as mock_extract:
+                copies = []
+                for i in range(3):
+                    dst = Path(tmpdir) / f"release-{i}"
+                    dst.mkdir()
+                    copies.append(extracted.checkout(package, dst))
+
+                self.assertEqual(mock_extract.call_count, 1)
+
+                # pre-processing modifies its own copy only
+                (copies[0] / "values.yaml").write_text("key: changed\n", encoding="UTF-8")
+                self.assertEqual(
+                    (copies[1] / "values.yaml").read_text(encoding="UTF-8"), "key: value\n")
+                self.assertEqual(
+                    (extracted.extracted(package) / "values.yaml").read_text(encoding="UTF-8"),
+                    "key: value\n"
+                )
+
+                # new content, new extraction
+                package.write_bytes(
+                    b"".join(package_chunks(chart, "demo", {"values.yaml": "key: new\n"})))
+                dst = Path(tmpdir) / "release-new"
+                dst.mkdir()
+                self.assertEqual(
+                    (extracted.checkout(package, dst) / "values.yaml").read_text(encoding="UTF-8"),
+                    "key: new\n"
+                )
+                self.assertEqual(mock_extract.call_count, 2)
+
+            extracted.clear()
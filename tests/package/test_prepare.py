@@ -64,6 +64,21 @@ class Test(TestCaseNoOps):
             self.assertTrue(helm.is_dir())
             self.assertFalse(witness.exists())
 
+    def test_kustomize_incremental(self):
+        """Unchanged kustomize files are not copied again"""
+
+        with product_copy(KUSTOMIZE) as product_path:
+            noops = NoOps(product_path, dry_run=True, rm_cache=True)
+
+            embedded_kustomize(noops)
+
+            kustomization = noops.workdir / "helm/chart/kustomize/base/kustomization.yaml"
+            inode = kustomization.stat().st_ino
+
+            embedded_kustomize(noops)
+
+            self.assertEqual(kustomization.stat().st_ino, inode)
+
     def test_kustomize_unset(self):
         """kustomize not used"""
 
@@ -0,0 +1,97 @@
+"""
+Tests noops.package.preprocessing
+"""
+
+import os
+import threading
+import time
+from noops.package.preprocessing import check_steps, run_steps
+from noops.typing.charts import PreProcessingStep
+from noops.errors import PreProcessingDependencies
+from .. import TestCaseNoOps
+
+def steps(*entries):
+    """(script, needs) to steps"""
+    return [ PreProcessingStep(script=script, needs=needs) for script, needs in entries ]
+
+class Test(TestCaseNoOps):
+    """
+    Tests noops.package.preprocessing
+    """
+    def test_check_steps(self):
+        """Invalid graphs"""
+        check_steps([])
+        check_steps(steps(("a", []), ("b", ["a"]), ("c", ["a", "b"])))
+
+        with self.assertRaisesRegex(PreProcessingDependencies, "duplicated steps a"):
+            check_steps(steps(("a", []), ("a", [])))
+
+        with self.assertRaisesRegex(PreProcessingDependencies, "b needs unknown z"):
+            check_steps(steps(("a", []), ("b", ["z"])))
+
+        with self.assertRaisesRegex(PreProcessingDependencies, "cycle between b, c"):
+            check_steps(steps(("a", []), ("b", ["a", "c"]), ("c", ["b"])))
+
+    def test_run_steps(self):
+        """Dependencies are done before a step starts"""
+        done = []
+        lock = threading.Lock()
+
+        def run(step):
+            time.sleep(0.01)
+            with lock:
+                self.assertTrue(all(need in done for need in step.needs))
+                done.append(step.key)
+
+        graph = steps(("a", []), ("b", []), ("c", ["a"]), ("d", ["b", "c"]), ("e", []))
+        durations = run_steps(graph, run)
+
+        self.assertEqual(set(durations), {"a", "b", "c", "d", "e"})
+        self.assertEqual(sorted(done), ["a", "b", "c", "d", "e"])
+        self.assertEqual(done[-1], "d")
+
+        # one worker: declaration order as soon as possible
+        done.clear()
+        run_steps(graph, run, workers=1)
+        self.assertEqual(done, ["a", "b", "e", "c", "d"])
+
+    def test_run_steps_bounded(self):
+        """At most workers steps at the same time"""
+        lock = threading.Lock()
+        current = [0]
+        peak = [0]
+
+        def run(_):
+            with lock:
+                current[0] += 1
+                peak[0] = max(peak[0], current[0])
+            time.sleep(0.02)
+            with lock:
+                current[0] -= 1
+
+        graph = steps(*[ (f"s{i}", []) for i in range(8) ])
+
+        run_steps(graph, run, workers=2)
+        self.assertEqual(peak[0], 2)
+
+        peak[0] = 0
+        os.environ["NOOPS_PREPROCESSING_WORKERS"] = "3"
+        try:
+            run_steps(graph, run)
+        finally:
+            del os.environ["NOOPS_PREPROCESSING_WORKERS"]
+        self.assertEqual(peak[0], 3)
+
+    def test_run_steps_failure(self):
+        """A failure stops the graph"""
+        done = []
+
+        def run(step):
+            if step.key == "b":
+                raise RuntimeError("b failed")
+            done.append(step.key)
+
+        graph = steps(("a", []), ("b", ["a"]), ("c", ["b"]))
+        with self.assertRaisesRegex(RuntimeError, "b failed"):
+            run_steps(graph, run, workers=2)
+        self.assertEqual(done, ["a"])
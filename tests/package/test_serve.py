@@ -0,0 +1,137 @@
+"""
+Tests noops.package.serve
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import http.client
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from noops.package.serve import create_server
+from .. import TestCaseNoOps
+
+class Test(TestCaseNoOps):
+    """
+    Tests noops.package.serve
+    """
+    def setUp(self):
+        TestCaseNoOps.setUp(self)
+
+        tmpdir = tempfile.TemporaryDirectory(prefix="noops-") # pylint: disable=consider-using-with
+        self.addCleanup(tmpdir.cleanup)
+        self.directory = Path(tmpdir.name)
+        (self.directory / "index.yaml").write_text("apiVersion: v1\n", encoding="UTF-8")
+        (self.directory / "demo-1.0.0.tgz").write_bytes(b"\x1f\x8b" + os.urandom(256 * 1024))
+
+        self.server = create_server(os.fspath(self.directory), "127.0.0.1", 0)
+        self.addCleanup(self.server.server_close)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.shutdown)
+
+    def request(self, path: str, headers: dict = None, method: str = "GET"):
+        """HTTP request (status, headers, body)"""
+        connection = http.client.HTTPConnection(*self.server.server_address)
+        try:
+            connection.request(method, path, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.headers, response.read()
+        finally:
+            connection.close()
+
+    def test_index(self):
+        """index.yaml from memory (gzip)"""
+        status, headers, body = self.request("/index.yaml")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b"apiVersion: v1\n")
+        self.assertIsNone(headers["Content-Encoding"])
+        self.assertIsNotNone(headers["Last-Modified"])
+        etag = headers["ETag"]
+
+        status, headers, body = self.request("/index.yaml", {"Accept-Encoding": "gzip"})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(body), b"apiVersion: v1\n")
+        etag_gzip = headers["ETag"]
+        self.assertNotEqual(etag, etag_gzip)
+
+        # not modified
+        status, headers, body = self.request("/index.yaml", {"If-None-Match": etag})
+        self.assertEqual(status, 304)
+        self.assertEqual(headers["ETag"], etag)
+        self.assertEqual(body, b"")
+
+        status, _, _ = self.request(
+            "/index.yaml", {"If-None-Match": f"W/{etag_gzip}", "Accept-Encoding": "gzip"})
+        self.assertEqual(status, 304)
+
+        # reloaded on change
+        (self.directory / "index.yaml").write_text("apiVersion: v1\nentries: {}\n",
+            encoding="UTF-8")
+        status, headers, body = self.request("/index.yaml", {"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b"apiVersion: v1\nentries: {}\n")
+        self.assertNotEqual(headers["ETag"], etag)
+
+        # HEAD
+        status, headers, body = self.request("/index.yaml", method="HEAD")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Length"], "27")
+        self.assertEqual(body, b"")
+
+    def test_chart(self):
+        """Charts with ETag/Last-Modified (concurrent requests)"""
+        content = (self.directory / "demo-1.0.0.tgz").read_bytes()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(lambda _: self.request("/demo-1.0.0.tgz"), range(16)))
+
+        for status, _, body in responses:
+            self.assertEqual(status, 200)
+            self.assertEqual(body, content)
+
+        _, headers, _ = responses[0]
+        status, _, body = self.request("/demo-1.0.0.tgz", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b"")
+
+        status, _, _ = self.request(
+            "/demo-1.0.0.tgz", {"If-Modified-Since": headers["Last-Modified"]})
+        self.assertEqual(status, 304)
+
+        status, _, body = self.request("/demo-1.0.0.tgz", {"If-None-Match": '"other"'})
+        self.assertEqual(status, 200)
+        self.assertEqual(body, content)
+
+        status, _, _ = self.request("/unknown-1.0.0.tgz")
+        self.assertEqual(status, 404)
+
+    def test_metrics(self):
+        """Request latency metrics"""
+        self.request("/index.yaml")
+        self.request("/demo-1.0.0.tgz")
+        self.request("/demo-1.0.0.tgz")
+        self.request("/unknown-1.0.0.tgz")
+        self.request("/")
+
+        # a request is observed once the response is sent
+        for _ in range(100):
+            status, headers, body = self.request("/-/metrics")
+            metrics = json.loads(body)
+            if sum(j["count"] for i, j in metrics.items() if i != "metrics") == 5:
+                break
+            time.sleep(0.01)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Type"], "application/json")
+        self.assertEqual(metrics["index"]["count"], 1)
+        self.assertEqual(metrics["chart"]["count"], 3)
+        self.assertEqual(metrics["chart"]["errors"], 1)
+        self.assertEqual(metrics["other"]["count"], 1)
+        self.assertGreaterEqual(metrics["chart"]["max"], metrics["chart"]["avg"])
@@ -3,16 +3,28 @@ Tests noops.package.svcat
 """
 
 import os
+import stat
+import tempfile
 from pathlib import Path
+from unittest.mock import patch
 from noops.noops import NoOps
-from noops.package.svcat import ServiceCatalog
+from noops.package.svcat import ServiceCatalog, converter_capabilities
 from noops.package.helm import Helm
+from noops.external.processing import Processing
+from noops.errors import ConverterFailure
+from noops.utils import external
 from ..test_noops import product_copy, read_yaml_base, read_yaml
 from .. import TestCaseNoOps
 
 SVCAT=Path("tests/data/package/svcat/product").resolve()
 PROCESSING=Path("tests/data/package/svcat/processing").resolve()
 
+class ProcessingPlugin(Processing):
+    """In-process converter"""
+    def convert(self, service_request, name):
+        """Request is a dict"""
+        return [{"apiVersion": "unittest.local/v1", "kind": "Plugin", "spec": {"name": name}}]
+
 class Test(TestCaseNoOps):
     """
     Tests noops.package.svcat
@@ -132,6 +144,129 @@ class Test(TestCaseNoOps):
                 ]
             )
 
+    def test_external_batch_converter(self):
+        """One invocation for many service requests"""
+
+        requests = [
+            {"name": "svc1-binding", "request": {"key": "value1"}},
+            {"name": "svc2-binding", "request": {"key": "value2"}}
+        ]
+
+        with patch("noops.package.svcat.ServiceCatalog._external_converter") as mock_converter:
+            result = ServiceCatalog._external_batch_converter( # pylint: disable=protected-access
+                requests, PROCESSING / "operator/plan"
+            )
+            mock_converter.assert_not_called()
+
+        self.assertEqual(
+            result,
+            {
+                "svc1-binding": [
+                    {'apiVersion': 'unittest.local/v1', 'kind': 'Test', 'spec': {'key': 'value1'}}
+                ],
+                "svc2-binding": [
+                    {'apiVersion': 'unittest.local/v1', 'kind': 'Test', 'spec': {'key': 'value2'}}
+                ]
+            }
+        )
+
+    def test_external_batch_converter_legacy(self):
+        """Converter without batch support"""
+
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            converter = Path(tmpdir) / "plan"
+            converter.write_text(
+                "#!/usr/bin/env bash\n"
+                "while getopts 'n:r:o:' opt; do\n"
+                "  case $opt in n) name=$OPTARG;; o) out=$OPTARG;; r) ;; *) exit 2;; esac\n"
+                "done\n"
+                "echo \"- {kind: Legacy, spec: {name: $name}}\" > \"$out\"\n",
+                encoding="UTF-8"
+            )
+            converter.chmod(converter.stat().st_mode | stat.S_IXUSR)
+
+            result = ServiceCatalog._external_batch_converter( # pylint: disable=protected-access
+                [
+                    {"name": "svc1-binding", "request": {}},
+                    {"name": "svc2-binding", "request": {}}
+                ],
+                converter
+            )
+
+        self.assertEqual(
+            result,
+            {
+                "svc1-binding": [{"kind": "Legacy", "spec": {"name": "svc1-binding"}}],
+                "svc2-binding": [{"kind": "Legacy", "spec": {"name": "svc2-binding"}}]
+            }
+        )
+
+    def test_external_batch_converter_failure(self):
+        """A failing batch converter is not retried once per request"""
+
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            converter = Path(tmpdir) / "plan"
+            converter.write_text(
+                "#!/usr/bin/env bash\n"
+                "if [ \"$1\" == \"--capabilities\" ]; then echo batch; exit 0; fi\n"
+                "echo \"$1\" >> \"$0.calls\"\n"
+                "echo 'invalid request' >&2\n"
+                "exit 1\n",
+                encoding="UTF-8"
+            )
+            converter.chmod(converter.stat().st_mode | stat.S_IXUSR)
+
+            with self.assertRaises(ConverterFailure) as failure:
+                ServiceCatalog._external_batch_converter( # pylint: disable=protected-access
+                    [
+                        {"name": "svc1-binding", "request": {}},
+                        {"name": "svc2-binding", "request": {}}
+                    ],
+                    converter
+                )
+
+            self.assertIn("invalid request", str(failure.exception))
+            self.assertEqual(
+                Path(f"{converter}.calls").read_text(encoding="UTF-8"), "-b\n")
+
+    def test_kinds_missing_objects(self):
+        """A batch converter must convert all service requests"""
+
+        with product_copy(SVCAT) as product_path, \
+            tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            converter = Path(tmpdir) / "operator/plan"
+            converter.parent.mkdir()
+            converter.write_text(
+                "#!/usr/bin/env bash\n"
+                "if [ \"$1\" == \"--capabilities\" ]; then echo batch; exit 0; fi\n"
+                "echo '{}' > \"$4\"\n",
+                encoding="UTF-8"
+            )
+            converter.chmod(converter.stat().st_mode | stat.S_IXUSR)
+            os.environ["NOOPS_SVCAT_PROCESSING"] = tmpdir
+
+            noops = NoOps(product_path, dry_run=False, rm_cache=True)
+            noops.noops_config["service-catalog"].append(
+                {"name": "svc3", "class": "operator", "plan": "plan", "key": "value3"}
+            )
+
+            with self.assertRaises(ConverterFailure) as failure:
+                ServiceCatalog(noops, Helm(noops)).create_kinds_and_values()
+
+            self.assertIn("no objects for svc2-binding, svc3-binding", str(failure.exception))
+
+    def test_converter_capabilities(self):
+        """Capabilities are probed once per converter"""
+
+        converter = PROCESSING / "operator/plan"
+        mtime = converter.stat().st_mtime_ns
+        converter_capabilities.cache_clear()
+
+        with patch("noops.utils.external.execute", wraps=external.execute) as mock_execute:
+            self.assertEqual(converter_capabilities(os.fspath(converter), mtime), ("batch",))
+            self.assertEqual(converter_capabilities(os.fspath(converter), mtime), ("batch",))
+            self.assertEqual(mock_execute.call_count, 1)
+
     def test_kinds_and_values(self):
         """Create Kinds and values"""
 
@@ -141,9 +276,6 @@ class Test(TestCaseNoOps):
             noops = NoOps(product_path, dry_run=False, rm_cache=True)
             helm = Helm(noops)
 
-            # cwd is changed by NoOps. At this point we need to revert it
-            # ONLY for unittest context !
-            self.resetCwd()
             ServiceCatalog(noops, helm).create_kinds_and_values()
 
             svcat_templates = noops.workdir / "helm/chart/templates/svcat.yaml"
@@ -192,3 +324,59 @@ spec:
                 svcat_binding.read_text(encoding="UTF-8"),
                 """svcat:\n  bindings:\n  - svc1-binding\n  - svc2-binding\n"""
             )
+
+    def test_kinds_with_plugin(self):
+        """In-process converter before the executable"""
+
+        with product_copy(SVCAT) as product_path, self.plugins({
+            "noops.svcat_converters": {
+                "operator/plan": "tests.package.test_svcat:ProcessingPlugin"
+            }
+        }):
+            os.environ["NOOPS_SVCAT_PROCESSING"] = os.fspath(PROCESSING)
+
+            noops = NoOps(product_path, dry_run=False, rm_cache=True)
+            helm = Helm(noops)
+
+            ServiceCatalog(noops, helm).create_kinds_and_values()
+
+            svcat_templates = (noops.workdir / "helm/chart/templates/svcat.yaml") \
+                .read_text(encoding="UTF-8")
+
+            self.assertIn("kind: Plugin", svcat_templates)
+            self.assertIn("name: svc2-binding", svcat_templates)
+            self.assertNotIn("kind: Test", svcat_templates)
+
+    def test_kinds_grouped_by_converter(self):
+        """One invocation per converter (class/plan)"""
+
+        with product_copy(SVCAT) as product_path:
+            os.environ["NOOPS_SVCAT_PROCESSING"] = os.fspath(PROCESSING)
+            os.environ["NOOPS_SVCAT_WORKERS"] = "2"
+            self.addCleanup(os.environ.pop, "NOOPS_SVCAT_WORKERS")
+
+            noops = NoOps(product_path, dry_run=False, rm_cache=True)
+            noops.noops_config["service-catalog"].append(
+                {"name": "svc3", "class": "operator", "plan": "plan", "key": "value3"}
+            )
+            helm = Helm(noops)
+
+            with patch(
+                "noops.package.svcat.ServiceCatalog._external_batch_converter",
+                wraps=ServiceCatalog._external_batch_converter # pylint: disable=protected-access
+            ) as mock_batch:
+                ServiceCatalog(noops, helm).create_kinds_and_values()
+
+            self.assertEqual(mock_batch.call_count, 1)
+            self.assertEqual(
+                [ i["name"] for i in mock_batch.call_args.args[0] ],
+                ["svc2-binding", "svc3-binding"]
+            )
+
+            self.assertEqual(
+                read_yaml(noops.workdir / "helm/chart/noops/values-svcat.yaml"),
+                {"svcat": {"bindings": ["svc1-binding", "svc2-binding", "svc3-binding"]}}
+            )
+            svcat_templates = (noops.workdir / "helm/chart/templates/svcat.yaml") \
+                .read_text(encoding="UTF-8")
+            self.assertIn("name: svc3-binding\nspec:\n  key: value3\n", svcat_templates)
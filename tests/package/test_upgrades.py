@@ -0,0 +1,39 @@
+"""
+Tests noops.package.upgrades
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from noops.package.upgrades import UpgradeCache
+from .. import TestCaseNoOps
+
+class Test(TestCaseNoOps):
+    """
+    Tests noops.package.upgrades
+    """
+    def test_path(self):
+        """Cache directory"""
+        self.assertEqual(UpgradeCache().path, Path(os.environ["NOOPS_UPGRADES_CACHE"]))
+        self.assertEqual(UpgradeCache("~/cache").path, Path.home() / "cache")
+
+    def test_cache(self):
+        """Get/Set/Delete"""
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            cache = UpgradeCache(Path(tmpdir) / "upgrades")
+
+            self.assertIsNone(cache.get(None, "ns", "demo"))
+            cache.delete(None, "ns", "demo")
+
+            cache.set(None, "ns", "demo", "sha1", 1)
+            cache.set("unittest", "ns", "demo", "sha2", 4)
+            self.assertEqual(cache.get(None, "ns", "demo"), ("sha1", 1))
+            self.assertEqual(cache.get("unittest", "ns", "demo"), ("sha2", 4))
+            self.assertIsNone(cache.get(None, "ns2", "demo"))
+
+            cache.set(None, "ns", "demo", "sha3", None)
+            self.assertEqual(cache.get(None, "ns", "demo"), ("sha3", None))
+
+            cache.delete(None, "ns", "demo")
+            self.assertIsNone(cache.get(None, "ns", "demo"))
+            self.assertEqual(cache.get("unittest", "ns", "demo"), ("sha2", 4))
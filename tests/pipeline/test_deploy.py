@@ -2,10 +2,13 @@
 Tests noops.pipeline.deploy
 """
 
+import os
+import subprocess
 from unittest.mock import patch, call
 from pathlib import Path
 from noops.noops import NoOps
-from noops.pipeline.deploy import pipeline_deploy
+from noops.pipeline.deploy import pipeline_deploy, white_label_report
+from noops.errors import WhiteLabelDeploymentFailure, WhiteLabelConflict
 from ..test_noops import product_copy, read_yaml_base, read_yaml, write_yaml
 from .. import TestCaseNoOps
 
@@ -41,6 +44,9 @@ class Test(TestCaseNoOps):
 
             self.assertEqual(mock_execute.call_count, 2)
 
+            # the brand is provided with the environment only
+            self.assertFalse((noops.workdir / "helm/chart/noops/values-white-label.yaml").exists())
+
             self.assertEqual(
                 mock_execute.call_args_list[1],
                 call(
@@ -53,10 +59,126 @@ class Test(TestCaseNoOps):
                         'NOOPS_WHITE_LABEL_REBRAND': 'test2',
                         'NOOPS_WHITE_LABEL_MARKETER': 'Test2 Inc'
                     },
+                    product_path=os.fspath(noops.product_path),
                     dry_run=False
                 )
             )
 
+    @patch("noops.pipeline.deploy.prepare")
+    @patch("noops.pipeline.deploy.execute")
+    def test_deploy_labels_prepare_once(self, mock_execute, mock_prepare):
+        """Brand-independent files are prepared once [white-label]"""
+
+        with product_copy(DEPLOY) as product_path:
+            noops = NoOps(product_path, dry_run=False, rm_cache=True)
+
+            pipeline_deploy(noops, "default", [])
+
+            self.assertEqual(mock_execute.call_count, 2)
+            self.assertEqual(mock_prepare.call_count, 1)
+
+    @patch("noops.pipeline.deploy.execute")
+    def test_deploy_labels_parallel(self, mock_execute):
+        """Deploy all labels in parallel [white-label]"""
+
+        with product_copy(DEPLOY) as product_path:
+            noops = NoOps(product_path, dry_run=False, rm_cache=True)
+
+            results = pipeline_deploy(noops, "default", ["--fake"], workers=2)
+
+            self.assertEqual(mock_execute.call_count, 2)
+            self.assertEqual([i.rebrand for i in results], ["test1", "test2"])
+            self.assertTrue(all(i.succeeded for i in results))
+
+            # each brand uses its own workdir and environment
+            for rebrand, marketer in (("test1", "Test1 Inc"), ("test2", "Test2 Inc")):
+                brand_workdir = noops.workdir / "white-label" / rebrand
+                self.assertIn(
+                    call(
+                        noops.workdir / "scripts/deploy.sh",
+                        ['--fake'],
+                        extra_envs={
+                            'NOOPS_GENERATED_JSON': brand_workdir / "noops-generated.json",
+                            'NOOPS_GENERATED_YAML': brand_workdir / "noops-generated.yaml",
+                            'NOOPS_WHITE_LABEL': 'y',
+                            'NOOPS_WHITE_LABEL_REBRAND': rebrand,
+                            'NOOPS_WHITE_LABEL_MARKETER': marketer
+                        },
+                        product_path=os.fspath(noops.product_path),
+                        dry_run=False
+                    ),
+                    mock_execute.call_args_list
+                )
+                self.assertEqual(
+                    read_yaml(brand_workdir / "noops-generated.yaml")["package"]["helm"]["values"],
+                    brand_workdir / "chart/noops"
+                )
+                self.assertTrue((brand_workdir / "chart/noops/profile-default.yaml").exists())
+
+            # nothing brand-dependent is generated in the charts
+            self.assertTrue((noops.workdir / "helm/chart/noops/profile-default.yaml").exists())
+            self.assertEqual(
+                sorted(i.name for i in (noops.workdir / "helm/chart/noops").iterdir()),
+                sorted(i.name for i in (brand_workdir / "chart/noops").iterdir())
+            )
+
+            self.assertIn("test2", white_label_report(results))
+
+            # next run: brand workdirs are synchronized (unchanged files are not rewritten)
+            chart_file = brand_workdir / "chart/noops/profile-default.yaml"
+            generated = brand_workdir / "noops-generated.json"
+            mtimes = (chart_file.stat().st_mtime_ns, generated.stat().st_mtime_ns)
+            (brand_workdir / "chart/stale.yaml").touch()
+            os.utime(chart_file, ns=(0, 0))
+            os.utime(generated, ns=(0, 0))
+
+            pipeline_deploy(noops, "default", ["--fake"], workers=2)
+
+            self.assertEqual(chart_file.stat().st_mtime_ns, 0)
+            self.assertEqual(generated.stat().st_mtime_ns, 0)
+            self.assertNotEqual(mtimes, (0, 0))
+            self.assertFalse((brand_workdir / "chart/stale.yaml").exists())
+
+    @patch("noops.pipeline.deploy.execute")
+    def test_deploy_labels_parallel_conflict(self, mock_execute):
+        """Rebrands sharing the same workdir are rejected [white-label]"""
+
+        with product_copy(DEPLOY) as product_path:
+            content = read_yaml(product_path / "noops.yaml")
+            content["white-label"].append({"rebrand": "TEST1", "marketer": "Other Inc"})
+            write_yaml(product_path / "noops.yaml", content)
+
+            noops = NoOps(product_path, dry_run=False, rm_cache=True)
+
+            with self.assertRaises(WhiteLabelConflict) as context:
+                pipeline_deploy(noops, "default", [], workers=2)
+
+            mock_execute.assert_not_called()
+            self.assertIn("test1, TEST1", str(context.exception))
+
+    @patch("noops.pipeline.deploy.execute")
+    def test_deploy_labels_parallel_failure(self, mock_execute):
+        """One label fails but all labels are deployed [white-label]"""
+
+        def fail_on_test1(*args, **kwargs): # pylint: disable=unused-argument
+            if kwargs["extra_envs"]["NOOPS_WHITE_LABEL_REBRAND"] == "test1":
+                raise subprocess.CalledProcessError(1, "deploy.sh")
+
+        mock_execute.side_effect = fail_on_test1
+
+        with product_copy(DEPLOY) as product_path:
+            noops = NoOps(product_path, dry_run=False, rm_cache=True)
+
+            with self.assertRaises(WhiteLabelDeploymentFailure) as context:
+                pipeline_deploy(noops, "default", [], workers=2)
+
+            self.assertEqual(mock_execute.call_count, 2)
+            self.assertEqual(
+                [(i.rebrand, i.succeeded) for i in context.exception.results],
+                [("test1", False), ("test2", True)]
+            )
+            self.assertIn("test1", str(context.exception))
+
     @patch("noops.pipeline.deploy.execute")
     def test_deploy_regular(self, mock_execute):
         """Deploy without labels [regular]"""
@@ -83,6 +205,7 @@ class Test(TestCaseNoOps):
                         'NOOPS_GENERATED_JSON': noops.workdir / "noops-generated.json",
                         'NOOPS_GENERATED_YAML': noops.workdir / "noops-generated.yaml"
                     },
+                    product_path=os.fspath(noops.product_path),
                     dry_run=False
                 )
             )
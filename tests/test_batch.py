@@ -0,0 +1,89 @@
+"""
+Tests noops.batch
+"""
+
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from noops.batch import find_products, run_batch, batch_report, captured_stdout
+from noops.typing.batch import BatchResult
+from noops.errors import BatchFailure
+from . import TestCaseNoOps
+
+def runner(product: str, args: list, global_args: list) -> BatchResult:
+    """Fake runner (the devops cache is returned as output)"""
+    return BatchResult(
+        product=product,
+        args=global_args + args,
+        succeeded=Path(product).is_dir(),
+        output=os.environ.get("NOOPS_DEVOPS_CACHE", "")
+    )
+
+class Test(TestCaseNoOps):
+    """
+    Tests noops.batch
+    """
+    def test_find_products(self):
+        """Explicit paths and glob patterns"""
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            tmp = Path(tmpdir).resolve()
+            for name in ("b", "a", "c"):
+                (tmp / name).mkdir()
+            (tmp / "a/noops.yaml").touch()
+            (tmp / "b/noops.yaml").touch()
+
+            self.assertEqual(
+                find_products([os.fspath(tmp / "c"), os.fspath(tmp / "*"), os.fspath(tmp / "a")]),
+                [ os.fspath(tmp / i) for i in ("c", "a", "b") ]
+            )
+
+            # relative paths are resolved
+            os.chdir(tmp)
+            self.assertEqual(
+                find_products(["a", "*", "./c"]),
+                [ os.fspath(tmp / i) for i in ("a", "b", "c") ]
+            )
+
+    def test_captured_stdout(self):
+        """Python and subprocesses output"""
+        with tempfile.TemporaryFile() as captured:
+            with captured_stdout(captured):
+                print("python", flush=True)
+                subprocess.run(["echo", "subprocess"], check=True)
+                print("end")
+
+            captured.seek(0)
+            self.assertEqual(captured.read(), b"python\nsubprocess\nend\n")
+
+    def test_run_batch(self):
+        """Many products with a pool of processes"""
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            products = [ tmpdir, os.path.dirname(tmpdir) ]
+
+            results = run_batch(runner, products, ["output"], ["--dry-run"], workers=2)
+            self.assertEqual([ i.product for i in results ], products)
+            self.assertTrue(all(i.succeeded for i in results))
+            self.assertEqual(results[0].args, ["--dry-run", "output"])
+            # same devops cache for all products
+            self.assertEqual(len({ i.output for i in results }), 1)
+            self.assertNotEqual(results[0].output, "")
+
+            with self.assertRaises(BatchFailure) as failure:
+                run_batch(runner, products + ["/does/not/exist"], ["output"], workers=2)
+            self.assertEqual(
+                [ i.succeeded for i in failure.exception.results ], [True, True, False])
+            self.assertIn("/does/not/exist", str(failure.exception))
+
+            self.assertNotIn("NOOPS_DEVOPS_CACHE", os.environ)
+
+    def test_batch_report(self):
+        """Summary"""
+        self.assertEqual(
+            batch_report([
+                BatchResult(product="products/a", args=["output"], succeeded=True, duration=1.5),
+                BatchResult(product="products/b", args=["output"], duration=0.25, error="boom")
+            ]),
+            "products/a           OK         1.50s\n"
+            "products/b           FAILED     0.25s boom"
+        )
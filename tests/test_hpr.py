@@ -44,3 +44,24 @@ class Test(TestCaseNoOps):
                 (product_path / "kustomize/base/all.yaml").read_text(encoding="UTF-8"),
                 (product_path / "charts.yaml").read_text(encoding="UTF-8")
             )
+
+    @patch("noops.hpr.execute")
+    def test_wrapper_env(self, mock_execute):
+        """Kustomize with a configuration set by NOOPS_HPR"""
+
+        with product_copy(DATA) as product_path:
+            charts = (product_path / "charts.yaml").read_text(encoding="UTF-8")
+
+            # configuration outside of the current directory
+            hpr = product_path / "install-1.yaml"
+            (product_path / "noops_workdir/noopshpr.yaml").rename(hpr)
+            os.chdir(os.fspath(product_path))
+
+            with patch('sys.stdin', Test.StdinBuffer(BytesIO(charts.encode()))), \
+                patch.dict(os.environ, {"NOOPS_HPR": os.fspath(hpr)}):
+                wrapper()
+
+                self.assertEqual(
+                    mock_execute.call_args_list[0],
+                    call('kustomize', ['build', 'kustomize/test'])
+                )
@@ -4,6 +4,7 @@ Tests noops.noops
 
 import tempfile
 import os
+import threading
 from pathlib import Path
 from unittest.mock import patch
 import shutil
@@ -13,6 +14,7 @@ from contextlib import contextmanager
 from noops.noops import NoOps
 from noops.settings import DEFAULT_WORKDIR
 from noops.utils.io import yaml, read_yaml, write_yaml
+from noops.utils.external import execute
 from . import TestCaseNoOps
 
 MINIMAL=Path("tests/data/noops/product/minimal").resolve()
@@ -141,6 +143,88 @@ class Test(TestCaseNoOps):
             self.assertFalse(witness.exists())
             self.assertTrue(noops_generated.exists())
 
+    def test_concurrent_cache(self):
+        """Concurrent cache creation for the same product"""
+
+        with product_copy(MINIMAL) as product_path:
+            errors = []
+
+            def create():
+                try:
+                    NoOps(product_path, dry_run=True, rm_cache=True)
+                except Exception as error: # pylint: disable=broad-except
+                    errors.append(error)
+
+            threads = [ threading.Thread(target=create) for _ in range(4) ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(errors, [])
+
+            # only the workdir and the lock file remain (temporary directories are removed)
+            self.assertEqual(
+                sorted(i.name for i in product_path.iterdir()
+                    if i.name.startswith(".") or i.name.startswith("noops_workdir")),
+                ["noops_workdir", "noops_workdir.lock"]
+            )
+
+            self.assertEqual(
+                read_yaml(product_path / DEFAULT_WORKDIR / "noops-generated.yaml"),
+                read_yaml_base(MINIMAL / "tests" / "noops-generated.yaml", product_path)
+            )
+
+    def test_workdir_lock(self):
+        """The workdir is not recreated while it is used"""
+
+        with product_copy(MINIMAL) as product_path:
+            core = NoOps(product_path, dry_run=True, rm_cache=True)
+            events = []
+
+            def recreate():
+                NoOps(product_path, dry_run=True, rm_cache=True)
+                events.append("recreated")
+
+            with core.workdir_lock():
+                # many users at the same time
+                with NoOps(product_path, dry_run=True, rm_cache=False).workdir_lock():
+                    pass
+
+                thread = threading.Thread(target=recreate)
+                thread.start()
+                thread.join(0.2)
+                self.assertTrue(thread.is_alive())
+                events.append("released")
+
+            thread.join()
+            self.assertEqual(events, ["released", "recreated"])
+
+    def test_many_products(self):
+        """Many products in one process (working directory unchanged)"""
+
+        cwd = os.getcwd()
+        with product_copy(MINIMAL) as minimal, product_copy(MINIMAL_PROFILE) as profile:
+            products = [ (minimal, MINIMAL), (profile, MINIMAL_PROFILE) ] * 2
+            cores = [ None ] * len(products)
+
+            def create(index: int):
+                cores[index] = NoOps(products[index][0], dry_run=True, rm_cache=True)
+
+            threads = [ threading.Thread(target=create, args=(i,)) for i in range(len(products)) ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(os.getcwd(), cwd)
+            for core, (product_path, reference) in zip(cores, products):
+                self.assertEqual(core.product_path, product_path.resolve())
+                self.assertEqual(
+                    read_yaml(product_path / DEFAULT_WORKDIR / "noops-generated.yaml"),
+                    read_yaml_base(reference / "tests" / "noops-generated.yaml", product_path)
+                )
+
     def test_minimal_git(self):
         """Minimal and simple Noops product [git]"""
 
@@ -159,6 +243,34 @@ class Test(TestCaseNoOps):
 
             self.assertFalse((noops.workdir / ".git").exists())
 
+    @patch("noops.noops.execute", wraps=execute)
+    def test_devops_cache(self, mock_execute):
+        """Devops repository cloned once for many products"""
+
+        with product_copy(MINIMAL_GIT) as devops_product, \
+            product_copy(MINIMAL_GIT) as product1, product_copy(MINIMAL_GIT) as product2, \
+            tempfile.TemporaryDirectory(prefix="noops-") as cache:
+            devops_path = devops_product / "devops"
+            subprocess.run("git init -b main .", cwd=devops_path, check=True, shell=True)
+            subprocess.run("git add .", cwd=devops_path, check=True, shell=True)
+            subprocess.run("git -c user.name=noops -c user.email=noops@local commit -m devops",
+                cwd=devops_path, check=True, shell=True)
+
+            os.environ["NOOPS_DEVOPS_CACHE"] = cache
+            self.addCleanup(os.environ.pop, "NOOPS_DEVOPS_CACHE")
+
+            for product_path in (product1, product2):
+                content = read_yaml(product_path / "noops.yaml")
+                content["devops"]["git"]["clone"] = os.fspath(devops_path)
+                write_yaml(product_path / "noops.yaml", content)
+
+                noops = NoOps(product_path, dry_run=True, rm_cache=True)
+                self.assertTrue((noops.workdir / "noops.yaml").exists())
+                self.assertFalse((noops.workdir / ".git").exists())
+
+            self.assertEqual(
+                [ i.args[1][0] for i in mock_execute.call_args_list ].count("clone"), 1)
+
     def test_minimal_profile(self):
         """Minimal and simple Noops product with profile"""
 
@@ -2,13 +2,16 @@
 Tests noops.projects
 """
 
+import copy
+import tempfile
 from unittest.mock import patch, call
 from pathlib import Path
 from noops.projects import (
     Projects, ProjectKind, Cluster,
     TargetKind, VersionKind,
     TargetClassesEnum, TargetsEnum,
-    ProjectPlanKind)
+    ProjectPlanKind, ProjectPlanStatusEnum)
+from noops.errors import ProjectsPlanFailure
 from noops.utils.io import read_yaml
 from . import TestCaseNoOps
 
@@ -45,7 +48,8 @@ class Test(TestCaseNoOps):
                             'services-only': False,
                             'args': ['--set', 'replicaCount=0'],
                             'envs': {'USER': 'Me'},
-                            'white-label': None
+                            'white-label': None,
+                            'canary-weights': 'releases'
                         }
                     },
                     'versions': {'one': None, 'multi': None}
@@ -105,7 +109,8 @@ class Test(TestCaseNoOps):
                             "services-only": False,
                             "args": None,
                             "envs": None,
-                            "white-label": None
+                            "white-label": None,
+                            "canary-weights": "releases"
                         }
                     },
                     "versions": {
@@ -167,7 +172,8 @@ class Test(TestCaseNoOps):
                                             'envs': None,
                                             'services_only': False,
                                             'target': TargetsEnum.ONE_CLUSTER,
-                                            'white_label': None
+                                            'white_label': None,
+                                            'canary_weights': 'releases'
                                         }
                                     },
                                     'versions': {
@@ -211,7 +217,8 @@ class Test(TestCaseNoOps):
                                             'envs': None,
                                             'services_only': False,
                                             'target': TargetsEnum.MULTI_CLUSTER,
-                                            'white_label': None
+                                            'white_label': None,
+                                            'canary_weights': 'releases'
                                         }
                                     },
                                     'versions': {
@@ -256,7 +263,8 @@ class Test(TestCaseNoOps):
                                             'envs': None,
                                             'services_only': False,
                                             'target': TargetsEnum.ACTIVE,
-                                            'white_label': None
+                                            'white_label': None,
+                                            'canary_weights': 'releases'
                                         }
                                     },
                                     'versions': {
@@ -283,7 +291,8 @@ class Test(TestCaseNoOps):
                                             'envs': None,
                                             'services_only': False,
                                             'target': TargetsEnum.STANDBY,
-                                            'white_label': None
+                                            'white_label': None,
+                                            'canary_weights': 'releases'
                                         }
                                     },
                                     'versions': {
@@ -329,7 +338,8 @@ class Test(TestCaseNoOps):
                                             'envs': None,
                                             'services_only': False,
                                             'target': TargetsEnum.ONE_CLUSTER,
-                                            'white_label': None
+                                            'white_label': None,
+                                            'canary_weights': 'releases'
                                         }
                                     },
                                     'versions': {
@@ -356,7 +366,8 @@ class Test(TestCaseNoOps):
                                             'envs': None,
                                             'services_only': True,
                                             'target': TargetsEnum.ONE_CLUSTER,
-                                            'white_label': None
+                                            'white_label': None,
+                                            'canary_weights': 'releases'
                                         }
                                     },
                                     'versions': {
@@ -432,18 +443,9 @@ class Test(TestCaseNoOps):
         current = copy_reference()
         previous = copy_reference()
 
-        # Identical current/previous
+        # Identical current/previous (unchanged cluster is skipped)
         plan = Projects._reconciliation_project_plan(current, previous) # pylint: disable=protected-access
-        self.assertEqual(
-            [i.dict() for i in plan],
-            [
-                {
-                    'cluster': 'c1',
-                    'kprevious': project_dict(previous, 0),
-                    'kproject': project_dict(previous, 0)
-                }
-            ]
-        )
+        self.assertEqual(plan, [])
 
         # Change in project spec
         current = copy_reference()
@@ -491,11 +493,6 @@ class Test(TestCaseNoOps):
         self.assertEqual(
             [i.dict() for i in plan],
             [
-                {
-                    'cluster': 'c1',
-                    'kprevious': project_dict(previous, 0), # 1.0.0
-                    'kproject': project_dict(current, 0) # 1.0.0
-                },
                 {
                     'cluster': 'c2',
                     'kprevious': None,
@@ -560,11 +557,13 @@ class Test(TestCaseNoOps):
             [
                 call(
                     get_project(current, 0),
-                    pre_processing_path, True, kprevious=None, cluster='c1'
+                    pre_processing_path, True, kprevious=None, cluster='c1',
+                    skip_unchanged=False, force=False
                 ),
                 call(
                     get_project(current, 0),
-                    pre_processing_path, True, kprevious=None, cluster='c2'
+                    pre_processing_path, True, kprevious=None, cluster='c2',
+                    skip_unchanged=False, force=False
                 )
             ]
         )
@@ -579,15 +578,8 @@ class Test(TestCaseNoOps):
 
         Projects.apply(current, pre_processing_path, True, kpreviousplan=previous)
 
-        self.assertEqual(
-            mock_apply.call_args_list,
-            [
-                call(
-                    get_project(current, 0),
-                    pre_processing_path, True, kprevious=get_project(previous, 0), cluster='c1'
-                )
-            ]
-        )
+        # c1 is unchanged
+        self.assertEqual(mock_apply.call_args_list, [])
         self.assertEqual(
             mock_delete.call_args_list,
             [
@@ -599,3 +591,110 @@ class Test(TestCaseNoOps):
         )
         mock_apply.reset_mock()
         mock_delete.reset_mock()
+
+    def test_diff(self):
+        """Actions required by a plan"""
+
+        reference = read_yaml(DATA / "projectplan.yaml")
+        current = ProjectPlanKind.parse_obj(reference)
+        current.spec.plan[0].clusters.append("c2")
+
+        self.assertEqual(
+            Projects.diff(current),
+            [
+                "c1: upgrade ns/test (added, app_version 1.0.0)",
+                "c2: upgrade ns/test (added, app_version 1.0.0)"
+            ]
+        )
+
+        previous = ProjectPlanKind.parse_obj(reference)
+        previous.spec.plan[0].clusters = ["c1", "c3"]
+        current.spec.plan[0].template.spec.versions.one.app_version = "2.0.0"
+
+        self.assertEqual(
+            Projects.diff(current, previous),
+            [
+                "c1: upgrade ns/test (changed, app_version 2.0.0)",
+                "c2: upgrade ns/test (added, app_version 2.0.0)",
+                "c3: uninstall ns/test"
+            ]
+        )
+
+        self.assertEqual(Projects.diff(previous, previous), [])
+
+    def test_plan_bulk(self):
+        """Plan many projects (paired by metadata)"""
+
+        clusters = read_yaml(DATA / "clusters.yaml")
+        ktarget = read_yaml(DATA / "targets.yaml")
+        kversion = read_yaml(DATA / "versions.yaml")
+
+        def documents(*names, version="1.0.0"):
+            # target and version without namespace are shared
+            result = [
+                dict(ktarget, metadata={"name": "test"}),
+                dict(kversion, metadata={"name": "test"})
+            ]
+            for name in names:
+                version_kind = copy.deepcopy(kversion)
+                version_kind["spec"]["one"]["app_version"] = version
+                result.extend([
+                    dict(version_kind, metadata={"name": name, "namespace": "ns"}),
+                    dict(ktarget, metadata={"name": name, "namespace": "ns"}),
+                    {
+                        "kind": "Project",
+                        "metadata": {"name": name, "namespace": "ns"},
+                        "spec": {"package": {"install": {"chart": "a_chart", "env": "test"}}}
+                    }
+                ])
+            return result
+
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmpdir:
+            output = Path(tmpdir)
+            orphan = {
+                "kind": "Project",
+                "metadata": {"name": "orphan", "namespace": "ns"},
+                "spec": {"package": {"install": {"chart": "a_chart", "env": "test"}}}
+            }
+
+            # orphan project (without version and target) is skipped
+            results = Projects.plan_bulk(clusters, documents("p1", "p2") + [orphan], output)
+            self.assertEqual(
+                [ (i.name, i.status) for i in results ],
+                [ ("p1", ProjectPlanStatusEnum.ADDED), ("p2", ProjectPlanStatusEnum.ADDED) ]
+            )
+            kplan = ProjectPlanKind.parse_obj(read_yaml(output / "ns.p1.yaml"))
+            self.assertEqual(kplan.spec.plan[0].clusters, ["c1"])
+
+            # shared target and version (without namespace)
+            orphan["metadata"]["name"] = "test"
+            results = Projects.plan_bulk(
+                clusters, documents("p1", version="2.0.0") + [orphan], output, workers=2
+            )
+            self.assertEqual(
+                [ (i.name, i.status) for i in results ],
+                [
+                    ("p1", ProjectPlanStatusEnum.CHANGED),
+                    ("test", ProjectPlanStatusEnum.ADDED),
+                    ("p2", ProjectPlanStatusEnum.REMOVED)
+                ]
+            )
+            self.assertFalse((output / "ns.p2.yaml").exists())
+
+            results = Projects.plan_bulk(clusters, documents("p1", version="2.0.0"), output)
+            self.assertEqual(results[0].status, ProjectPlanStatusEnum.UNCHANGED)
+
+            report = Projects.plan_bulk_report(results)
+            self.assertIn("unchanged  ns/p1", report)
+            self.assertTrue(report.endswith("removed: 1, unchanged: 1"))
+            self.assertEqual(sorted(i.name for i in output.glob("*.yaml")), ["ns.p1.yaml"])
+
+            # version verification failure
+            invalid = documents("p3")
+            invalid[2]["spec"]["multi"] = [{"app_version": "1.0.0", "weight": 10}]
+            with self.assertRaises(ProjectsPlanFailure) as failure:
+                Projects.plan_bulk(clusters, invalid, output)
+            self.assertEqual(
+                failure.exception.results[0].status, ProjectPlanStatusEnum.FAILED
+            )
+            self.assertFalse((output / "ns.p3.yaml").exists())
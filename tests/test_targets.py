@@ -3,10 +3,11 @@ Tests relative to Targets Kind actions (mostly targets.py)
 """
 
 from pathlib import Path
+from unittest.mock import patch
 from noops.targets import Targets
 from noops.typing.targets import (
     TargetPlan, TargetClassesEnum, TargetsEnum, TargetKind,
-    MatchExpressionsSpec,
+    MatchExpressionsSpec, RequiredSpec,
     TargetClasses, Cluster
 )
 from noops.errors import TargetNotSupported, TargetPlanUnknown, ClustersAvailability
@@ -231,3 +232,76 @@ class TestTargets(TestCaseNoOps):
 
         # DoesNotExist
         self.assertFalse(cluster.match(me3.matchExpressions))
+
+    def test_find_clusters(self):
+        """
+        Indexed selection is equivalent to Cluster.match
+        """
+        clusters = [
+            Cluster(name=f"c{i}", labels=labels)
+            for i, labels in enumerate([
+                {"service/status": "active", "region": "east"},
+                {"service/status": "standby", "region": "west"},
+                {"region": "east"},
+                {},
+                {"service/status": "active", "region": "west"}
+            ])
+        ]
+        targets = Targets(clusters)
+
+        operators = [
+            {"operator": "In", "values": ["active", "standby"]},
+            {"operator": "In", "values": ["unknown"]},
+            {"operator": "NotIn", "values": ["active"]},
+            {"operator": "Exists"},
+            {"operator": "DoesNotExist"}
+        ]
+        for key in ("service/status", "region", "missing"):
+            for operator in operators:
+                for second in operators:
+                    terms = MatchExpressionsSpec.parse_obj({
+                        "matchExpressions": [
+                            {"key": key, **operator},
+                            {"key": "region", **second}
+                        ]
+                    })
+                    required = RequiredSpec(clusterSelectorTerms=[terms])
+                    self.assertListEqual(
+                        targets._find_clusters(required), # pylint: disable=protected-access
+                        [ i.name for i in clusters if i.match(terms.matchExpressions) ]
+                    )
+
+        # OR between terms keeps the first matching term order
+        required = RequiredSpec.parse_obj({
+            "clusterSelectorTerms": [
+                {"matchExpressions": [{"key": "region", "operator": "In", "values": ["west"]}]},
+                {"matchExpressions": [{"key": "region", "operator": "Exists"}]}
+            ]
+        })
+        self.assertListEqual(
+            targets._find_clusters(required), # pylint: disable=protected-access
+            ["c1", "c4", "c0", "c2"]
+        )
+
+    def test_plan_many(self):
+        """
+        Plan a stream of targets with a shared inventory
+        """
+        targets = Targets(read_yaml("tests/data/targets/clusters.yaml"))
+        k1: TargetKind = TargetKind.parse_obj(read_yaml("tests/data/targets/targets.yaml"))
+        k1.spec.active.clusterCount = 1
+        k2 = k1.copy(deep=True)
+        k2.spec.active.clusterCount = 2
+
+        with patch.object(targets, "plan", wraps=targets.plan) as mock_plan:
+            plans = list(targets.plan_many([k1, k2, k1.copy(deep=True)]))
+
+        # identical targets are planned once
+        self.assertEqual(mock_plan.call_count, 2)
+        self.assertListEqual(
+            [ i.active for i in plans ],
+            [ ["c1"], ["c1", "c2"], ["c1"] ]
+        )
+        self.assertIsNot(plans[0], plans[2])
+
+        self.assertListEqual(list(targets.plan_many([])), [])
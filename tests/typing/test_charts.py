@@ -76,3 +76,28 @@ class Test(TestCaseNoOps):
                 }
             }
         )
+
+    def test_preprocessing_steps(self):
+        """Pre-processing steps (scripts depend on the previous entry)"""
+
+        helm = charts.HelmSpec.parse_obj({
+            "pre-processing": [
+                "secrets.py",
+                "render.py",
+                {"script": "pin.py", "timeout": 30},
+                {"script": "render.py", "name": "render-again", "needs": ["pin.py", "secrets.py"]},
+                "last.py"
+            ]
+        })
+
+        self.assertEqual(
+            [ (step.key, step.script, step.needs, step.timeout)
+              for step in helm.preprocessing_steps() ],
+            [
+                ("secrets.py", "secrets.py", [], None),
+                ("render.py", "render.py", ["secrets.py"], None),
+                ("pin.py", "pin.py", [], 30.0),
+                ("render-again", "render.py", ["pin.py", "secrets.py"], None),
+                ("last.py", "last.py", ["render-again"], None)
+            ]
+        )
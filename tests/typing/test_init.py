@@ -2,7 +2,10 @@
 Tests noops.typing
 """
 
-from noops.typing import StrEnum
+import copy
+import pickle
+from noops.typing import StrEnum, fingerprint, fingerprints
+from noops.typing.versions import MultiSpec
 from .. import TestCaseNoOps
 
 class Test(TestCaseNoOps):
@@ -19,3 +22,33 @@ class Test(TestCaseNoOps):
             TEST2="2"
 
         self.assertEqual(TestEnum.list(), ["1", "2"])
+
+    def test_fingerprint(self):
+        """
+        FingerprintModel fingerprint
+        """
+        version = MultiSpec(app_version="1.0.0", weight=10)
+        same = MultiSpec.parse_obj({"weight": 10, "app_version": "1.0.0"})
+
+        self.assertEqual(version.fingerprint, same.fingerprint)
+        self.assertEqual(fingerprint(version), version.fingerprint)
+        self.assertIsNone(fingerprint(None))
+        self.assertEqual(fingerprints([version]), [version.fingerprint])
+        self.assertIsNone(fingerprints(None))
+
+        # cached
+        first = version.fingerprint
+        self.assertIs(version.fingerprint, first)
+
+        # reset when a field is set
+        version.weight = 20
+        self.assertNotEqual(version.fingerprint, first)
+
+        # copies do not keep the cache
+        version_copy = version.copy(update={"weight": 10})
+        self.assertEqual(version_copy.fingerprint, first)
+        self.assertEqual(copy.deepcopy(version).fingerprint, version.fingerprint)
+        self.assertEqual(pickle.loads(pickle.dumps(version)).fingerprint, version.fingerprint)
+
+        # equality is not altered by the cache
+        self.assertEqual(version_copy, same)
@@ -68,7 +68,8 @@ class Test(TestCaseNoOps):
                                 "services-only": False,
                                 "args": None,
                                 "envs": None,
-                                "white-label": None
+                                "white-label": None,
+                                "canary-weights": "releases"
                             }
                         },
                         "versions": {
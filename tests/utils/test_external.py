@@ -2,6 +2,7 @@
 Tests noops.utils.external
 """
 
+import subprocess
 import tempfile
 from pathlib import Path
 from noops.utils.external import execute, get_stdout
@@ -40,6 +41,13 @@ class Test(TestCaseNoOps):
             )
             self.assertFalse(file_path.exists())
 
+    def test_execute_timeout(self):
+        """
+        Execute with a timeout
+        """
+        with self.assertRaises(subprocess.TimeoutExpired):
+            execute("sleep", ["5"], timeout=0.1)
+
     def test_execute_from_shell(self):
         """
         Execute from a shell
@@ -2,10 +2,14 @@
 Tests noops.utils.io
 """
 
+import os
 from unittest.mock import patch
 import tempfile
 from pathlib import Path
-from noops.utils.io import write_yaml, read_yaml, write_json, write_raw
+import yaml
+from noops.utils.io import (
+    write_yaml, read_yaml, write_json, write_raw, write_if_changed, file_digest,
+    sync_directory, dump_yaml_all, write_yaml_all)
 from .. import TestCaseNoOps
 
 class Test(TestCaseNoOps):
@@ -87,3 +91,161 @@ class Test(TestCaseNoOps):
             write_raw(file_path, content, dry_run=True)
             mock_print.assert_called_with('test')
             self.assertFalse(file_path.exists())
+
+    @patch('builtins.print')
+    def test_write_if_changed(self, mock_print):
+        """
+        Write a file only if the content changed
+        """
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmp:
+            file_path = Path(tmp) / "test.yaml"
+
+            self.assertIsNone(file_digest(file_path))
+
+            # new file
+            self.assertTrue(write_if_changed(file_path, "test"))
+            self.assertEqual(file_path.read_text(encoding="UTF-8"), "test")
+            digest = file_digest(file_path)
+
+            # same content
+            mtime = file_path.stat().st_mtime_ns
+            self.assertFalse(write_if_changed(file_path, "test"))
+            self.assertEqual(file_path.stat().st_mtime_ns, mtime)
+            self.assertEqual(file_digest(file_path), digest)
+
+            # new file mode follows the umask
+            umask = os.umask(0o027)
+            try:
+                self.assertTrue(write_if_changed(Path(tmp) / "umask", "test"))
+            finally:
+                os.umask(umask)
+            self.assertEqual((Path(tmp) / "umask").stat().st_mode & 0o777, 0o640)
+            (Path(tmp) / "umask").unlink()
+
+            # new content (atomic, mode preserved)
+            file_path.chmod(0o750)
+            self.assertTrue(write_if_changed(file_path, "test2"))
+            self.assertNotEqual(file_digest(file_path), digest)
+            self.assertEqual(file_path.stat().st_mode & 0o777, 0o750)
+            self.assertEqual(list(Path(tmp).iterdir()), [file_path])
+
+            # yaml
+            write_yaml(file_path, {"key": "value"}, if_changed=True)
+            self.assertEqual(read_yaml(file_path), {"key": "value"})
+
+            # Dry run
+            self.assertFalse(write_if_changed(file_path, "test", dry_run=True))
+            mock_print.assert_called_with('test')
+            self.assertEqual(read_yaml(file_path), {"key": "value"})
+
+    def test_dump_yaml_all(self):
+        """
+        Dump documents one at a time
+        """
+        documents = [
+            {"b": "{{ value }}", "a": [1, 2]},
+            {"path": Path("/tmp/test")},
+            {"key": {"nested": True}}
+        ]
+
+        chunks = list(dump_yaml_all(documents))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(chunks[0], "a:\n- 1\n- 2\nb: '{{ value }}'\n")
+        self.assertTrue(chunks[1].startswith("---\npath: !path "))
+        self.assertEqual(
+            list(yaml.safe_load_all("".join(chunks))),
+            documents
+        )
+
+        # transform
+        self.assertEqual(
+            list(dump_yaml_all(documents[2:], transform=str.upper)),
+            ["KEY:\n  NESTED: TRUE\n"]
+        )
+
+        self.assertEqual(list(dump_yaml_all([])), [])
+
+    @patch('builtins.print')
+    def test_write_yaml_all(self, mock_print):
+        """
+        Write a multi-documents yaml file (streaming)
+        """
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmp:
+            file_path = Path(tmp) / "test.yaml"
+
+            documents = ({"key": i} for i in range(3))
+            self.assertTrue(write_yaml_all(file_path, documents, terminate=True))
+            self.assertEqual(
+                file_path.read_text(encoding="UTF-8"),
+                "key: 0\n---\nkey: 1\n---\nkey: 2\n---\n"
+            )
+
+            # same content
+            mtime = file_path.stat().st_mtime_ns
+            self.assertFalse(write_yaml_all(
+                file_path, ({"key": i} for i in range(3)), terminate=True))
+            self.assertEqual(file_path.stat().st_mtime_ns, mtime)
+            self.assertEqual(list(Path(tmp).iterdir()), [file_path])
+
+            # new content
+            self.assertTrue(write_yaml_all(file_path, [{"key": 0}], transform=str.upper))
+            self.assertEqual(file_path.read_text(encoding="UTF-8"), "KEY: 0\n")
+
+            # failure while streaming (current file kept)
+            def failure():
+                yield {"key": "partial"}
+                raise RuntimeError("failure")
+
+            with self.assertRaisesRegex(RuntimeError, "failure"):
+                write_yaml_all(file_path, failure())
+            self.assertEqual(file_path.read_text(encoding="UTF-8"), "KEY: 0\n")
+            self.assertEqual(list(Path(tmp).iterdir()), [file_path])
+
+            # Dry run
+            self.assertFalse(write_yaml_all(file_path, [{"key": 1}], dry_run=True))
+            mock_print.assert_called_with("key: 1\n", end="")
+            self.assertEqual(file_path.read_text(encoding="UTF-8"), "KEY: 0\n")
+
+    def test_sync_directory(self):
+        """
+        Incremental directory synchronization
+        """
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmp:
+            src = Path(tmp) / "src"
+            dst = Path(tmp) / "dst"
+            (src / "base").mkdir(parents=True)
+            (src / "base/kustomization.yaml").write_text("base", encoding="UTF-8")
+            (src / "prod").mkdir()
+            (src / "prod/kustomization.yaml").write_text("prod", encoding="UTF-8")
+
+            # initial copy
+            self.assertEqual(sync_directory(src, dst), 4)
+            self.assertEqual((dst / "prod/kustomization.yaml").read_text(encoding="UTF-8"), "prod")
+
+            # nothing changed
+            inode = (dst / "base/kustomization.yaml").stat().st_ino
+            self.assertEqual(sync_directory(src, dst), 0)
+            self.assertEqual((dst / "base/kustomization.yaml").stat().st_ino, inode)
+
+            # mode changed only
+            (src / "base/kustomization.yaml").chmod(0o755)
+            self.assertEqual(sync_directory(src, dst), 1)
+            self.assertEqual((dst / "base/kustomization.yaml").stat().st_mode & 0o777, 0o755)
+            self.assertEqual((dst / "base/kustomization.yaml").stat().st_ino, inode)
+            self.assertEqual(sync_directory(src, dst), 0)
+
+            # one file changed, one directory removed, extra files removed
+            (src / "base/kustomization.yaml").write_text("base2", encoding="UTF-8")
+            (src / "prod/kustomization.yaml").unlink()
+            (src / "prod").rmdir()
+            (dst / "witness").touch()
+            (dst / "extra").mkdir()
+            (dst / "extra/witness").touch()
+
+            self.assertEqual(sync_directory(src, dst), 6)
+            self.assertEqual(
+                (dst / "base/kustomization.yaml").read_text(encoding="UTF-8"), "base2")
+            self.assertEqual(
+                sorted(i.relative_to(dst).as_posix() for i in dst.rglob("*")),
+                ["base", "base/kustomization.yaml"]
+            )
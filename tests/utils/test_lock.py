@@ -0,0 +1,93 @@
+"""
+Tests noops.utils.lock
+"""
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from noops.utils.lock import file_lock
+from noops.errors import LockTimeout
+from .. import TestCaseNoOps
+
+class Test(TestCaseNoOps):
+    """
+    Tests noops.utils.lock
+    """
+    def test_file_lock(self):
+        """
+        Exclusive lock between threads
+        """
+        events = []
+
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmp:
+            lock_path = Path(tmp) / "test.lock"
+
+            def locked(name):
+                with file_lock(lock_path):
+                    events.append(f"{name}-in")
+                    time.sleep(0.05)
+                    events.append(f"{name}-out")
+
+            threads = [
+                threading.Thread(target=locked, args=(f"t{i}",)) for i in range(3)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertTrue(lock_path.exists())
+
+            # never 2 threads in the critical section
+            for index in range(0, len(events), 2):
+                self.assertEqual(
+                    events[index].split("-")[0],
+                    events[index + 1].split("-")[0]
+                )
+                self.assertTrue(events[index].endswith("-in"))
+
+            # shared locks are held at the same time, an exclusive lock waits for them
+            events.clear()
+            with file_lock(lock_path, shared=True), file_lock(lock_path, shared=True):
+                thread = threading.Thread(target=locked, args=("exclusive",))
+                thread.start()
+                thread.join(0.1)
+                self.assertTrue(thread.is_alive())
+                events.append("shared-out")
+            thread.join()
+            self.assertEqual(events, ["shared-out", "exclusive-in", "exclusive-out"])
+
+            # reentrant usage after release
+            with file_lock(lock_path) as path:
+                self.assertEqual(path, lock_path.resolve())
+
+    def test_file_lock_timeout(self):
+        """
+        Waiting for a lock is limited in time
+        """
+        with tempfile.TemporaryDirectory(prefix="noops-") as tmp:
+            lock_path = Path(tmp) / "test.lock"
+            failures = []
+
+            def locked(shared: bool, timeout: float = None):
+                try:
+                    with file_lock(lock_path, shared=shared, timeout=timeout):
+                        pass
+                except LockTimeout as failure:
+                    failures.append(str(failure))
+
+            # between threads (exclusive) and processes (shared is used by the holder)
+            with file_lock(lock_path):
+                locked(False, 0.2)
+            with file_lock(lock_path, shared=True):
+                locked(False, 0.2)
+
+                # NOOPS_LOCK_TIMEOUT by default
+                os.environ["NOOPS_LOCK_TIMEOUT"] = "0.2"
+                self.addCleanup(os.environ.pop, "NOOPS_LOCK_TIMEOUT")
+                locked(False)
+
+            self.assertEqual(len(failures), 3)
+            self.assertIn("lock not acquired after 0.2 seconds", failures[0])